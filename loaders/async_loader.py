@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Async Loader - Concurrent batch loading over an asyncpg connection pool
+
+Created: 10/18/26 11:55PM
+Updated: 10/19/26 12:40AM - --server-ids: row ids from the tables' gen_random_uuid() defaults (no id column sent)
+Updated: 10/19/26 1:25AM - --validate: prevalidation.py runs before the pool is opened; invalid files are not loaded
+Updated: 10/19/26 7:35AM - Row values adapted to the column types before executemany/COPY (asyncpg does not cast)
+Updated: 10/19/26 7:50AM - Rule set version checked per document (SharedRuleSet), reloaded when the rules change
+Updated: 10/19/26 8:05AM - At most --workers files parsed or loading at once (semaphore), not the whole batch in memory
+Updated: 10/19/26 8:20AM - create_document/link_document_accounts run simple_loader's shared document checks and SQL
+Purpose: Keep many documents in flight at once instead of waiting on every round trip
+
+Same load semantics as simple_loader.load_batch, on asyncio + asyncpg:
+- JSON is parsed, hashed and validated in worker processes (simple_loader.prepare_extraction);
+  a semaphore keeps at most --workers files parsed or loading at once, so a file's
+  data is only held in memory between its parse and the end of its load
+- every document loads in its own transaction on a connection from a bounded pool
+  (--workers connections), so one document's failure never affects another
+- create_document's fail-fast rules are unchanged: missing documents row → error,
+  different JSON for an already loaded extraction type → ExtractionConflictError,
+  identical JSON → skipped
+- reference data (ReferenceCache) and mapping rules (CompiledRuleSet) are preloaded
+  once and shared; account lookups a document needs that miss the cache are resolved
+  with one query per document
+- like get_rule_set, every document checks the rule set version (one cheap query) and
+  the shared rules are recompiled when map_rules/map_conditions/map_actions changed
+- rows are built with simple_loader's row builders and written per table with
+  executemany (asyncpg pipelines the INSERTs without waiting for each reply), or with
+  binary COPY (copy_records_to_table) in --copy mode
+- asyncpg encodes parameters strictly by column type where psycopg2 sent literals
+  for the server to cast, so row values are first adapted to their column's type
+  (read from information_schema): non-str JSON values in text columns become text
+  (JSON-encoded for lists/objects), numbers become Decimal, ISO date strings dates
+
+Requires the optional asyncpg package (pip install asyncpg). Not available: --stream.
+
+Usage:
+    python3 async_loader.py documents/4extractions --workers 8
+    python3 async_loader.py "documents/4extractions/*_activities_*.json" --copy
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import asyncpg
+except ImportError:  # Optional - only needed for the async loader
+    asyncpg = None
+
+import simple_loader
+from simple_loader import (
+    POSITION_COLUMNS, TRANSACTION_COLUMNS, DOC_LEVEL_DATA_COLUMNS, ACTIVITY_SECTIONS, DEFAULT_WORKERS,
+    ExtractionConflictError, build_position_row, build_transaction_row, build_doc_level_data_row,
+    EXISTING_DOCUMENT_SQL, LINK_ACCOUNTS_SQL, insert_columns, loading_status_sql, move_to_loaded, parse_date,
+    prepare_extraction, print_batch_summary, required_doc_hash, resolve_batch_paths, resolve_extraction_status,
+    unlinked_accounts,
+)
+from bulk_writer import DEFAULT_BATCH_SIZE, COPY_BATCH_SIZE
+from prevalidation import prevalidate, print_invalid
+from mapping_rules_engine import CompiledRuleSet, RULE_SET_QUERIES, RULE_SET_VERSION_QUERY
+from reference_cache import ReferenceCache, PRELOAD_QUERIES
+
+
+def require_asyncpg():
+    """Fail with a clear message when the async loader is used without asyncpg"""
+    if asyncpg is None:
+        raise ValueError("The async loader requires the asyncpg package (pip install asyncpg)")
+
+
+# Column types of the loaded tables (udt_name), read once per batch
+COLUMN_TYPES_QUERY = """
+    SELECT table_name, column_name, udt_name FROM information_schema.columns
+    WHERE table_schema = current_schema() AND table_name = ANY($1::text[])
+"""
+
+
+def to_text(value):
+    """Value for a text column - what psycopg2's literal would have stored"""
+    if value is None or type(value) is str:
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def to_numeric(value):
+    """Value for a numeric column (asyncpg encodes Decimal exactly)"""
+    if value is None or type(value) is Decimal:
+        return value
+    return Decimal(str(value))
+
+
+def to_date(value):
+    """Value for a date column (asyncpg takes no strings for dates)"""
+    if value is None or type(value) is date:
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+# udt_name → adapter; columns of other types are sent unchanged
+COLUMN_ADAPTERS = {
+    'text': to_text,
+    'varchar': to_text,
+    'bpchar': to_text,
+    'numeric': to_numeric,
+    'date': to_date,
+}
+
+
+async def load_column_types(conn, tables=tuple(simple_loader.TABLE_COLUMNS)):
+    """
+    Column types of the loaded tables
+
+    Returns:
+        dict: table → {column: udt_name}
+    """
+    column_types = {}
+    for row in await conn.fetch(COLUMN_TYPES_QUERY, list(tables)):
+        column_types.setdefault(row['table_name'], {})[row['column_name']] = row['udt_name']
+    return column_types
+
+
+def row_adapters(column_types, columns):
+    """(index, adapter) for every column of the insert list whose values need adapting"""
+    adapters = []
+    for index, column in enumerate(columns):
+        adapter = COLUMN_ADAPTERS.get(column_types.get(column))
+        if adapter is not None:
+            adapters.append((index, adapter))
+    return tuple(adapters)
+
+
+class AsyncBulkWriter:
+    """BulkWriter counterpart: rows buffered per table, written with executemany or binary COPY"""
+
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE, use_copy=False, column_types=None):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        self.conn = conn
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.column_types = column_types or {}  # table → {column: udt_name}, see load_column_types
+        self.buffers = {}       # table → (columns, [rows], adapters)
+        self.rows_written = {}  # table → count
+        self.flushes = 0
+
+    async def add(self, table, columns, row):
+        """Queue one row; flushes the table's buffer when it reaches batch_size"""
+        buffered = self.buffers.get(table)
+        if buffered is None:
+            columns = tuple(columns)
+            buffered = (columns, [], row_adapters(self.column_types.get(table, {}), columns))
+            self.buffers[table] = buffered
+        elif buffered[0] != tuple(columns):
+            raise ValueError(f"Column list changed for table '{table}' while rows are buffered")
+
+        if buffered[2]:
+            row = list(row)
+            for index, adapter in buffered[2]:
+                row[index] = adapter(row[index])
+        buffered[1].append(row)
+        if len(buffered[1]) >= self.batch_size:
+            await self.flush(table)
+
+    async def flush(self, table=None):
+        """Write buffered rows for one table, or for every table if none is given"""
+        tables = [table] if table is not None else list(self.buffers)
+
+        for name in tables:
+            buffered = self.buffers.get(name)
+            if not buffered or not buffered[1]:
+                continue
+            columns, rows, _ = buffered
+            if self.use_copy:
+                await self.conn.copy_records_to_table(name, records=rows, columns=columns)
+            else:
+                placeholders = ', '.join(f"${index}" for index in range(1, len(columns) + 1))
+                await self.conn.executemany(
+                    f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({placeholders})", rows
+                )
+            self.rows_written[name] = self.rows_written.get(name, 0) + len(rows)
+            self.flushes += 1
+            rows.clear()
+
+
+class SharedRuleSet:
+    """
+    get_rule_set counterpart: one CompiledRuleSet shared by every document of the batch
+
+    current() compares the snapshot with the database fingerprint and recompiles it
+    once when the rules were edited, however many documents notice at the same time.
+    """
+
+    def __init__(self, rule_set):
+        self.rule_set = rule_set
+        self.reloads = 0
+        self.lock = asyncio.Lock()
+
+    async def current(self, conn):
+        """The compiled rules matching the database, reloaded if they changed"""
+        rule_set = self.rule_set
+        if not rule_set.invalidated and rule_set.version == await conn.fetchval(RULE_SET_VERSION_QUERY):
+            return rule_set
+
+        async with self.lock:
+            # Re-read under the lock - another document may have reloaded already
+            version = await conn.fetchval(RULE_SET_VERSION_QUERY)
+            if self.rule_set.invalidated or self.rule_set.version != version:
+                rule_rows = [await conn.fetch(query) for query in RULE_SET_QUERIES]
+                self.rule_set = CompiledRuleSet.from_rows(*rule_rows, version=version)
+                self.reloads += 1
+                print("Mapping rules changed - rule set reloaded")
+            return self.rule_set
+
+
+async def load_shared_state(pool):
+    """Preload the ReferenceCache, compile the mapping rules and read the column types with one connection"""
+    async with pool.acquire() as conn:
+        reference_rows = [await conn.fetch(query) for query in PRELOAD_QUERIES]
+        version = await conn.fetchval(RULE_SET_VERSION_QUERY)
+        rule_rows = [await conn.fetch(query) for query in RULE_SET_QUERIES]
+        column_types = await load_column_types(conn)
+    return (ReferenceCache.from_rows(*reference_rows), CompiledRuleSet.from_rows(*rule_rows, version=version),
+            column_types)
+
+
+async def lookup_institution(conn, refs, name):
+    """simple_loader.lookup_institution through the shared cache"""
+    if name in refs.institutions:
+        refs.hits += 1
+        return refs.institutions[name]
+
+    refs.misses += 1
+    institution_id = await conn.fetchval("SELECT id FROM institutions WHERE institution_name = $1", name)
+    if not institution_id:
+        raise ValueError(f"Institution '{name}' not found in database. Reference data must be loaded first via process-inbox command.")
+    refs.institutions[name] = str(institution_id)
+    return refs.institutions[name]
+
+
+async def lookup_accounts(conn, refs, account_numbers, institution_id):
+    """
+    simple_loader.lookup_account for every account of a document
+
+    Cache misses are fetched with a single query; any account still missing fails
+    the document exactly like lookup_account does.
+
+    Returns:
+        dict: account_number → (account_id, entity_id)
+    """
+    institution_id = str(institution_id)
+    missing = [number for number in account_numbers if (number, institution_id) not in refs.accounts]
+    refs.hits += len(account_numbers) - len(missing)
+
+    if missing:
+        refs.misses += len(missing)
+        rows = await conn.fetch("""
+            SELECT id, entity_id, account_number, institution_id FROM accounts
+            WHERE account_number = ANY($1::text[]) AND institution_id = $2
+        """, list(dict.fromkeys(missing)), institution_id)
+        for row in rows:
+            refs.remember_account(row)
+
+    accounts = {}
+    for number in account_numbers:
+        account = refs.accounts.get((number, institution_id))
+        if not account:
+            raise ValueError(f"Account '{number}' not found at institution. Reference data must be loaded first via process-inbox command.")
+        accounts[number] = account
+    return accounts
+
+
+async def create_document(conn, data, extraction_type, json_md5_hash):
+    """
+    simple_loader.create_document on asyncpg - same fail-fast rules (resolve_extraction_status)
+
+    Returns the document id, or None when this extraction type is already loaded
+    with identical JSON content.
+    """
+    metadata = data.get('extraction_metadata', {})
+    doc_hash = required_doc_hash(metadata)
+
+    # Locked until commit, like get_existing_document
+    existing_doc = await conn.fetchrow(EXISTING_DOCUMENT_SQL.format(doc_hash='$1'), doc_hash)
+    status = resolve_extraction_status(existing_doc, metadata, doc_hash, extraction_type, json_md5_hash)
+    if status == 'SKIP_DUPLICATE':
+        return None
+
+    # PROCEED - same update as update_document_loading_status
+    sql = loading_status_sql(extraction_type, '$1', '$2', '$3')
+    if sql is not None:
+        await conn.execute(sql, datetime.now(), json_md5_hash, existing_doc['id'])
+    return str(existing_doc['id'])
+
+
+async def link_document_accounts(conn, refs, doc_id, account_ids):
+    """
+    simple_loader.link_document_accounts: one statement, existing links skipped
+
+    Only links already committed are skipped through the cache; the caller adds the
+    returned pairs to refs.document_links after its own commit, so a rolled-back
+    document never hides a link another document still has to insert.
+
+    Returns:
+        list: (document_id, account_id) pairs linked by this document
+    """
+    account_ids = unlinked_accounts(doc_id, account_ids, refs)
+    if account_ids:
+        await conn.execute(LINK_ACCOUNTS_SQL.format(doc_id='$1::uuid', account_ids='$2'), doc_id, account_ids)
+    return [(str(doc_id), account_id) for account_id in account_ids]
+
+
+async def load_extraction(pool, prepared, refs, rules, batch_size=None, use_copy=False, server_ids=False,
+                          column_types=None):
+    """
+    Load one prepared extraction in a single transaction on a pooled connection
+
+    Rolls back (moving the JSON file back) on any error, like simple_loader.load_extraction.
+
+    Returns:
+        str: 'loaded', or 'skipped' when the identical extraction is already loaded
+    """
+    if batch_size is None:
+        batch_size = COPY_BATCH_SIZE if use_copy else DEFAULT_BATCH_SIZE
+
+    json_path = prepared['json_path']
+    data = prepared['data']
+    accounts = prepared['accounts']
+    loaded_path = None
+    position_columns = insert_columns(POSITION_COLUMNS, server_ids)
+    transaction_columns = insert_columns(TRANSACTION_COLUMNS, server_ids)
+
+    async with pool.acquire() as conn:
+        try:
+            async with conn.transaction():
+                if not accounts:
+                    raise ValueError("No accounts found in JSON")
+                institution_id = await lookup_institution(conn, refs, prepared['institution'])
+
+                loaded_path = move_to_loaded(json_path)
+                doc_id = await create_document(conn, data, prepared['extraction_type'], prepared['json_md5_hash'])
+                if doc_id is None:
+                    # Identical extraction already loaded - nothing to write, the file stays in 5loaded
+                    return 'skipped'
+
+                rule_set = await rules.current(conn)
+                numbered = [account for account in accounts if account.get('account_number')]
+                if len(numbered) < len(accounts):
+                    print("Warning: Skipping account missing number")
+                resolved = await lookup_accounts(
+                    conn, refs, [account['account_number'] for account in numbered], institution_id
+                )
+
+                writer = AsyncBulkWriter(conn, batch_size=batch_size, use_copy=use_copy, column_types=column_types)
+                tax_year = datetime.now().year
+                statement_date = parse_date(data.get('document_data', {}).get('statement_date'), tax_year)
+                total_positions = 0
+                total_transactions = 0
+
+                for account_data in numbered:
+                    account_number = account_data['account_number']
+                    account_id, entity_id = resolved[account_number]
+
+                    for position in account_data.get('holdings') or []:
+                        await writer.add('positions', position_columns, build_position_row(
+                            position, account_number, doc_id, account_id, entity_id, statement_date, None,
+                            rule_set=rule_set, tax_year=tax_year, server_ids=server_ids
+                        ))
+                        total_positions += 1
+
+                    for section_name in ACTIVITY_SECTIONS:
+                        for activity in account_data.get(section_name) or []:
+                            await writer.add('transactions', transaction_columns, build_transaction_row(
+                                activity, section_name, doc_id, account_id, entity_id, None,
+                                rule_set=rule_set, tax_year=tax_year, server_ids=server_ids
+                            ))
+                            total_transactions += 1
+
+                    row = build_doc_level_data_row(account_data, doc_id, account_id, statement_date,
+                                                   server_ids=server_ids)
+                    if row is not None:
+                        await writer.add('doc_level_data', insert_columns(DOC_LEVEL_DATA_COLUMNS, server_ids), row)
+
+                links = await link_document_accounts(conn, refs, doc_id, [account[0] for account in resolved.values()])
+                await writer.flush()
+
+            refs.document_links.update(links)
+
+            print(f"Loaded {json_path.name}: {total_positions} positions, {total_transactions} transactions")
+            return 'loaded'
+
+        except Exception as e:
+            print(f"Error during processing {json_path.name}: {e}")
+            # Move file back if it was moved
+            if loaded_path is not None and loaded_path.exists():
+                shutil.move(str(loaded_path), str(json_path))
+            raise
+
+
+async def load_batch(target, workers=DEFAULT_WORKERS, batch_size=None, use_copy=False, server_ids=False,
+                     validate=False):
+    """
+    Load every extraction JSON in a directory or matching a glob pattern
+
+    Returns:
+        list: (json_path, status, detail) per file, as simple_loader.load_batch
+    """
+    require_asyncpg()
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+
+    paths = resolve_batch_paths(target)
+    if not paths:
+        raise ValueError(f"No JSON files found for: {target}")
+
+    start = time.perf_counter()
+    results = []
+    if validate:
+        paths, invalid = prevalidate(paths, workers=workers)
+        print_invalid(invalid)
+        results.extend((path, 'invalid', errors[0]) for path, errors in invalid)
+        if not paths:
+            print_batch_summary(results)
+            return results
+
+    print(f"Async batch loading {len(paths)} files over {workers} connections")
+    loop = asyncio.get_running_loop()
+
+    pool = await asyncpg.create_pool(simple_loader.DB_URL, min_size=1, max_size=workers)
+    try:
+        refs, rule_set, column_types = await load_shared_state(pool)
+        rules = SharedRuleSet(rule_set)
+
+        in_flight = asyncio.Semaphore(workers)
+
+        async def parse_and_load(parsers, path):
+            async with in_flight:
+                try:
+                    prepared = await loop.run_in_executor(parsers, prepare_extraction, path)
+                except Exception as e:
+                    print(f"Invalid: {path}: {e}")
+                    return path, 'invalid', str(e)
+                try:
+                    return path, await load_extraction(pool, prepared, refs, rules, batch_size, use_copy,
+                                                       server_ids, column_types), ''
+                except ExtractionConflictError as e:
+                    return path, 'conflict', str(e).splitlines()[0]
+                except Exception as e:
+                    return path, 'failed', str(e).splitlines()[0] if str(e) else type(e).__name__
+
+        with ProcessPoolExecutor(max_workers=workers) as parsers:
+            results += await asyncio.gather(*(parse_and_load(parsers, path) for path in paths))
+    finally:
+        await pool.close()
+
+    results = sorted(results, key=lambda result: str(result[0]))
+    print_batch_summary(results)
+    ref_stats = refs.stats()
+    cache = rules.rule_set.cache_info()
+    print(f"Reference cache: {ref_stats['hits']} hits, {ref_stats['misses']} misses")
+    print(f"Rule cache: {cache['hits']} hits, {cache['misses']} misses"
+          + (f" (rule set reloaded {rules.reloads}x)" if rules.reloads else ""))
+    print(f"Finished in {time.perf_counter() - start:.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load JSON extractions concurrently with asyncpg")
+    parser.add_argument('target', help="Directory of extractions, a glob pattern, or one JSON file")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help=f"Rows per executemany/COPY (default: {DEFAULT_BATCH_SIZE}, "
+                             f"{COPY_BATCH_SIZE} with --copy)")
+    parser.add_argument('--copy', action='store_true', help="Write rows with binary COPY")
+    parser.add_argument('--server-ids', action='store_true',
+                        help="Let the database generate row ids (gen_random_uuid() default)")
+    parser.add_argument('--validate', action='store_true',
+                        help="Validate files (in parallel, cached by file hash) before loading; skip invalid ones")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"Pooled connections / parser processes (default: {DEFAULT_WORKERS})")
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(load_batch(args.target, workers=args.workers,
+                                         batch_size=args.batch_size, use_copy=args.copy,
+                                         server_ids=args.server_ids, validate=args.validate))
+        if any(status in ('conflict', 'invalid', 'failed') for _, status, _ in results):
+            sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Benchmark Loader - Throughput and latency of the loader and rule engine on synthetic statements
+
+Created: 10/18/26 11:20PM
+Updated: 10/19/26 12:40AM - --server-ids loads with database-generated row ids (part of the compared configuration)
+Purpose: Repeatable performance numbers for load_document, apply_mapping_rules and
+         reapply_rules_to_transactions, recorded for regression comparison
+
+Runs against a local Postgres (--db-url, default simple_loader.DB_URL):
+1. Creates benchmark reference data: a synthetic entity, an account per synthetic
+   account number (Fidelity institution) and a documents row per statement, as
+   /process-inbox would.
+2. load_document     loads each generated activities/holdings extraction; latency per
+                     document, rows/sec, and the loader's per-stage seconds summed.
+3. apply_mapping_rules  classifies every loaded synthetic transaction twice - cold
+                     (empty rule-result cache) and warm; latency per call.
+4. reapply_rules_to_transactions  per synthetic document, row-by-row and bulk mode.
+5. Deletes everything it created (unless --keep) and appends one JSON line with the
+   configuration and results to --results; --compare prints the change against the
+   previous run with the same configuration.
+
+Latencies are summarized as p50/p90/p95/p99/max (nearest rank) and mean.
+
+Usage:
+    python3 benchmark_loader.py --statements 4 --accounts 3 --activities 500 --holdings 100
+    python3 benchmark_loader.py --descriptions 5000 --copy --compare
+    python3 benchmark_loader.py --statements 1 --accounts 1 --holdings 50000 --server-ids --compare
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+import simple_loader
+from load_metrics import STAGES
+from mapping_rules_engine import (apply_mapping_rules, get_rule_set, invalidate_rule_set,
+                                  reapply_rules_to_transactions, transaction_row_to_rule_data)
+from synthetic_statements import (SYNTHETIC_HASH_PREFIX, generate_statement, synthetic_account_numbers,
+                                  synthetic_doc_hash, statement_period, write_statement)
+
+DEFAULT_RESULTS = Path(__file__).resolve().parent / 'benchmark_results.jsonl'
+
+BENCHMARK_ENTITY = 'Synthetic Benchmark Entity'
+BENCHMARK_INSTITUTION = 'Fidelity'
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def summarize(latencies, work=None):
+    """
+    Latency percentiles (ms) and throughput for a list of per-call seconds
+
+    Args:
+        latencies (list): Seconds per call
+        work (int, optional): Units processed in total (rows) - defaults to the call count
+    """
+    if not latencies:
+        return {'calls': 0}
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    summary = {'calls': len(ordered), 'total_seconds': round(total, 6)}
+    for percentile in PERCENTILES:
+        rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+        summary[f"p{percentile}_ms"] = round(ordered[rank - 1] * 1000, 4)
+    summary['max_ms'] = round(ordered[-1] * 1000, 4)
+    summary['mean_ms'] = round(total / len(ordered) * 1000, 4)
+    summary['per_second'] = round((work if work is not None else len(ordered)) / total, 1) if total else None
+    return summary
+
+
+def git_revision():
+    """Current commit of the repository, or None outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).resolve().parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def create_reference_data(conn, account_numbers, statements, seed):
+    """Insert the benchmark entity, accounts and documents rows; returns their ids"""
+    cur = conn.cursor()
+
+    cur.execute("SELECT id FROM institutions WHERE institution_name = %s", (BENCHMARK_INSTITUTION,))
+    row = cur.fetchone()
+    created_institution = row is None
+    if created_institution:
+        cur.execute("""
+            INSERT INTO institutions (institution_name, institution_type, notes)
+            VALUES (%s, 'brokerage', 'Created by benchmark_loader.py') RETURNING id
+        """, (BENCHMARK_INSTITUTION,))
+        row = cur.fetchone()
+    institution_id = row['id']
+
+    cur.execute("""
+        INSERT INTO entities (entity_name, entity_type, tax_id, notes)
+        VALUES (%s, 'other', '00-0000000', 'Created by benchmark_loader.py') RETURNING id
+    """, (BENCHMARK_ENTITY,))
+    entity_id = cur.fetchone()['id']
+
+    for account_number in account_numbers:
+        cur.execute("""
+            INSERT INTO accounts (entity_id, institution_id, account_number, account_type, institution_name, notes)
+            VALUES (%s, %s, %s, 'brokerage', %s, 'Created by benchmark_loader.py')
+        """, (entity_id, institution_id, account_number, BENCHMARK_INSTITUTION))
+
+    document_ids = []
+    for index in range(statements):
+        _, period_end = statement_period(index)
+        file_name = f"synthetic_{period_end:%Y-%m}_{index:04d}.pdf"
+        cur.execute("""
+            INSERT INTO documents (institution_id, tax_year, document_type, period_end, file_path, file_name,
+                                   doc_md5_hash, extraction_notes)
+            VALUES (%s, %s, 'statement', %s, %s, %s, %s, 'Created by benchmark_loader.py') RETURNING id
+        """, (institution_id, period_end.year, period_end, f"/synthetic/{file_name}", file_name,
+              synthetic_doc_hash(index, seed)))
+        document_ids.append(str(cur.fetchone()['id']))
+
+    conn.commit()
+    return {
+        'institution_id': institution_id if created_institution else None,
+        'entity_id': entity_id,
+        'document_ids': document_ids,
+    }
+
+
+def delete_reference_data(conn, created):
+    """Remove every row the benchmark created (loaded rows first)"""
+    cur = conn.cursor()
+    document_ids = created['document_ids']
+    for table in ('transactions', 'positions', 'doc_level_data', 'document_accounts'):
+        cur.execute(f"DELETE FROM {table} WHERE document_id = ANY(%s::uuid[])", (document_ids,))
+    cur.execute("DELETE FROM documents WHERE id = ANY(%s::uuid[])", (document_ids,))
+    cur.execute("DELETE FROM accounts WHERE entity_id = %s", (created['entity_id'],))
+    cur.execute("DELETE FROM entities WHERE id = %s", (created['entity_id'],))
+    if created['institution_id']:
+        cur.execute("DELETE FROM institutions WHERE id = %s", (created['institution_id'],))
+    conn.commit()
+
+
+def check_clean(conn):
+    """Fail if a previous run left synthetic rows behind (e.g. --keep or a crash)"""
+    cur = conn.cursor()
+    cur.execute("SELECT count(*) AS n FROM documents WHERE doc_md5_hash LIKE %s", (SYNTHETIC_HASH_PREFIX + '%',))
+    if cur.fetchone()['n']:
+        raise ValueError("Synthetic benchmark documents already exist - remove them (entity "
+                         f"'{BENCHMARK_ENTITY}' and documents with doc_md5_hash '{SYNTHETIC_HASH_PREFIX}%') first")
+
+
+def bench_load_document(paths, use_copy, server_ids, verbose):
+    """Load each extraction with load_document; latency per document plus summed stage seconds"""
+    latencies = []
+    rows = 0
+    stages = {}
+
+    for path in paths:
+        # Loader output is captured for its load_run line (and shown with --verbose)
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                start = time.perf_counter()
+                simple_loader.load_document(path, use_copy=use_copy, server_ids=server_ids)
+                latencies.append(time.perf_counter() - start)
+        except Exception:
+            print(output.getvalue(), end='')
+            raise
+        if verbose:
+            print(output.getvalue(), end='')
+
+        for line in output.getvalue().splitlines():
+            if line.startswith('{"event": "load_run"'):
+                report = json.loads(line)
+                rows += report.get('rows_written', 0)
+                for name, stage in report['stages'].items():
+                    stages[name] = round(stages.get(name, 0.0) + stage['seconds'], 6)
+
+    summary = summarize(latencies, work=rows or None)
+    summary['rows'] = rows
+    summary['stage_seconds'] = {name: stages[name] for name in sorted(
+        stages, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES))}
+    return summary
+
+
+def fetch_transactions(conn, document_ids):
+    """Stored synthetic transactions in the shape reapply_rules_to_transactions reads"""
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT t.id, t.description, t.source, t.security_name AS sec_description, t.amount, t.quantity
+        FROM transactions t
+        WHERE t.document_id = ANY(%s::uuid[])
+        ORDER BY t.id
+    """, (document_ids,))
+    return cur.fetchall()
+
+
+def bench_apply_mapping_rules(conn, transactions):
+    """Classify every transaction with a cold, then a warm, rule-result cache"""
+    invalidate_rule_set()
+    rule_set = get_rule_set(conn)  # Freshly compiled - empty rule-result cache
+    rule_data = [transaction_row_to_rule_data(transaction) for transaction in transactions]
+    results = {}
+
+    for label in ('cold', 'warm'):
+        latencies = []
+        # apply_mapping_rules logs each matched rule - captured like the loader's output
+        with contextlib.redirect_stdout(io.StringIO()):
+            for transaction_data in rule_data:
+                start = time.perf_counter()
+                apply_mapping_rules(transaction_data, conn, rule_set=rule_set)
+                latencies.append(time.perf_counter() - start)
+        results[label] = summarize(latencies)
+    results['cache'] = rule_set.cache_info()
+    return results
+
+
+def bench_reapply(conn, document_ids, transaction_count, verbose):
+    """reapply_rules_to_transactions per document, row-by-row and bulk"""
+    results = {}
+    for label, bulk in (('row', False), ('bulk', True)):
+        latencies = []
+        for document_id in document_ids:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                start = time.perf_counter()
+                reapply_rules_to_transactions(conn, document_id=document_id, bulk=bulk)
+                latencies.append(time.perf_counter() - start)
+            if verbose:
+                print(output.getvalue(), end='')
+        results[label] = summarize(latencies, work=transaction_count)
+    return results
+
+
+def previous_result(results_path, config):
+    """Last recorded run with the same configuration, or None"""
+    if not results_path.exists():
+        return None
+    previous = None
+    with open(results_path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get('config') == config:
+                    previous = record
+    return previous
+
+
+def print_summary(name, summary):
+    """One line per benchmark: percentiles and throughput"""
+    if not summary.get('calls'):
+        print(f"{name:<36} (no calls)")
+        return
+    print(f"{name:<36} p50 {summary['p50_ms']:>9.3f} ms  p95 {summary['p95_ms']:>9.3f} ms  "
+          f"p99 {summary['p99_ms']:>9.3f} ms  max {summary['max_ms']:>9.3f} ms  "
+          f"{summary['per_second'] or 0:>11,.1f}/s")
+
+
+def print_comparison(current, previous):
+    """Throughput change per benchmark against a previous run"""
+    print(f"\nCompared with {previous['recorded_at']} ({previous.get('git_revision') or 'unknown revision'}):")
+    for name, summary in flatten(current['results']).items():
+        before = flatten(previous['results']).get(name)
+        if before and before.get('per_second') and summary.get('per_second'):
+            change = (summary['per_second'] / before['per_second'] - 1) * 100
+            print(f"  {name:<36} {before['per_second']:>11,.1f}/s → {summary['per_second']:>11,.1f}/s "
+                  f"({change:+.1f}%)")
+
+
+def flatten(results):
+    """{'load_document': {...}, 'apply_mapping_rules.cold': {...}, ...} - summaries only"""
+    flat = {}
+    for name, value in results.items():
+        if 'calls' in value:
+            flat[name] = value
+        else:
+            for label, summary in value.items():
+                if isinstance(summary, dict) and 'calls' in summary:
+                    flat[f"{name}.{label}"] = summary
+    return flat
+
+
+def run_benchmark(args):
+    """Generate, load, classify, reapply, clean up; returns the results record"""
+    config = {
+        'statements': args.statements,
+        'accounts': args.accounts,
+        'holdings': args.holdings,
+        'activities': args.activities,
+        'descriptions': args.descriptions,
+        'seed': args.seed,
+        'copy': args.copy,
+        'server_ids': args.server_ids,
+    }
+    simple_loader.DB_URL = args.db_url
+    account_numbers = synthetic_account_numbers(args.accounts)
+    work_dir = Path(tempfile.mkdtemp(prefix='loader_benchmark_'))
+    conn = psycopg2.connect(args.db_url, cursor_factory=RealDictCursor)
+    created = None
+
+    try:
+        check_clean(conn)
+        created = create_reference_data(conn, account_numbers, args.statements, args.seed)
+
+        # Extractions go in <work>/4extractions; load_document moves them to <work>/5loaded
+        paths = []
+        for index in range(args.statements):
+            for kind in ('activities', 'holdings'):
+                data = generate_statement(kind, account_numbers, holdings=args.holdings,
+                                          activities=args.activities, descriptions=args.descriptions,
+                                          statement_index=index, seed=args.seed)
+                paths.append(write_statement(work_dir / '4extractions', data))
+
+        print(f"Benchmarking {len(paths)} synthetic extractions "
+              f"({args.accounts} accounts × {args.activities} activities / {args.holdings} holdings)")
+        results = {'load_document': bench_load_document(paths, args.copy, args.server_ids, args.verbose)}
+
+        transactions = fetch_transactions(conn, created['document_ids'])
+        results['apply_mapping_rules'] = bench_apply_mapping_rules(conn, transactions)
+        results['reapply_rules_to_transactions'] = bench_reapply(
+            conn, created['document_ids'], len(transactions), args.verbose
+        )
+    finally:
+        conn.rollback()
+        if created is not None and not args.keep:
+            delete_reference_data(conn, created)
+        conn.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'recorded_at': datetime.now(timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'config': config,
+        'results': results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the loader and rule engine on synthetic statements")
+    parser.add_argument('--statements', type=int, default=2, help="Monthly statements (activities + holdings each)")
+    parser.add_argument('--accounts', type=int, default=2, help="Accounts per statement")
+    parser.add_argument('--holdings', type=int, default=100, help="Holdings per account")
+    parser.add_argument('--activities', type=int, default=500, help="Activity records per account")
+    parser.add_argument('--descriptions', type=int, default=200, help="Distinct securities/descriptions")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the generated statements")
+    parser.add_argument('--copy', action='store_true', help="Load with COPY instead of multi-row INSERT")
+    parser.add_argument('--server-ids', action='store_true', help="Load with database-generated row ids")
+    parser.add_argument('--db-url', default=simple_loader.DB_URL, help="Database to benchmark against")
+    parser.add_argument('--results', type=Path, default=DEFAULT_RESULTS, help=f"Results file (default: {DEFAULT_RESULTS})")
+    parser.add_argument('--compare', action='store_true', help="Compare with the previous run of the same configuration")
+    parser.add_argument('--keep', action='store_true', help="Leave the synthetic rows in the database")
+    parser.add_argument('--verbose', action='store_true', help="Show loader and reapply output")
+    args = parser.parse_args()
+
+    record = run_benchmark(args)
+    print()
+    for name, summary in flatten(record['results']).items():
+        print_summary(name, summary)
+    stages = record['results']['load_document']['stage_seconds']
+    print("load_document stages: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in stages.items()))
+
+    previous = previous_result(args.results, record['config']) if args.compare else None
+    args.results.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.results, 'a') as f:
+        f.write(json.dumps(record, default=str) + '\n')
+    print(f"\nResults appended to {args.results}")
+    if previous:
+        print_comparison(record, previous)
+    elif args.compare:
+        print("No previous run with this configuration to compare against")
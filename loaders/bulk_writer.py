@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Bulk Writer - Batched multi-row INSERTs for the loader
+
+Created: 10/18/26 3:40PM
+Updated: 10/18/26 4:35PM - Added CopyWriter: buffers serialized to in-memory CSV and streamed with COPY ... FROM STDIN
+Updated: 10/18/26 10:35PM - Optional LoadMetrics: each flush is timed under its table's stage and its rows counted
+Updated: 10/19/26 2:10AM - Optional table_names: rows queued for a table are written to another one (reload staging)
+Purpose: Replace one INSERT round trip per row with multi-row INSERTs
+
+Rows are accumulated per table and flushed with psycopg2.extras.execute_values
+once a table's buffer reaches batch_size (and on flush()). The writer never
+commits - it runs inside the caller's transaction, so load_document keeps its
+single commit per document.
+
+CopyWriter has the same interface but streams each buffer to Postgres with
+COPY ... FROM STDIN (CSV), which is the fastest path for historical backfills.
+
+Usage:
+    from bulk_writer import BulkWriter, CopyWriter
+
+    writer = BulkWriter(conn, batch_size=1000)   # or CopyWriter(conn)
+    writer.add('positions', POSITION_COLUMNS, row)
+    ...
+    writer.flush()      # before conn.commit()
+"""
+
+import io
+from datetime import date, datetime
+
+from psycopg2.extras import execute_values
+
+from load_metrics import timed
+
+# Rows buffered per table before an automatic flush
+DEFAULT_BATCH_SIZE = 1000
+
+# COPY amortizes far better, so buffer more rows per flush
+COPY_BATCH_SIZE = 50000
+
+
+class BulkWriter:
+    """Buffers rows per table and writes them as multi-row INSERTs"""
+
+    def __init__(self, conn, batch_size=DEFAULT_BATCH_SIZE, metrics=None, table_names=None):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        self.conn = conn
+        self.batch_size = batch_size
+        self.metrics = metrics  # LoadMetrics - flushes timed per table
+        self.table_names = table_names or {}  # table → table actually written (e.g. a staging table)
+        self.buffers = {}       # table → (columns, [rows])
+        self.rows_written = {}  # table → count
+        self.flushes = 0
+
+    def add(self, table, columns, row):
+        """Queue one row; flushes the table's buffer when it reaches batch_size"""
+        buffered = self.buffers.get(table)
+        if buffered is None:
+            buffered = (tuple(columns), [])
+            self.buffers[table] = buffered
+        elif buffered[0] != tuple(columns):
+            raise ValueError(f"Column list changed for table '{table}' while rows are buffered")
+
+        buffered[1].append(row)
+        if len(buffered[1]) >= self.batch_size:
+            self.flush(table)
+
+    def flush(self, table=None):
+        """Write buffered rows for one table, or for every table if none is given"""
+        tables = [table] if table is not None else list(self.buffers)
+
+        for name in tables:
+            buffered = self.buffers.get(name)
+            if not buffered or not buffered[1]:
+                continue
+            columns, rows = buffered
+            with timed(self.metrics, name):
+                self._write(self.table_names.get(name, name), columns, rows)
+            if self.metrics is not None:
+                self.metrics.count(name, len(rows))
+            self.rows_written[name] = self.rows_written.get(name, 0) + len(rows)
+            self.flushes += 1
+            rows.clear()
+
+    def _write(self, table, columns, rows):
+        """Insert rows with a single multi-row INSERT statement"""
+        cur = self.conn.cursor()
+        execute_values(
+            cur,
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+            rows,
+            page_size=len(rows)
+        )
+
+    def pending(self, table=None):
+        """Number of rows buffered but not yet written"""
+        if table is not None:
+            buffered = self.buffers.get(table)
+            return len(buffered[1]) if buffered else 0
+        return sum(len(rows) for _, rows in self.buffers.values())
+
+
+def format_csv_value(value):
+    """Render one value for COPY ... (FORMAT csv): unquoted empty is NULL, strings always quoted"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+class CopyWriter(BulkWriter):
+    """BulkWriter that streams buffered rows with COPY ... FROM STDIN instead of INSERT"""
+
+    def __init__(self, conn, batch_size=COPY_BATCH_SIZE, metrics=None, table_names=None):
+        super().__init__(conn, batch_size, metrics, table_names)
+
+    def _write(self, table, columns, rows):
+        """Serialize rows to an in-memory CSV buffer and COPY it into the table"""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(','.join(format_csv_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        cur = self.conn.cursor()
+        cur.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
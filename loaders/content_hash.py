@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Content Hash - Canonical hash of a parsed extraction without re-serializing it whole
+
+Created: 10/18/26 8:15PM
+Purpose: Replace md5(json.dumps(data, sort_keys=True).encode()) with an incremental digest
+
+The loader identifies extraction content by the md5 of the sorted-keys JSON dump.
+canonical_hash() produces exactly the same bytes, but walks the top levels of the
+structure itself (sorted object keys, array items) and dumps only the pieces below
+CANONICAL_DEPTH with the C encoder, feeding each piece straight into the digest.
+The full document string and its encoded copy are never built.
+
+Algorithms:
+- md5      compatible with documents.*_json_md5_hash (what the loader stores)
+- blake2b  16-byte digest, faster; only for hashes that are not compared with md5 values
+
+Usage:
+    from content_hash import canonical_hash
+
+    json_md5_hash = canonical_hash(data)                  # == md5(json.dumps(data, sort_keys=True))
+    digest = canonical_hash(data, algorithm='blake2b')
+
+Benchmark (largest extraction files in documents/4extractions):
+    python3 content_hash.py [paths ...] [--top 5] [--repeat 20] [--scale 1]
+"""
+
+import hashlib
+import json
+from json.encoder import encode_basestring_ascii
+
+HASH_ALGORITHMS = ('md5', 'blake2b')
+
+# Levels walked in Python; anything deeper (e.g. an account's sections) is dumped in one C call
+CANONICAL_DEPTH = 3
+
+# Members/items encoded per digest update at the last walked level
+FEED_CHUNK = 256
+
+# Reused sorted-keys encoder - same output as json.dumps(value, sort_keys=True)
+_encode = json.JSONEncoder(sort_keys=True).encode
+
+
+def new_digest(algorithm='md5'):
+    """Create a hashlib digest for one of HASH_ALGORITHMS"""
+    if algorithm == 'md5':
+        return hashlib.md5()
+    if algorithm == 'blake2b':
+        return hashlib.blake2b(digest_size=16)
+    raise ValueError(f"Unsupported hash algorithm '{algorithm}', expected one of {HASH_ALGORITHMS}")
+
+
+def _feed(update, value, depth):
+    """Feed the canonical JSON of value into update(), walking depth levels in Python"""
+    if depth > 0 and isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        update(b'{')
+        if depth == 1:
+            # Last walked level - one encoder call per chunk of members, braces stripped
+            keys = sorted(value)
+            for start in range(0, len(keys), FEED_CHUNK):
+                if start:
+                    update(b', ')
+                chunk = {key: value[key] for key in keys[start:start + FEED_CHUNK]}
+                update(_encode(chunk)[1:-1].encode())
+        else:
+            for position, key in enumerate(sorted(value)):
+                if position:
+                    update(b', ')
+                update(encode_basestring_ascii(key).encode())
+                update(b': ')
+                _feed(update, value[key], depth - 1)
+        update(b'}')
+
+    elif depth > 0 and isinstance(value, (list, tuple)):
+        update(b'[')
+        if depth == 1:
+            for start in range(0, len(value), FEED_CHUNK):
+                if start:
+                    update(b', ')
+                update(_encode(value[start:start + FEED_CHUNK])[1:-1].encode())
+        else:
+            for position, item in enumerate(value):
+                if position:
+                    update(b', ')
+                _feed(update, item, depth - 1)
+        update(b']')
+
+    else:
+        update(_encode(value).encode())
+
+
+def canonical_hash(data, algorithm='md5'):
+    """
+    Hex digest of json.dumps(data, sort_keys=True), computed incrementally
+
+    Args:
+        data: Parsed JSON (dicts, lists, scalars)
+        algorithm (str): 'md5' (loader-compatible) or 'blake2b'
+
+    Returns:
+        str: Hex digest
+    """
+    digest = new_digest(algorithm)
+    _feed(digest.update, data, CANONICAL_DEPTH)
+    return digest.hexdigest()
+
+
+def dumps_hash(data, algorithm='md5'):
+    """Reference implementation: hash of the full sorted-keys dump"""
+    digest = new_digest(algorithm)
+    digest.update(json.dumps(data, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+if __name__ == "__main__":
+    """Benchmark canonical_hash against the full json.dumps round trip"""
+    import argparse
+    import timeit
+    from pathlib import Path
+
+    default_dir = Path(__file__).resolve().parent.parent / 'documents' / '4extractions'
+
+    parser = argparse.ArgumentParser(description="Benchmark canonical content hashing")
+    parser.add_argument('paths', nargs='*', help=f"JSON files (default: largest in {default_dir})")
+    parser.add_argument('--top', type=int, default=5, help="Largest files to use from the default directory")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed runs per method")
+    parser.add_argument('--scale', type=int, default=1,
+                        help="Replicate each file's accounts N times to simulate multi-year extractions")
+    args = parser.parse_args()
+
+    def is_extraction(path):
+        """Loader extractions only (accounts array) - other 4extractions JSON is never hashed"""
+        try:
+            with open(path) as f:
+                return isinstance(json.load(f).get('accounts'), list)
+        except (ValueError, AttributeError):
+            return False
+
+    paths = [Path(p) for p in args.paths] or sorted(
+        (p for p in default_dir.glob('*.json') if is_extraction(p)),
+        key=lambda p: p.stat().st_size, reverse=True
+    )[:args.top]
+
+    methods = [
+        ('dumps+md5', lambda d: dumps_hash(d, 'md5')),
+        ('canonical md5', lambda d: canonical_hash(d, 'md5')),
+        ('dumps+blake2b', lambda d: dumps_hash(d, 'blake2b')),
+        ('canonical blake2b', lambda d: canonical_hash(d, 'blake2b')),
+    ]
+
+    print(f"{'File':<60} {'MB':>6} " + " ".join(f"{name:>18}" for name, _ in methods))
+    totals = [0.0] * len(methods)
+
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        if args.scale > 1 and isinstance(data, dict) and isinstance(data.get('accounts'), list):
+            data['accounts'] = data['accounts'] * args.scale
+
+        for algorithm in HASH_ALGORITHMS:
+            assert canonical_hash(data, algorithm) == dumps_hash(data, algorithm), f"{path}: {algorithm} mismatch"
+
+        size_mb = len(json.dumps(data, sort_keys=True)) / 1_000_000
+        timings = []
+        for index, (_, method) in enumerate(methods):
+            seconds = min(timeit.repeat(lambda: method(data), number=1, repeat=args.repeat))
+            totals[index] += seconds
+            timings.append(seconds)
+
+        print(f"{path.name[:60]:<60} {size_mb:>6.2f} " + " ".join(f"{t * 1000:>15.2f} ms" for t in timings))
+
+    print(f"{'Total (best of ' + str(args.repeat) + ')':<60} {'':>6} " +
+          " ".join(f"{t * 1000:>15.2f} ms" for t in totals))
+    print("OK: canonical hashes identical to json.dumps(sort_keys=True) hashes")
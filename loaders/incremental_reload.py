@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Incremental Reload - Apply a changed extraction as row differences
+
+Created: 10/19/26 2:10AM
+Updated: 10/19/26 6:05AM - Every table the extraction writes is reloaded; NULL account_id rows pair;
+  links of dropped accounts removed; rule-derived columns left out of the fingerprint
+Updated: 10/19/26 7:05AM - Dropped accounts lose their rows in every loaded table, not only the owned one
+Purpose: Correct an already loaded statement without deleting and reloading all of it
+
+In reload mode (simple_loader --reload) a changed extraction no longer fails with
+DUPLICATE DATA CONFLICT. Its rows are built exactly as for a normal load but written
+to temporary staging tables (reload_<table>, dropped at commit), then compared with
+what is stored for the document:
+
+1. Row fingerprint: md5 of the row's content columns (every loaded column but id and
+   the rule-derived RULE_COLUMNS), computed by Postgres on both sides so stored and
+   staged values compare as stored.
+2. Account fingerprint: md5 of an account's sorted row fingerprints. Accounts whose
+   fingerprints match are left alone. Rows without an account (account_id NULL) are
+   compared as one more account.
+3. For changed accounts, rows are matched as multisets (identical rows paired by
+   occurrence); unmatched stored rows are deleted, unmatched staged rows inserted.
+4. Accounts that had rows in the owned table but have none staged (dropped from the
+   corrected JSON) lose their rows in every loaded table and their document_accounts link.
+
+Classification columns (sec_type/sec_subtype, transaction_type/...) follow the mapping
+rules, not the statement, so a rules change alone does not make rows look changed: kept
+rows keep their stored classification and inserted rows get the current rules. Run
+reapply_rules_to_positions / reapply_rules_to_transactions after a rules change.
+
+Everything runs in the load's transaction, so a reload is applied completely or not at all.
+
+Tables:
+- positions / transactions  owned by the holdings / activities extraction: compared
+                            for the whole document (an account dropped from the
+                            corrected JSON loses its rows)
+- doc_level_data and any   compared only for accounts the extraction has rows for,
+  other table written       plus dropped accounts (e.g. transactions from a holdings
+                            extraction that carries activity sections)
+
+Usage:
+    from incremental_reload import create_staging_tables, apply_reload, staging_tables
+
+    create_staging_tables(conn, tables)
+    writer = BulkWriter(conn, table_names=staging_tables(tables))
+    ...                           # build and queue rows as usual
+    writer.flush()
+    stats = apply_reload(conn, doc_id, extraction_type, {table: columns, ...})
+    conn.commit()
+    for key in stats['unlinked']:
+        refs.document_links.discard(key)
+"""
+
+from mapping_rules_engine import POSITION_RULE_COLUMNS, TRANSACTION_RULE_COLUMNS
+
+# Table whose rows belong to one extraction type - compared for the whole document
+OWNED_TABLES = {
+    'holdings': 'positions',
+    'activities': 'transactions',
+}
+
+# Columns set by the mapping rules - not part of the row fingerprint
+RULE_COLUMNS = {
+    'positions': POSITION_RULE_COLUMNS,
+    'transactions': TRANSACTION_RULE_COLUMNS,
+}
+
+# Account key that also pairs rows without an account (NULL = NULL)
+ACCOUNT_KEY = "COALESCE(account_id::text, '')"
+
+
+def staging_table(table):
+    """Name of the temporary staging table for a loaded table"""
+    return f"reload_{table}"
+
+
+def staging_tables(tables):
+    """{table: staging table} for BulkWriter(table_names=...)"""
+    return {table: staging_table(table) for table in tables}
+
+
+def create_staging_tables(conn, tables):
+    """Create empty staging tables shaped like the loaded tables, dropped at commit or rollback"""
+    cur = conn.cursor()
+    for table in tables:
+        cur.execute(f"""
+            CREATE TEMP TABLE {staging_table(table)} (LIKE {table} INCLUDING DEFAULTS)
+            ON COMMIT DROP
+        """)
+
+
+def fingerprint(table, columns):
+    """SQL expression: md5 of a row's content columns (id and rule-derived columns excluded)"""
+    excluded = ('id',) + RULE_COLUMNS.get(table, ())
+    return f"md5(ROW({', '.join(column for column in columns if column not in excluded)})::text)"
+
+
+def reload_table(conn, doc_id, table, columns, staged_accounts_only=False, dropped_accounts=()):
+    """
+    Replace one table's rows for a document with the staged rows, touching only differences
+
+    With staged_accounts_only, stored rows are compared only for accounts that have staged
+    rows or are in dropped_accounts (whose stored rows are then all removed).
+
+    Returns:
+        dict: accounts, changed_accounts, inserted, removed
+    """
+    staged = staging_table(table)
+    content = [column for column in columns if column != 'id']
+    scope = (f"AND ({ACCOUNT_KEY} IN (SELECT {ACCOUNT_KEY} FROM {staged}) OR account_id::text = ANY(%(dropped)s))"
+             if staged_accounts_only else "")
+    cur = conn.cursor()
+
+    # Fingerprints for both sides, and the accounts whose rows differ
+    cur.execute(f"""
+        CREATE TEMP TABLE reload_stored ON COMMIT DROP AS
+        SELECT id, {ACCOUNT_KEY} AS account_key, {fingerprint(table, columns)} AS fingerprint
+        FROM {table}
+        WHERE document_id = %(doc_id)s {scope};
+
+        CREATE TEMP TABLE reload_new ON COMMIT DROP AS
+        SELECT ctid AS row_ref, {ACCOUNT_KEY} AS account_key, {fingerprint(table, columns)} AS fingerprint
+        FROM {staged};
+
+        CREATE TEMP TABLE reload_changed ON COMMIT DROP AS
+        SELECT account_key
+        FROM (
+            SELECT account_key, md5(string_agg(fingerprint, ',' ORDER BY fingerprint)) AS account_fingerprint
+            FROM reload_stored GROUP BY account_key
+        ) stored
+        FULL JOIN (
+            SELECT account_key, md5(string_agg(fingerprint, ',' ORDER BY fingerprint)) AS account_fingerprint
+            FROM reload_new GROUP BY account_key
+        ) new USING (account_key)
+        WHERE stored.account_fingerprint IS DISTINCT FROM new.account_fingerprint;
+    """, {'doc_id': doc_id, 'dropped': list(dropped_accounts)})
+
+    cur.execute("""
+        SELECT
+            (SELECT count(*) FROM (
+                SELECT account_key FROM reload_stored UNION SELECT account_key FROM reload_new
+            ) accounts) AS accounts,
+            (SELECT count(*) FROM reload_changed) AS changed_accounts
+    """)
+    stats = dict(cur.fetchone())
+    stats.update(inserted=0, removed=0)
+
+    if stats['changed_accounts']:
+        # Pair identical rows by occurrence so duplicates are kept or removed one for one
+        cur.execute("""
+            CREATE TEMP TABLE reload_diff ON COMMIT DROP AS
+            SELECT stored.id, new.row_ref
+            FROM (
+                SELECT id, account_key, fingerprint,
+                       row_number() OVER (PARTITION BY account_key, fingerprint) AS occurrence
+                FROM reload_stored
+                WHERE account_key IN (SELECT account_key FROM reload_changed)
+            ) stored
+            FULL JOIN (
+                SELECT row_ref, account_key, fingerprint,
+                       row_number() OVER (PARTITION BY account_key, fingerprint) AS occurrence
+                FROM reload_new
+                WHERE account_key IN (SELECT account_key FROM reload_changed)
+            ) new USING (account_key, fingerprint, occurrence)
+            WHERE stored.id IS NULL OR new.row_ref IS NULL
+        """)
+        cur.execute(f"""
+            DELETE FROM {table}
+            WHERE id IN (SELECT id FROM reload_diff WHERE row_ref IS NULL)
+        """)
+        stats['removed'] = cur.rowcount
+        cur.execute(f"""
+            INSERT INTO {table} ({', '.join(content)})
+            SELECT {', '.join(content)} FROM {staged}
+            WHERE ctid IN (SELECT row_ref FROM reload_diff WHERE id IS NULL)
+        """)
+        stats['inserted'] = cur.rowcount
+        cur.execute("DROP TABLE reload_diff")
+
+    cur.execute("DROP TABLE reload_stored, reload_new, reload_changed")
+    return stats
+
+
+def drop_account_links(conn, doc_id, tables, dropped_accounts):
+    """
+    Delete document_accounts links of dropped accounts (once apply_reload has removed their rows)
+
+    Returns:
+        list: (document_id, account_id) keys removed, as in ReferenceCache.document_links
+    """
+    if not dropped_accounts:
+        return []
+    still_loaded = " ".join(
+        f"AND NOT EXISTS (SELECT 1 FROM {table} t WHERE t.document_id = da.document_id AND t.account_id = da.account_id)"
+        for table in tables
+    )
+    cur = conn.cursor()
+    cur.execute(f"""
+        DELETE FROM document_accounts da
+        WHERE da.document_id = %s AND da.account_id = ANY(%s::uuid[])
+        {still_loaded}
+        RETURNING da.document_id, da.account_id
+    """, (doc_id, dropped_accounts))
+    return [(str(row['document_id']), str(row['account_id'])) for row in cur.fetchall()]
+
+
+def apply_reload(conn, doc_id, extraction_type, table_columns):
+    """
+    Apply the staged rows of every table in table_columns to the document
+
+    The extraction's owned table is compared for the whole document, every other
+    table for the accounts staged in it and the dropped accounts - accounts with
+    stored owned rows but nothing staged, which lose their rows everywhere.
+
+    Args:
+        table_columns: {table: column list} for the tables that were staged
+
+    Returns:
+        dict: table → reload_table() stats, plus 'unlinked' - the document_accounts
+              keys removed (discard them from ReferenceCache.document_links after commit)
+    """
+    owned = OWNED_TABLES.get(extraction_type)
+    if owned not in table_columns:
+        raise ValueError(f"Cannot reload a {extraction_type} extraction without staged {owned}")
+
+    # Accounts with owned rows stored for the document but nothing staged in any table
+    not_staged = " ".join(
+        f"AND NOT EXISTS (SELECT 1 FROM {staging_table(table)} s WHERE s.account_id = t.account_id)"
+        for table in table_columns
+    )
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT DISTINCT t.account_id::text AS account_id FROM {owned} t
+        WHERE t.document_id = %s AND t.account_id IS NOT NULL {not_staged}
+    """, (doc_id,))
+    dropped_accounts = [row['account_id'] for row in cur.fetchall()]
+
+    results = {}
+    for table, columns in table_columns.items():
+        results[table] = reload_table(conn, doc_id, table, columns, staged_accounts_only=table != owned,
+                                      dropped_accounts=dropped_accounts)
+        stats = results[table]
+        print(f"  Reloaded {table}: {stats['changed_accounts']} of {stats['accounts']} accounts changed, "
+              f"{stats['inserted']} rows inserted, {stats['removed']} removed")
+
+    results['unlinked'] = drop_account_links(conn, doc_id, table_columns, dropped_accounts)
+    if results['unlinked']:
+        print(f"  Unlinked {len(results['unlinked'])} accounts no longer in the extraction")
+    return results
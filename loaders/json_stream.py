@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+JSON Stream - Incremental reading of very large extraction files
+
+Created: 10/18/26 7:10PM
+Purpose: Load extractions without materializing the whole document (json.load + json.dumps)
+
+Two streaming passes over the file, each holding one record at a time:
+
+1. scan_extraction() computes the content hash and collects the small header
+   (extraction_metadata, document_data, the keys present in each account).
+   The hash is byte-for-byte md5(json.dumps(data, sort_keys=True)), so it matches
+   hashes recorded by the regular loader: object members are serialized into
+   spool files (in memory until SPOOL_MAX_CHARS, then on disk) and assembled in
+   sorted key order; records below account level are dumped one at a time.
+
+2. iter_account_records() walks accounts[*] and yields each holdings/activity
+   record as soon as it is parsed, with the account's scalar fields and summaries.
+
+Requires the optional ijson package (pip install ijson).
+
+Usage:
+    from json_stream import scan_extraction, iter_account_records
+
+    header = scan_extraction(json_path)
+    for event, index, fields, section, record in iter_account_records(json_path, sections):
+        ...
+"""
+
+import hashlib
+import json
+import shutil
+from tempfile import SpooledTemporaryFile
+
+try:
+    import ijson
+except ImportError:  # Optional - only needed for streaming mode
+    ijson = None
+
+# Serialized member size kept in memory before a spool moves to disk
+SPOOL_MAX_CHARS = 8 * 1024 * 1024
+
+# Array items serialized per write (keeps spool writes few without holding a whole section)
+ARRAY_WRITE_CHUNK = 1000
+
+
+def require_ijson():
+    """Fail with a clear message when streaming mode is used without ijson"""
+    if ijson is None:
+        raise ValueError("Streaming mode requires the ijson package (pip install ijson)")
+
+
+def _parse(f):
+    """ijson event stream; floats as float so values serialize exactly like json.load output"""
+    return ijson.parse(f, use_float=True)
+
+
+def _build(events, first):
+    """Materialize one (small) value starting at event first"""
+    _, event, value = first
+    if event not in ('start_map', 'start_array'):
+        return value
+
+    builder = ijson.ObjectBuilder()
+    builder.event(event, value)
+    depth = 1
+    while depth:
+        _, event, value = next(events)
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+    return builder.value
+
+
+class _HashWriter:
+    """File-like sink feeding written text into an md5 digest"""
+
+    def __init__(self):
+        self.digest = hashlib.md5()
+
+    def write(self, text):
+        self.digest.update(text.encode())
+
+
+def _write_canonical(events, first, out, spool_depth):
+    """
+    Write one value as json.dumps(value, sort_keys=True) would
+
+    Objects within spool_depth levels are streamed member by member into spools and
+    assembled in sorted key order; arrays are streamed item by item (written in
+    chunks of ARRAY_WRITE_CHUNK items); deeper objects are small enough to build
+    and dump directly.
+    """
+    _, event, value = first
+
+    if event == 'start_map' and spool_depth > 0:
+        members = []
+        for _, event, key in events:
+            if event == 'end_map':
+                break
+            spool = SpooledTemporaryFile(max_size=SPOOL_MAX_CHARS, mode='w+')
+            _write_canonical(events, next(events), spool, spool_depth - 1)
+            members.append((key, spool))
+
+        members.sort(key=lambda member: member[0])
+        out.write('{')
+        for position, (key, spool) in enumerate(members):
+            if position:
+                out.write(', ')
+            out.write(json.dumps(key))
+            out.write(': ')
+            spool.seek(0)
+            shutil.copyfileobj(spool, out)
+            spool.close()
+        out.write('}')
+
+    elif event == 'start_array':
+        out.write('[')
+        chunk = []
+        first_item = True
+        for item in events:
+            if item[1] == 'end_array':
+                break
+            if item[1] == 'start_map' and spool_depth > 0:
+                # Spooled object - flush buffered items first to keep order
+                if chunk:
+                    out.write(', '.join(chunk))
+                    chunk = []
+                if not first_item:
+                    out.write(', ')
+                _write_canonical(events, item, out, spool_depth)
+            else:
+                if not first_item and not chunk:
+                    out.write(', ')
+                chunk.append(json.dumps(_build(events, item), sort_keys=True))
+                if len(chunk) >= ARRAY_WRITE_CHUNK:
+                    out.write(', '.join(chunk))
+                    chunk = []
+            first_item = False
+        if chunk:
+            out.write(', '.join(chunk))
+        out.write(']')
+
+    else:
+        out.write(json.dumps(_build(events, first), sort_keys=True))
+
+
+def _observe_account_keys(events, account_keys):
+    """Pass events through, recording the member names of every accounts[*] object"""
+    for prefix, event, value in events:
+        if prefix == 'accounts.item':
+            if event == 'start_map':
+                account_keys.append(set())
+            elif event == 'map_key':
+                account_keys[-1].add(value)
+        yield prefix, event, value
+
+
+def scan_extraction(json_path):
+    """
+    First pass: stable content hash plus the document header
+
+    Returns:
+        dict: json_md5_hash, header {top-level key: value for everything except accounts},
+              account_keys [set of member names per account]
+    """
+    require_ijson()
+
+    header = {}
+    account_keys = []
+    members = []
+
+    with open(json_path, 'rb') as f:
+        events = _parse(f)
+        _, event, _ = next(events)
+        if event != 'start_map':
+            raise ValueError("Extraction JSON must be an object at the top level")
+
+        for _, event, key in events:
+            if event == 'end_map':
+                break
+            first = next(events)
+
+            if key == 'accounts':
+                # Accounts are spooled: each account's members, each section's records
+                spool = SpooledTemporaryFile(max_size=SPOOL_MAX_CHARS, mode='w+')
+                _write_canonical(_observe_account_keys(events, account_keys), first, spool, spool_depth=1)
+                members.append((key, spool))
+            else:
+                header[key] = _build(events, first)
+                members.append((key, json.dumps(header[key], sort_keys=True)))
+
+    members.sort(key=lambda member: member[0])
+    sink = _HashWriter()
+    sink.write('{')
+    for position, (key, serialized) in enumerate(members):
+        if position:
+            sink.write(', ')
+        sink.write(json.dumps(key))
+        sink.write(': ')
+        if isinstance(serialized, str):
+            sink.write(serialized)
+        else:
+            serialized.seek(0)
+            shutil.copyfileobj(serialized, sink)
+            serialized.close()
+    sink.write('}')
+
+    return {
+        'json_md5_hash': sink.digest.hexdigest(),
+        'header': header,
+        'account_keys': account_keys,
+    }
+
+
+def iter_account_records(json_path, sections):
+    """
+    Second pass: yield accounts[*] records one at a time
+
+    Members named in sections are streamed record by record; every other account
+    member (account_number, summaries, ...) is collected into the fields dict.
+    Records parsed before account_number are held back until it is seen.
+
+    Yields:
+        ('record', account_index, fields, section_name, record) for each record
+        ('account_end', account_index, fields, None, None) after each account
+    """
+    require_ijson()
+
+    with open(json_path, 'rb') as f:
+        events = _parse(f)
+        account_index = -1
+
+        for prefix, event, _ in events:
+            if prefix != 'accounts.item' or event != 'start_map':
+                continue
+
+            account_index += 1
+            fields = {}
+            pending = []
+
+            for _, event, key in events:
+                if event == 'end_map':
+                    break
+                first = next(events)
+
+                if key in sections and first[1] == 'start_array':
+                    fields[key] = []  # Present (streamed) - records are not kept
+                    for item in events:
+                        if item[1] == 'end_array':
+                            break
+                        record = _build(events, item)
+                        if 'account_number' in fields:
+                            yield 'record', account_index, fields, key, record
+                        else:
+                            pending.append((key, record))
+                else:
+                    fields[key] = _build(events, first)
+                    if key == 'account_number' and pending:
+                        for section_name, record in pending:
+                            yield 'record', account_index, fields, section_name, record
+                        pending = []
+
+            for section_name, record in pending:
+                yield 'record', account_index, fields, section_name, record
+            yield 'account_end', account_index, fields, None, None
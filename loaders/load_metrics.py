@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Load Metrics - Per-stage wall time and row counts for one loaded document
+
+Created: 10/18/26 10:35PM
+Updated: 10/19/26 2:10AM - 'reload' stage (incremental_reload.apply_reload in --reload mode)
+Updated: 10/19/26 6:10AM - load_runs comes from a migration (LOAD_RUNS_MIGRATION) instead of being created
+  at runtime; require_load_runs_table() fails --record-runs up front when it is missing
+Purpose: Show where load time goes (parsing, hashing, lookups, rules, inserts, commit)
+
+Stages are exclusive: entering a stage inside another pauses the outer one, so
+rule classification timed inside row building is not counted twice and the stage
+times add up to the instrumented part of the load.
+
+Stages recorded by the loader:
+- parse           json.load (or streamed record parsing in --stream mode)
+- hash            content hash (in --stream mode: the scan pass, which also reads the header)
+- references      institution/account lookups and document_accounts links
+- document        move to 5loaded + documents row (create or update)
+- rules           mapping rule classification
+- positions       position row building and INSERT/COPY
+- transactions    transaction row building and INSERT/COPY
+- doc_level_data  summary row building and INSERT/COPY
+- reload          --reload mode: comparing staged rows with stored ones and applying the difference
+- commit          the final COMMIT (buffers flushed just before it count toward their table)
+
+Each document produces one JSON line (to_json()); record_load_run() also stores it
+in the load_runs table (LOAD_RUNS_MIGRATION).
+
+Usage:
+    from load_metrics import LoadMetrics, timed
+
+    metrics = LoadMetrics()
+    with metrics.stage('parse'):
+        data = json.load(f)
+    with timed(metrics, 'rules'):       # metrics may be None
+        ...
+    metrics.count('positions', 12)
+    print(metrics.to_json(json_path=..., status='loaded'))
+"""
+
+import json
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from psycopg2.extras import Json
+
+# Migration that creates the load_runs table
+LOAD_RUNS_MIGRATION = 'supabase/migrations/20261019061000_create_load_runs.sql'
+
+# Stage names in report order (stages recorded under other names are appended)
+STAGES = (
+    'parse', 'hash', 'references', 'document', 'rules',
+    'positions', 'transactions', 'doc_level_data', 'reload', 'commit',
+)
+
+
+class LoadMetrics:
+    """Exclusive per-stage timers and row counters for one document"""
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.seconds = {}   # stage → wall seconds
+        self.calls = {}     # stage → times entered
+        self.rows = {}      # stage → rows produced
+        self.external_seconds = 0.0
+        self._active = []   # [stage, resumed_at] stack
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block under name, pausing the enclosing stage while it runs"""
+        if self._active and self._active[-1][0] == name:
+            # Already timing this stage (e.g. a positions flush inside load_positions)
+            yield self
+            return
+
+        now = time.perf_counter()
+        if self._active:
+            outer = self._active[-1]
+            self.seconds[outer[0]] = self.seconds.get(outer[0], 0.0) + now - outer[1]
+        entry = [name, now]
+        self._active.append(entry)
+        try:
+            yield self
+        finally:
+            now = time.perf_counter()
+            self._active.pop()
+            self.seconds[name] = self.seconds.get(name, 0.0) + now - entry[1]
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if self._active:
+                self._active[-1][1] = now
+
+    def add_seconds(self, name, seconds):
+        """Record time measured before these metrics existed (e.g. parsing in a batch worker process)"""
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.external_seconds += seconds
+
+    def count(self, name, rows):
+        """Add rows produced by a stage"""
+        self.rows[name] = self.rows.get(name, 0) + rows
+
+    def elapsed(self):
+        """Wall seconds since the metrics were created, plus time added with add_seconds"""
+        return time.perf_counter() - self.start + self.external_seconds
+
+    def stages(self):
+        """{stage: {seconds, calls, rows}} in STAGES order"""
+        names = [name for name in STAGES if name in self.seconds or name in self.rows]
+        names += [name for name in self.seconds if name not in STAGES]
+        return {
+            name: {
+                'seconds': round(self.seconds.get(name, 0.0), 6),
+                'calls': self.calls.get(name, 0),
+                'rows': self.rows.get(name, 0),
+            }
+            for name in names
+        }
+
+    def report(self, **fields):
+        """Structured record for one document: given fields plus timing totals and stages"""
+        return {
+            'event': 'load_run',
+            **fields,
+            'started_at': self.started_at.isoformat(),
+            'total_seconds': round(self.elapsed(), 6),
+            'stages': self.stages(),
+        }
+
+    def to_json(self, **fields):
+        """One-line JSON form of report()"""
+        return json.dumps(self.report(**fields), default=str)
+
+
+def timed(metrics, name):
+    """metrics.stage(name), or a no-op context when metrics is None"""
+    if metrics is None:
+        return nullcontext()
+    return metrics.stage(name)
+
+
+def require_load_runs_table(conn):
+    """
+    Check that the load_runs table exists before any run is recorded
+
+    Raises:
+        ValueError: load_runs is missing (the migration has not been applied)
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass('load_runs') IS NOT NULL AS present")
+    present = cur.fetchone()['present']
+    conn.rollback()
+    if not present:
+        raise ValueError(f"load_runs table not found - apply {LOAD_RUNS_MIGRATION} "
+                         f"(supabase migration up) before using --record-runs")
+
+
+def record_load_run(conn, report):
+    """Insert one report() record into load_runs and commit it"""
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO load_runs (
+            id, document_id, json_path, json_md5_hash, extraction_type, status, mode,
+            started_at, total_seconds, rows_written, stages, error
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, (
+        str(uuid.uuid4()),
+        report.get('document_id'),
+        report['json_path'],
+        report.get('json_md5_hash'),
+        report.get('extraction_type'),
+        report['status'],
+        report.get('mode'),
+        report['started_at'],
+        report['total_seconds'],
+        report.get('rows_written', 0),
+        Json(report['stages']),
+        report.get('error'),
+    ))
+    conn.commit()
@@ -4,6 +4,31 @@ Mapping Rules Engine - Transaction Classification System
 
 Created: 09/24/25 3:21PM
 Updated: 09/25/25 5:05PM - Added Custom Rules category to rule query filter, added activities.transaction field support
+Updated: 10/18/26 9:10AM - Added CompiledRuleSet: rules/conditions/actions loaded with three bulk queries,
+  compiled into predicates and reused across rows, with version fingerprint + invalidate() for rule edits
+Updated: 10/18/26 10:05AM - CompiledRuleSet.classify() scans each field once with a per-field multi-pattern
+  matcher (Aho-Corasick for contains, prefix trie for starts_with, hash map for equals) and evaluates
+  rules as bitset combinations of the matched condition ids
+Updated: 10/18/26 11:20AM - Added bulk reapply mode: keyset-paged batches classified in memory, only changed
+  rows written through a temp table + single UPDATE ... FROM per batch, per-batch timing/row counts
+Updated: 10/18/26 12:40PM - Added SQL rule compiler: map_rules translated into one set-based
+  UPDATE transactions SET ... = CASE ... END (last-write-wins by application_order) executed in Postgres,
+  with a verification mode diffing SQL results against the Python evaluator on a sample
+Updated: 10/18/26 1:55PM - Implemented reapply_rules_to_positions: server-side named cursor streams positions
+  in chunks (optional document/account/date-range scope), classified with the cached rule set, changed rows
+  written back in bulk per chunk
+Updated: 10/18/26 2:50PM - Added LRU result cache to CompiledRuleSet.classify() keyed on the values of the
+  fields any condition reads; dropped with the rule set on version change, hit/miss counters via cache_info()
+Updated: 10/18/26 5:20PM - classify() memo guarded by a lock so one rule set can be shared by loader threads
+Updated: 10/18/26 11:55PM - Rule queries in RULE_SET_QUERIES so other drivers (async_loader.py) can build a
+  CompiledRuleSet with from_rows()
+Updated: 10/19/26 6:20AM - reapply_rules_to_positions falls back to the statement's own sec_subtype
+  (positions.source_subtype), not the stored one; stored quantity/market values passed to rules as plain strings
+Updated: 10/19/26 8:35AM - classify() counts unmemoized misses under cache_lock too
+Updated: 10/19/26 8:45AM - Memo keyed on the field values as the matchers see them (str, None kept), so 100 and
+  '100' share an entry and every key is hashable
+Updated: 10/19/26 9:00AM - thread_cache_info(): hit/miss counters of the calling thread, so a loader thread can
+  report one document's figures while other threads classify with the same rule set
 Purpose: Reusable rule evaluation engine for transaction/position classification
 
 This module provides rule-based classification for financial transactions and positions
@@ -14,38 +39,75 @@ Key Features:
 - Supports multiple operators: contains, equals, starts_with
 - Handles field name translation (activities.* to database columns)
 - Rule priority system via application_order
+- Compiled in-memory rule set (no per-row rule queries), refreshed when rules change
 - Reusable by loader, UI application, and batch processors
 
 Usage:
-    from mapping_rules_engine import apply_mapping_rules, reapply_rules_to_transactions
+    from mapping_rules_engine import apply_mapping_rules, get_rule_set, reapply_rules_to_transactions
 
-    # During loading
-    field_updates = apply_mapping_rules(transaction_data, conn)
+    # During loading - compile rules once per document, reuse for every row
+    rule_set = get_rule_set(conn)
+    field_updates = apply_mapping_rules(transaction_data, conn, rule_set=rule_set)
+
+    # After editing map_rules/map_conditions/map_actions in the same process
+    invalidate_rule_set()
 
     # After rule changes (UI "Apply Rules" button)
     updated_count = reapply_rules_to_transactions(conn)
+
+    # Same, set-based: batched classification, only changed rows written
+    updated_count = reapply_rules_to_transactions(conn, bulk=True)
+
+    # Entirely inside Postgres, verified against the Python evaluator first
+    updated_count = reapply_rules_sql(conn, verify_sample=500)
 """
 
+import threading
+import time
+from collections import OrderedDict
+
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+
+from pattern_matcher import FieldMatcher
+
+
+# Rule field name → (transaction_data key, stringify value)
+FIELD_SOURCES = {
+    'activities.description': ('description', False),
+    'activities.transaction': ('transaction', False),
+    'activities.section': ('section', False),
+    'activities.source': ('source', False),
+    'activities.security': ('sec_description', False),
+    'activities.amount': ('amount', True),
+    'activities.quantity': ('quantity', True),
+    # Add positions support for future use
+    'positions.sec_name': ('sec_name', False),
+    'positions.sec_type': ('sec_type', False),
+    'positions.market_value': ('market_value', True),
+}
 
 
 def get_field_value(field_name, transaction_data):
     """Extract field value from transaction data using activities.* notation"""
-    field_mapping = {
-        'activities.description': transaction_data.get('description', ''),
-        'activities.transaction': transaction_data.get('transaction', ''),
-        'activities.section': transaction_data.get('section', ''),
-        'activities.source': transaction_data.get('source', ''),
-        'activities.security': transaction_data.get('sec_description', ''),
-        'activities.amount': str(transaction_data.get('amount', '')),
-        'activities.quantity': str(transaction_data.get('quantity', '')),
-        # Add positions support for future use
-        'positions.sec_name': transaction_data.get('sec_name', ''),
-        'positions.sec_type': transaction_data.get('sec_type', ''),
-        'positions.market_value': str(transaction_data.get('market_value', '')),
-    }
-    return field_mapping.get(field_name, '')
+    source = FIELD_SOURCES.get(field_name)
+    if source is None:
+        return ''
+    key, stringify = source
+    value = transaction_data.get(key, '')
+    return str(value) if stringify else value
+
+
+def make_field_getter(field_name):
+    """Build a getter equivalent to get_field_value() for one field, resolved once"""
+    source = FIELD_SOURCES.get(field_name)
+    if source is None:
+        return lambda transaction_data: ''
+
+    key, stringify = source
+    if stringify:
+        return lambda transaction_data: str(transaction_data.get(key, ''))
+    return lambda transaction_data: transaction_data.get(key, '')
 
 
 def evaluate_condition(condition, transaction_data):
@@ -133,52 +195,580 @@ def translate_field_to_database_column(field_name):
     return translation_map.get(field_name, field_name)
 
 
-def apply_mapping_rules(transaction_data, conn):
+def compile_condition(condition):
+    """Compile one map_conditions row into a predicate with evaluate_condition() semantics"""
+    get_value = make_field_getter(condition['check_field'])
+    match_value = condition['match_value']
+    operator = condition['match_operator']
+
+    if operator == 'contains':
+        def predicate(transaction_data):
+            field_value = get_value(transaction_data)
+            return field_value is not None and match_value in str(field_value)
+    elif operator == 'equals' or operator == 'is':
+        def predicate(transaction_data):
+            field_value = get_value(transaction_data)
+            return field_value is not None and str(field_value) == match_value
+    elif operator == 'starts_with':
+        def predicate(transaction_data):
+            field_value = get_value(transaction_data)
+            return field_value is not None and str(field_value).startswith(match_value)
+    else:
+        # Warn once at compile time instead of on every row
+        print(f"Warning: Unknown operator '{operator}' in rule condition")
+
+        def predicate(transaction_data):
+            return False
+
+    return predicate
+
+
+def compile_rule_predicate(conditions):
+    """
+    Compile a rule's ordered conditions into a single predicate
+
+    Mirrors evaluate_rule_conditions(): conditions are folded left to right and the
+    connector stored on the previous condition joins it to the next one.
+    """
+    if not conditions:
+        return lambda transaction_data: True  # No conditions = always match
+
+    predicates = [compile_condition(condition) for condition in conditions]
+    connectors = [condition.get('logic_connector', 'AND') for condition in conditions[:-1]]
+
+    if len(predicates) == 1:
+        return predicates[0]
+
+    if all(connector == 'AND' for connector in connectors):
+        return lambda transaction_data: all(p(transaction_data) for p in predicates)
+
+    first = predicates[0]
+    rest = list(zip(connectors, predicates[1:]))
+
+    def predicate(transaction_data):
+        result = first(transaction_data)
+        for connector, condition_predicate in rest:
+            condition_result = condition_predicate(transaction_data)
+            if connector == 'AND':
+                result = result and condition_result
+            elif connector == 'OR':
+                result = result or condition_result
+        return result
+
+    return predicate
+
+
+class CompiledRule:
+    """One map_rules row with its conditions compiled and actions translated"""
+
+    __slots__ = ('id', 'rule_name', 'application_order', 'conditions', 'actions', 'matches',
+                 'condition_bits', 'connectors', 'and_mask')
+
+    def __init__(self, rule, conditions, actions):
+        self.id = rule['id']
+        self.rule_name = rule['rule_name']
+        self.application_order = rule['application_order']
+        self.conditions = conditions
+        # (database column, value) pairs in map_actions id order
+        self.actions = [
+            (translate_field_to_database_column(action['set_field']), action['set_value'])
+            for action in actions
+        ]
+        self.matches = compile_rule_predicate(conditions)
+        # Filled in by CompiledRuleSet when it indexes the conditions
+        self.condition_bits = []
+        self.connectors = [condition.get('logic_connector', 'AND') for condition in conditions[:-1]]
+        self.and_mask = None
+
+    def matches_hits(self, hits):
+        """Evaluate the rule from a bitset of matched condition ids (same fold as matches())"""
+        if self.and_mask is not None:
+            return hits & self.and_mask == self.and_mask
+
+        bits = self.condition_bits
+        result = bool(hits & bits[0])
+        for connector, bit in zip(self.connectors, bits[1:]):
+            condition_result = bool(hits & bit)
+            if connector == 'AND':
+                result = result and condition_result
+            elif connector == 'OR':
+                result = result or condition_result
+        return result
+
+
+# Single query fingerprinting the full content of the three rule tables
+RULE_SET_VERSION_QUERY = """
+    SELECT md5(
+        coalesce((SELECT string_agg(id::text || ':' || application_order || ':' || rule_name,
+                                    ',' ORDER BY id) FROM map_rules), '') || '|' ||
+        coalesce((SELECT string_agg(rule_id::text || ':' || check_field || ':' || match_operator || ':' ||
+                                    match_value || ':' || coalesce(logic_connector, ''),
+                                    ',' ORDER BY id) FROM map_conditions), '') || '|' ||
+        coalesce((SELECT string_agg(rule_id::text || ':' || set_field || ':' || set_value,
+                                    ',' ORDER BY id) FROM map_actions), '')
+    ) AS version
+"""
+
+
+def get_rule_set_version(conn):
+    """Return the current fingerprint of map_rules/map_conditions/map_actions"""
+    cur = conn.cursor()
+    cur.execute(RULE_SET_VERSION_QUERY)
+    return cur.fetchone()['version']
+
+
+# map_rules, map_conditions, map_actions rows for CompiledRuleSet.from_rows()
+RULE_SET_QUERIES = (
+    """
+        SELECT id, rule_name, application_order
+        FROM map_rules
+        ORDER BY application_order
+    """,
+    """
+        SELECT rule_id, check_field, match_operator, match_value, logic_connector
+        FROM map_conditions
+        ORDER BY rule_id, id
+    """,
+    """
+        SELECT rule_id, set_field, set_value
+        FROM map_actions
+        ORDER BY rule_id, id
+    """,
+)
+
+# Distinct input tuples remembered by CompiledRuleSet.classify()
+RULE_CACHE_SIZE = 4096
+
+
+class CompiledRuleSet:
+    """
+    In-memory, precompiled snapshot of the three-table mapping rules
+
+    Loads map_rules, map_conditions and map_actions with three bulk queries and
+    compiles every rule into a callable predicate, so classifying a row needs no
+    database round trips. classify() scans each referenced field once through a
+    FieldMatcher and combines the resulting condition bits per rule.
+
+    Results are memoized in an LRU keyed on the tuple of field values the
+    conditions actually read, since the same descriptions repeat across every
+    statement. The snapshot carries a version fingerprint; use is_current() to
+    detect rule edits and invalidate() to force a reload (which also drops the
+    memo, as a new rule set starts with an empty one).
+    """
+
+    def __init__(self, rules, version=None, cache_size=RULE_CACHE_SIZE):
+        self.rules = rules
+        self.version = version
+        self.invalidated = False
+        self.field_matchers = []
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()  # Batch loading shares one rule set across threads
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.thread_counts = threading.local()  # [hits, misses] per thread, see thread_cache_info()
+        self._index_conditions()
+
+    def _index_conditions(self):
+        """Give every condition a bit and register its pattern with its field's matcher"""
+        matchers = {}
+        bit = 1
+
+        for rule in self.rules:
+            rule.condition_bits = []
+            for condition in rule.conditions:
+                field_name = condition['check_field']
+                if field_name not in matchers:
+                    matchers[field_name] = FieldMatcher()
+                # Unknown operators are never registered, so their bit never gets set
+                matchers[field_name].add(condition['match_operator'], condition['match_value'], bit)
+                rule.condition_bits.append(bit)
+                bit <<= 1
+
+            if not rule.condition_bits:
+                rule.and_mask = 0  # No conditions = always match
+            elif all(connector == 'AND' for connector in rule.connectors):
+                rule.and_mask = sum(rule.condition_bits)
+            else:
+                rule.and_mask = None
+
+        for field_name, matcher in matchers.items():
+            matcher.build()
+            self.field_matchers.append((make_field_getter(field_name), matcher))
+
+    def field_values(self, transaction_data):
+        """
+        Values of every field referenced by a condition, in matcher order (the cache key)
+
+        Stringified like match_conditions() scans them, so values that match alike share
+        one memo entry; None stays None since it never matches.
+        """
+        return tuple(None if value is None else str(value)
+                     for value in (get_value(transaction_data) for get_value, _ in self.field_matchers))
+
+    def match_conditions(self, transaction_data, field_values=None):
+        """Scan each referenced field once; returns the bitset of matched condition ids"""
+        if field_values is None:
+            field_values = self.field_values(transaction_data)
+
+        hits = 0
+        for field_value, (_, matcher) in zip(field_values, self.field_matchers):
+            # None never matches any operator
+            if field_value is not None:
+                hits |= matcher.scan(str(field_value))
+        return hits
+
+    @classmethod
+    def from_rows(cls, rule_rows, condition_rows, action_rows, version=None):
+        """Build a rule set from already-fetched map_rules/map_conditions/map_actions rows"""
+        conditions_by_rule = {}
+        for condition in condition_rows:
+            conditions_by_rule.setdefault(condition['rule_id'], []).append(condition)
+
+        actions_by_rule = {}
+        for action in action_rows:
+            actions_by_rule.setdefault(action['rule_id'], []).append(action)
+
+        rules = [
+            CompiledRule(rule, conditions_by_rule.get(rule['id'], []), actions_by_rule.get(rule['id'], []))
+            for rule in rule_rows
+        ]
+        return cls(rules, version)
+
+    @classmethod
+    def load(cls, conn):
+        """Load and compile all rules from the database"""
+        version = get_rule_set_version(conn)
+        cur = conn.cursor()
+
+        rows = []
+        for query in RULE_SET_QUERIES:
+            cur.execute(query)
+            rows.append(cur.fetchall())
+
+        return cls.from_rows(*rows, version=version)
+
+    def invalidate(self):
+        """Mark this snapshot stale so get_rule_set() reloads it"""
+        self.invalidated = True
+        self.cache.clear()
+
+    def cache_info(self):
+        """Hit/miss counters for the classify() memo"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            'size': len(self.cache),
+            'max_size': self.cache_size,
+        }
+
+    def thread_cache_info(self):
+        """Hit/miss counters for classify() calls made by the calling thread only"""
+        counts = self._thread_counts()
+        return {'hits': counts[0], 'misses': counts[1]}
+
+    def _thread_counts(self):
+        """The calling thread's [hits, misses] list"""
+        counts = getattr(self.thread_counts, 'counts', None)
+        if counts is None:
+            counts = self.thread_counts.counts = [0, 0]
+        return counts
+
+    def is_current(self, conn):
+        """True if not invalidated and the database rules still match this snapshot"""
+        if self.invalidated:
+            return False
+        return self.version == get_rule_set_version(conn)
+
+    def classify(self, transaction_data):
+        """
+        Evaluate all rules in application_order against one row
+
+        Returns:
+            tuple: (field_updates {column_name: value}, [matched rule names])
+        """
+        key = self.field_values(transaction_data)
+
+        with self.cache_lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                self.cache.move_to_end(key)
+            else:
+                self.cache_misses += 1
+        self._thread_counts()[0 if cached is not None else 1] += 1
+
+        if cached is not None:
+            field_updates, matched = cached
+            return dict(field_updates), list(matched)
+
+        field_updates, matched = self._evaluate(transaction_data, key)
+        if self.cache_size:
+            with self.cache_lock:
+                self.cache[key] = (dict(field_updates), tuple(matched))
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+
+        return field_updates, matched
+
+    def _evaluate(self, transaction_data, field_values):
+        """Evaluate all rules without consulting the memo"""
+        field_updates = {}
+        matched = []
+        hits = self.match_conditions(transaction_data, field_values)
+
+        for rule in self.rules:
+            if rule.matches_hits(hits):
+                for db_field, value in rule.actions:
+                    field_updates[db_field] = value
+                matched.append(rule.rule_name)
+
+        return field_updates, matched
+
+
+_rule_set = None
+
+
+def get_rule_set(conn, check_version=True):
+    """
+    Return the process-wide compiled rule set, reloading it when needed
+
+    Args:
+        conn: Database connection
+        check_version (bool): Compare the cached snapshot with the database
+            fingerprint (one cheap query) and reload if rules were edited
+
+    Returns:
+        CompiledRuleSet
+    """
+    global _rule_set
+
+    rule_set = _rule_set
+    if rule_set is None or rule_set.invalidated or (check_version and not rule_set.is_current(conn)):
+        rule_set = CompiledRuleSet.load(conn)
+        _rule_set = rule_set
+
+    return rule_set
+
+
+def invalidate_rule_set():
+    """Drop the cached rule set so the next get_rule_set() reloads from the database"""
+    global _rule_set
+
+    if _rule_set is not None:
+        _rule_set.invalidate()
+    _rule_set = None
+
+
+def apply_mapping_rules(transaction_data, conn, rule_set=None):
     """
     Apply all mapping rules to transaction data and return field updates
 
     Args:
         transaction_data (dict): Transaction/position data from JSON
         conn: Database connection
+        rule_set (CompiledRuleSet, optional): Precompiled rules to reuse across rows.
+            If omitted, the cached rule set is used (checked against the database version).
 
     Returns:
         dict: Field updates to apply {column_name: value}
     """
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, rule_name
-        FROM map_rules
-        ORDER BY application_order
+    if rule_set is None:
+        rule_set = get_rule_set(conn)
+
+    field_updates, matched = rule_set.classify(transaction_data)
+
+    for rule_name in matched:
+        # Log rule application for debugging
+        print(f"Applied rule: {rule_name}")
+
+    return field_updates
+
+
+# Transaction columns that rule actions are allowed to write
+TRANSACTION_RULE_COLUMNS = ('transaction_type', 'transaction_subtype', 'sec_class')
+
+# Position columns that rule actions are allowed to write (as used by load_positions)
+POSITION_RULE_COLUMNS = ('sec_type', 'sec_subtype')
+
+# Rows classified and written per batch in bulk reapply mode
+BULK_BATCH_SIZE = 5000
+
+
+def write_rule_updates(cur, table, columns, rows):
+    """
+    Write reclassified rows back in bulk
+
+    Rows (id, *column values) are staged into an ON COMMIT DELETE ROWS temp table
+    with execute_values and applied with a single UPDATE ... FROM.
+
+    Returns:
+        int: Number of rows updated
+    """
+    if not rows:
+        return 0
+
+    temp_table = f"tmp_{table}_rule_updates"
+    column_defs = ", ".join(f"{column} text" for column in columns)
+    column_list = ", ".join(columns)
+    set_clauses = ", ".join(f"{column} = u.{column}" for column in columns)
+
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {temp_table} (
+            id uuid PRIMARY KEY,
+            {column_defs}
+        ) ON COMMIT DELETE ROWS
     """)
+    execute_values(cur, f"""
+        INSERT INTO {temp_table} (id, {column_list})
+        VALUES %s
+    """, rows, page_size=len(rows))
+    cur.execute(f"""
+        UPDATE {table} t
+        SET {set_clauses}, updated_at = NOW()
+        FROM {temp_table} u
+        WHERE t.id = u.id
+    """)
+    return cur.rowcount
+
+
+def transaction_row_to_rule_data(transaction):
+    """Reconstruct rule-evaluation data from a stored transactions row"""
+    return {
+        'description': transaction['description'] or '',
+        'source': transaction['source'] or '',
+        'sec_description': transaction['sec_description'] or '',
+        'amount': transaction['amount'] or 0,
+        'quantity': transaction['quantity'] or 0,
+        'section': transaction['source'],  # Source contains section name
+    }
 
-    rules = cur.fetchall()
-    field_updates = {}
 
-    for rule in rules:
-        if evaluate_rule_conditions(rule['id'], transaction_data, conn):
-            actions = apply_rule_actions(rule['id'], conn)
+def bulk_reapply_rules_to_transactions(conn, document_id=None, batch_size=BULK_BATCH_SIZE, rule_set=None):
+    """
+    Set-based reapply of mapping rules to existing transactions
 
-            for action in actions:
-                db_field = translate_field_to_database_column(action['set_field'])
-                field_updates[db_field] = action['set_value']
+    Rows are read in keyset-paged batches (ordered by id), classified in memory with
+    the compiled rule set, and only rows whose classification actually changes are
+    written: staged into a temp table with execute_values, then applied with one
+    UPDATE ... FROM per batch. Each batch commits on its own, so no long-running
+    transaction is held across the whole history.
 
-            # Log rule application for debugging
-            print(f"Applied rule: {rule['rule_name']}")
+    Args:
+        conn: Database connection
+        document_id (optional): Limit to specific document
+        batch_size (int): Transactions classified per batch
+        rule_set (CompiledRuleSet, optional): Precompiled rules (defaults to get_rule_set)
 
-    return field_updates
+    Returns:
+        dict: {'scanned', 'updated', 'seconds', 'batches': [per-batch stats]}
+    """
+    if rule_set is None:
+        rule_set = get_rule_set(conn)
+
+    ignored_fields = sorted({
+        db_field for rule in rule_set.rules for db_field, _ in rule.actions
+        if db_field not in TRANSACTION_RULE_COLUMNS
+    })
+    if ignored_fields:
+        print(f"Warning: Bulk reapply ignores non-transaction rule fields: {', '.join(ignored_fields)}")
 
+    cur = conn.cursor()
+    stats = {'scanned': 0, 'updated': 0, 'seconds': 0.0, 'batches': []}
+    run_start = time.perf_counter()
+    last_id = None
+
+    while True:
+        batch_start = time.perf_counter()
+
+        where_clause = "WHERE t.is_archived = FALSE"
+        params = []
+        if document_id:
+            where_clause += " AND t.document_id = %s"
+            params.append(document_id)
+        if last_id is not None:
+            where_clause += " AND t.id > %s"
+            params.append(last_id)
+        params.append(batch_size)
+
+        cur.execute(f"""
+            SELECT
+                t.id,
+                t.description,
+                t.source,
+                t.security_name as sec_description,
+                t.amount,
+                t.quantity,
+                t.transaction_type,
+                t.transaction_subtype,
+                t.sec_class
+            FROM transactions t
+            {where_clause}
+            ORDER BY t.id
+            LIMIT %s
+        """, params)
+        transactions = cur.fetchall()
+        if not transactions:
+            break
+
+        changed_rows = []
+        for transaction in transactions:
+            field_updates, _ = rule_set.classify(transaction_row_to_rule_data(transaction))
+            if not field_updates:
+                continue
+
+            new_values = tuple(
+                field_updates.get(column, transaction[column]) for column in TRANSACTION_RULE_COLUMNS
+            )
+            current_values = tuple(transaction[column] for column in TRANSACTION_RULE_COLUMNS)
+            if new_values != current_values:
+                changed_rows.append((transaction['id'],) + new_values)
+
+        write_rule_updates(cur, 'transactions', TRANSACTION_RULE_COLUMNS, changed_rows)
+        conn.commit()
+
+        last_id = transactions[-1]['id']
+        batch_stats = {
+            'batch': len(stats['batches']) + 1,
+            'scanned': len(transactions),
+            'updated': len(changed_rows),
+            'seconds': round(time.perf_counter() - batch_start, 4),
+        }
+        stats['batches'].append(batch_stats)
+        stats['scanned'] += batch_stats['scanned']
+        stats['updated'] += batch_stats['updated']
+        print(f"  Batch {batch_stats['batch']}: scanned {batch_stats['scanned']}, "
+              f"updated {batch_stats['updated']} in {batch_stats['seconds'] * 1000:.0f} ms")
+
+        if len(transactions) < batch_size:
+            break
+
+    conn.commit()
+    stats['seconds'] = round(time.perf_counter() - run_start, 4)
+    print(f"Reapplied rules: {stats['updated']} of {stats['scanned']} transactions changed "
+          f"in {stats['seconds']:.2f}s")
+    return stats
 
-def reapply_rules_to_transactions(conn, document_id=None):
+
+def reapply_rules_to_transactions(conn, document_id=None, bulk=False, batch_size=BULK_BATCH_SIZE):
     """
     Reapply all mapping rules to existing transactions
 
     Args:
         conn: Database connection
         document_id (optional): Limit to specific document
+        bulk (bool): Use bulk_reapply_rules_to_transactions() - batched, set-based
+            writes of changed rows only, committed per batch
+        batch_size (int): Batch size for bulk mode
 
     Returns:
-        int: Number of transactions updated
+        int: Number of transactions updated (bulk mode: number whose values changed)
     """
+    if bulk:
+        return bulk_reapply_rules_to_transactions(conn, document_id, batch_size)['updated']
+
     cur = conn.cursor()
 
     # Build query conditions
@@ -205,19 +795,15 @@ def reapply_rules_to_transactions(conn, document_id=None):
     transactions = cur.fetchall()
     updated_count = 0
 
+    # Compile rules once for the whole reapply run
+    rule_set = get_rule_set(conn)
+
     for transaction in transactions:
         # Reconstruct transaction data for rule evaluation
-        transaction_data = {
-            'description': transaction['description'] or '',
-            'source': transaction['source'] or '',
-            'sec_description': transaction['sec_description'] or '',
-            'amount': transaction['amount'] or 0,
-            'quantity': transaction['quantity'] or 0,
-            'section': transaction['source'],  # Source contains section name
-        }
+        transaction_data = transaction_row_to_rule_data(transaction)
 
         # Apply rules and get field updates
-        field_updates = apply_mapping_rules(transaction_data, conn)
+        field_updates = apply_mapping_rules(transaction_data, conn, rule_set=rule_set)
 
         if field_updates:
             # Build UPDATE query dynamically
@@ -242,20 +828,342 @@ def reapply_rules_to_transactions(conn, document_id=None):
     return updated_count
 
 
-def reapply_rules_to_positions(conn, document_id=None):
+# Rule field name → SQL expression over a stored transactions row (alias t).
+# Mirrors transaction_row_to_rule_data(); fields not stored on transactions read as ''.
+TRANSACTION_SQL_FIELDS = {
+    'activities.description': "coalesce(t.description, '')",
+    'activities.section': "t.source",
+    'activities.source': "coalesce(t.source, '')",
+    'activities.security': "coalesce(t.security_name, '')",
+    # Python sees `amount or 0`, so zero renders as '0' rather than '0.00'
+    'activities.amount': "(CASE WHEN coalesce(t.amount, 0) = 0 THEN '0' ELSE t.amount::text END)",
+    'activities.quantity': "(CASE WHEN coalesce(t.quantity, 0) = 0 THEN '0' ELSE t.quantity::text END)",
+}
+
+
+def compile_condition_to_sql(condition):
+    """Translate one condition into a SQL boolean expression and its parameters"""
+    field_sql = TRANSACTION_SQL_FIELDS.get(condition['check_field'], "''")
+    match_value = condition['match_value']
+    operator = condition['match_operator']
+
+    if operator == 'contains':
+        return f"coalesce(strpos({field_sql}, %s) > 0, FALSE)", [match_value]
+    elif operator == 'equals' or operator == 'is':
+        return f"coalesce({field_sql} = %s, FALSE)", [match_value]
+    elif operator == 'starts_with':
+        return f"coalesce(left({field_sql}, %s) = %s, FALSE)", [len(match_value), match_value]
+    else:
+        return "FALSE", []
+
+
+def compile_rule_to_sql(rule):
+    """Translate a rule's conditions into one SQL predicate using the left-to-right connector fold"""
+    if not rule.conditions:
+        return "TRUE", []
+
+    predicate, params = compile_condition_to_sql(rule.conditions[0])
+    for connector, condition in zip(rule.connectors, rule.conditions[1:]):
+        condition_sql, condition_params = compile_condition_to_sql(condition)
+        if connector == 'AND':
+            predicate = f"({predicate} AND {condition_sql})"
+            params = params + condition_params
+        elif connector == 'OR':
+            predicate = f"({predicate} OR {condition_sql})"
+            params = params + condition_params
+
+    return predicate, params
+
+
+def compile_rules_to_sql_cases(rule_set):
+    """
+    Build one CASE expression per rule-driven transactions column
+
+    Later rules in application_order overwrite earlier ones in the Python engine, so
+    WHEN branches are emitted in reverse order: the first matching branch is the last
+    rule that sets the column. Rows no rule touches keep their current value.
+
+    Returns:
+        list: [(column, case_sql, params)] for columns that at least one rule sets
+    """
+    compiled = [(rule, compile_rule_to_sql(rule)) for rule in rule_set.rules]
+    cases = []
+
+    for column in TRANSACTION_RULE_COLUMNS:
+        branches = []
+        params = []
+        for rule, (predicate, predicate_params) in reversed(compiled):
+            values = [value for db_field, value in rule.actions if db_field == column]
+            if not values:
+                continue
+            branches.append(f"WHEN {predicate} THEN %s")
+            # Last action for the column within a rule wins, as in classify()
+            params.extend(predicate_params + [values[-1]])
+
+        if branches:
+            case_sql = "CASE " + " ".join(branches) + f" ELSE t.{column} END"
+            cases.append((column, case_sql, params))
+
+    return cases
+
+
+def compile_rules_to_sql(rule_set, document_id=None):
+    """
+    Compile the rule set into a single set-based UPDATE of transactions
+
+    Args:
+        rule_set (CompiledRuleSet): Rules to translate
+        document_id (optional): Limit to specific document
+
+    Returns:
+        tuple: (sql, params) - updates only non-archived rows whose values change
+    """
+    cases = compile_rules_to_sql_cases(rule_set)
+    if not cases:
+        return None, []
+
+    select_columns = ", ".join(f"{case_sql} AS {column}" for column, case_sql, _ in cases)
+    params = [param for _, _, case_params in cases for param in case_params]
+
+    where_clause = "WHERE t.is_archived = FALSE"
+    if document_id:
+        where_clause += " AND t.document_id = %s"
+        params.append(document_id)
+
+    set_clauses = ", ".join(f"{column} = c.{column}" for column, _, _ in cases)
+    changed = " OR ".join(f"t.{column} IS DISTINCT FROM c.{column}" for column, _, _ in cases)
+
+    sql = f"""
+        WITH classified AS (
+            SELECT t.id, {select_columns}
+            FROM transactions t
+            {where_clause}
+        )
+        UPDATE transactions t
+        SET {set_clauses}, updated_at = NOW()
+        FROM classified c
+        WHERE t.id = c.id AND ({changed})
+    """
+    return sql, params
+
+
+def verify_sql_rules(conn, sample_size=500, document_id=None, rule_set=None):
+    """
+    Diff the SQL-compiled rules against the Python evaluator on a random sample
+
+    Args:
+        conn: Database connection
+        sample_size (int): Number of transactions to compare
+        document_id (optional): Limit to specific document
+        rule_set (CompiledRuleSet, optional): Precompiled rules (defaults to get_rule_set)
+
+    Returns:
+        list: Mismatches as {'id', 'column', 'python', 'sql'} dicts (empty if identical)
+    """
+    if rule_set is None:
+        rule_set = get_rule_set(conn)
+
+    cases = compile_rules_to_sql_cases(rule_set)
+    if not cases:
+        return []
+
+    select_columns = ", ".join(f"{case_sql} AS sql_{column}" for column, case_sql, _ in cases)
+    params = [param for _, _, case_params in cases for param in case_params]
+
+    where_clause = "WHERE t.is_archived = FALSE"
+    if document_id:
+        where_clause += " AND t.document_id = %s"
+        params.append(document_id)
+    params.append(sample_size)
+
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT
+            t.id,
+            t.description,
+            t.source,
+            t.security_name as sec_description,
+            t.amount,
+            t.quantity,
+            t.transaction_type,
+            t.transaction_subtype,
+            t.sec_class,
+            {select_columns}
+        FROM transactions t
+        {where_clause}
+        ORDER BY random()
+        LIMIT %s
+    """, params)
+
+    mismatches = []
+    for transaction in cur.fetchall():
+        field_updates, _ = rule_set.classify(transaction_row_to_rule_data(transaction))
+        for column, _, _ in cases:
+            python_value = field_updates.get(column, transaction[column])
+            sql_value = transaction[f"sql_{column}"]
+            if python_value != sql_value:
+                mismatches.append({
+                    'id': transaction['id'],
+                    'column': column,
+                    'python': python_value,
+                    'sql': sql_value,
+                })
+
+    return mismatches
+
+
+def reapply_rules_sql(conn, document_id=None, verify_sample=0):
+    """
+    Reapply mapping rules to transactions entirely inside Postgres
+
+    Args:
+        conn: Database connection
+        document_id (optional): Limit to specific document
+        verify_sample (int): If > 0, first compare SQL and Python results on this many
+            sampled rows and refuse to update when they disagree
+
+    Returns:
+        int: Number of transactions whose classification changed
+    """
+    rule_set = get_rule_set(conn)
+
+    if verify_sample:
+        mismatches = verify_sql_rules(conn, verify_sample, document_id, rule_set)
+        if mismatches:
+            for mismatch in mismatches[:10]:
+                print(f"  Mismatch {mismatch['id']} {mismatch['column']}: "
+                      f"python={mismatch['python']!r} sql={mismatch['sql']!r}")
+            raise ValueError(
+                f"SQL rule compiler disagrees with Python evaluator on {len(mismatches)} value(s) - "
+                f"no transactions updated"
+            )
+
+    sql, params = compile_rules_to_sql(rule_set, document_id)
+    if sql is None:
+        return 0
+
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    updated_count = cur.rowcount
+    conn.commit()
+    return updated_count
+
+
+def stored_amount_text(value):
+    """Stored numeric as the plain string the extraction JSON carries ('' for NULL)"""
+    return format(value, 'f') if value is not None else ''
+
+
+def position_row_to_rule_data(position):
+    """Reconstruct rule-evaluation data from a stored positions row (mirrors load_positions)"""
+    # source keeps the statement's original sec_type; sec_type itself may be rule-mapped
+    original_sec_type = position['source'] or position['sec_type']
+    return {
+        'sec_description': position['sec_name'],
+        'sec_type': original_sec_type,
+        # source_subtype keeps the statement's original sec_subtype (NULL when it had none)
+        'sec_subtype': position['source_subtype'],
+        'sec_symbol': position['sec_ticker'],
+        'cusip': position['cusip'],
+        'source': original_sec_type,
+        'quantity': stored_amount_text(position['quantity']),
+        'end_market_value': stored_amount_text(position['end_market_value']),
+    }
+
+
+def reapply_rules_to_positions(conn, document_id=None, account_id=None, start_date=None, end_date=None,
+                               batch_size=BULK_BATCH_SIZE):
     """
     Reapply all mapping rules to existing positions
 
+    Positions are streamed through a server-side (named) cursor in chunks of
+    batch_size, classified with the cached rule set, and rows whose sec_type or
+    sec_subtype change are written back in bulk. Each chunk commits on its own;
+    the cursor is declared WITH HOLD so it survives those commits.
+
     Args:
         conn: Database connection
         document_id (optional): Limit to specific document
+        account_id (optional): Limit to specific account
+        start_date (optional): Only positions with position_date >= start_date
+        end_date (optional): Only positions with position_date <= end_date
+        batch_size (int): Positions fetched and written per chunk
 
     Returns:
         int: Number of positions updated
     """
-    # Similar to reapply_rules_to_transactions but for positions table
-    # Implementation placeholder for when position rules are added
-    return 0
+    rule_set = get_rule_set(conn)
+
+    conditions = []
+    params = []
+    if document_id:
+        conditions.append("p.document_id = %s")
+        params.append(document_id)
+    if account_id:
+        conditions.append("p.account_id = %s")
+        params.append(account_id)
+    if start_date:
+        conditions.append("p.position_date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("p.position_date <= %s")
+        params.append(end_date)
+    where_clause = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    stream = conn.cursor(name='reapply_rules_to_positions', withhold=True)
+    stream.itersize = batch_size
+    stream.execute(f"""
+        SELECT
+            p.id,
+            p.sec_name,
+            p.sec_type,
+            p.sec_subtype,
+            p.source_subtype,
+            p.sec_ticker,
+            p.cusip,
+            p.source,
+            p.quantity,
+            p.end_market_value
+        FROM positions p
+        {where_clause}
+    """, params)
+
+    cur = conn.cursor()
+    updated_count = 0
+    batch_number = 0
+
+    try:
+        while True:
+            batch_start = time.perf_counter()
+            positions = stream.fetchmany(batch_size)
+            if not positions:
+                break
+
+            changed_rows = []
+            for position in positions:
+                position_data = position_row_to_rule_data(position)
+                field_updates, _ = rule_set.classify(position_data)
+
+                # Same fallback as load_positions: rule result or the statement's own value
+                new_values = (
+                    field_updates.get('sec_type') or position_data['sec_type'],
+                    field_updates.get('sec_subtype') or position_data['sec_subtype'],
+                )
+                if new_values != (position['sec_type'], position['sec_subtype']):
+                    changed_rows.append((position['id'],) + new_values)
+
+            batch_updated = write_rule_updates(cur, 'positions', POSITION_RULE_COLUMNS, changed_rows)
+            conn.commit()
+
+            batch_number += 1
+            updated_count += batch_updated
+            print(f"  Batch {batch_number}: scanned {len(positions)}, updated {batch_updated} "
+                  f"in {(time.perf_counter() - batch_start) * 1000:.0f} ms")
+    finally:
+        stream.close()
+        conn.commit()
+
+    return updated_count
 
 
 if __name__ == "__main__":
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Multi-Pattern Matcher - One-pass condition matching for the mapping rules engine
+
+Created: 10/18/26 10:05AM
+Purpose: Match every map_conditions pattern for a field with a single scan of the field value
+
+The rule engine used to test each condition on its own (`match_value in field`,
+`field.startswith(match_value)`), which costs O(conditions x field length) per row.
+This module indexes all patterns that read the same field:
+
+- contains    → Aho-Corasick automaton (all substrings found in one pass)
+- starts_with → prefix trie (walk at most the longest pattern)
+- equals / is → hash map lookup
+
+Each pattern carries a bitmask of the condition ids that use it, so a scan returns
+one integer whose set bits are the conditions that matched. Rules are then evaluated
+by combining those bits (see CompiledRuleSet in mapping_rules_engine.py).
+
+Usage:
+    matcher = FieldMatcher()
+    matcher.add('contains', 'CALL (', 1 << 0)
+    matcher.add('starts_with', 'MUNI', 1 << 1)
+    matcher.build()
+    hits = matcher.scan('CALL (NVDA) NVIDIA CORP')   # → 0b01
+"""
+
+from collections import deque
+
+# Below this many distinct "contains" patterns a loop of C-level `in` checks beats a
+# pure-Python automaton walk, so the matcher only builds Aho-Corasick above it.
+AHO_CORASICK_MIN_PATTERNS = 16
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton mapping substring patterns to condition bitmasks"""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [0]
+        self.always = 0  # Masks of empty patterns - they match any string
+        self.built = False
+
+    def add(self, pattern, mask):
+        """Register a pattern; mask is OR-ed into the result when it occurs"""
+        if not pattern:
+            self.always |= mask
+            return
+
+        state = 0
+        for ch in pattern:
+            next_state = self.goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][ch] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(0)
+            state = next_state
+        self.output[state] |= mask
+        self.built = False
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque()
+        for state in self.goto[0].values():
+            self.fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(ch, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+        self.built = True
+
+    def scan(self, text):
+        """Return the OR of masks for every pattern occurring in text"""
+        if not self.built:
+            self.build()
+
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        hits = self.always
+        state = 0
+
+        for ch in text:
+            transitions = goto[state]
+            while state and ch not in transitions:
+                state = fail[state]
+                transitions = goto[state]
+            state = transitions.get(ch, 0)
+            hits |= output[state]
+
+        return hits
+
+
+class PrefixTrie:
+    """Prefix trie mapping starts_with patterns to condition bitmasks"""
+
+    def __init__(self):
+        self.children = [{}]
+        self.output = [0]
+
+    def add(self, pattern, mask):
+        """Register a prefix; the empty prefix matches every string"""
+        node = 0
+        for ch in pattern:
+            child = self.children[node].get(ch)
+            if child is None:
+                child = len(self.children)
+                self.children[node][ch] = child
+                self.children.append({})
+                self.output.append(0)
+            node = child
+        self.output[node] |= mask
+
+    def scan(self, text):
+        """Return the OR of masks for every registered prefix of text"""
+        children = self.children
+        output = self.output
+        hits = output[0]
+        node = 0
+
+        for ch in text:
+            node = children[node].get(ch)
+            if node is None:
+                break
+            hits |= output[node]
+
+        return hits
+
+
+class FieldMatcher:
+    """All contains/starts_with/equals patterns that read one rule field"""
+
+    def __init__(self, min_automaton_patterns=AHO_CORASICK_MIN_PATTERNS):
+        self.min_automaton_patterns = min_automaton_patterns
+        self.contains = {}     # pattern → mask
+        self.prefixes = PrefixTrie()
+        self.has_prefixes = False
+        self.equals = {}       # value → mask
+        self.automaton = None
+
+    def add(self, operator, pattern, mask):
+        """Register a condition pattern; returns False for unsupported operators"""
+        if operator == 'contains':
+            self.contains[pattern] = self.contains.get(pattern, 0) | mask
+        elif operator == 'starts_with':
+            self.prefixes.add(pattern, mask)
+            self.has_prefixes = True
+        elif operator == 'equals' or operator == 'is':
+            self.equals[pattern] = self.equals.get(pattern, 0) | mask
+        else:
+            return False
+        return True
+
+    def build(self):
+        """Freeze the pattern set, building the automaton when it pays off"""
+        self.automaton = None
+        if len(self.contains) >= self.min_automaton_patterns:
+            self.automaton = AhoCorasick()
+            for pattern, mask in self.contains.items():
+                self.automaton.add(pattern, mask)
+            self.automaton.build()
+
+    def scan(self, text):
+        """Return the bitmask of all conditions on this field that match text"""
+        hits = self.equals.get(text, 0)
+
+        if self.has_prefixes:
+            hits |= self.prefixes.scan(text)
+
+        if self.automaton is not None:
+            hits |= self.automaton.scan(text)
+        else:
+            for pattern, mask in self.contains.items():
+                if pattern in text:
+                    hits |= mask
+
+        return hits
+
+
+if __name__ == "__main__":
+    """Self-check against naive matching and a small timing comparison"""
+    import random
+    import string
+    import timeit
+
+    random.seed(7)
+    words = ['DIVIDEND', 'RECEIVED', 'REINVESTMENT', 'INTEREST', 'EARNED', 'MUNI', 'EXEMPT', 'INT',
+             'CALL', 'PUT', 'OPENING', 'CLOSING', 'TRANSACTION', 'ASSIGNED', 'FIDELITY', 'GOVERNMENT',
+             'MONEY', 'MARKET', 'YOU', 'BOUGHT', 'SOLD', 'TRANSFER', 'FEE', 'CHARGE']
+    patterns = sorted({' '.join(random.sample(words, random.randint(1, 2))) for _ in range(300)})
+    patterns += ['CALL (', 'PUT (', '']
+
+    matcher = FieldMatcher()
+    for bit, pattern in enumerate(patterns):
+        matcher.add('contains', pattern, 1 << bit)
+        matcher.add('starts_with', pattern, 1 << (bit + len(patterns)))
+    matcher.build()
+
+    texts = [' '.join(random.choice(words) for _ in range(random.randint(2, 9))) +
+             ' ' + ''.join(random.choices(string.ascii_uppercase, k=5)) for _ in range(500)]
+
+    def naive(text):
+        hits = 0
+        for bit, pattern in enumerate(patterns):
+            if pattern in text:
+                hits |= 1 << bit
+            if text.startswith(pattern):
+                hits |= 1 << (bit + len(patterns))
+        return hits
+
+    for text in texts:
+        assert matcher.scan(text) == naive(text), text
+    print(f"OK: {len(patterns)} patterns x {len(texts)} texts match naive evaluation")
+
+    naive_time = timeit.timeit(lambda: [naive(t) for t in texts], number=5)
+    matcher_time = timeit.timeit(lambda: [matcher.scan(t) for t in texts], number=5)
+    print(f"Naive per-condition checks: {naive_time * 1000:.1f} ms")
+    print(f"FieldMatcher single pass:   {matcher_time * 1000:.1f} ms")
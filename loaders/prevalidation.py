@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Prevalidation - Validate pending extraction files in parallel before any database work
+
+Created: 10/19/26 1:25AM
+Updated: 10/19/26 7:15AM - Amounts checked with the loader's rules (loader_amounts=True): placeholders such as
+  'unknown' load as NULL, so they no longer make a loadable file invalid
+Purpose: Reject bad extractions up front instead of failing mid-load after DB work and a file move
+
+Every file is checked with data_transformations.validate_json_before_load (activities
+or positions rules, picked the way prepare_extraction picks the extraction type, amounts
+accepted exactly as the loader's parse_amount accepts them) in a pool of worker
+processes. No database connection is opened.
+
+Verdicts are cached in a JSON file keyed by the md5 of the file bytes plus
+VALIDATOR_VERSION, so an unchanged file is never parsed or validated again; editing
+a file (or bumping VALIDATOR_VERSION when the rules change) revalidates it.
+
+simple_loader --validate runs this stage first and only hands valid files to the loader;
+invalid files are reported with status 'invalid' and stay in 4extractions.
+
+Usage:
+    python3 prevalidation.py documents/4extractions [--workers 4] [--cache path] [--no-cache]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# validate_json_before_load lives with the other transformation helpers in scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from data_transformations import validate_json_before_load
+
+# Bump when validation rules change so cached verdicts are not reused
+VALIDATOR_VERSION = 2
+
+DEFAULT_CACHE = Path(__file__).resolve().parent / 'validation_cache.json'
+
+# Errors reported per file (the full count is always given)
+MAX_ERRORS = 20
+
+# Bytes read per hash update
+HASH_CHUNK = 1 << 20
+
+
+def file_md5(json_path):
+    """md5 of the raw file bytes - the verdict cache key"""
+    digest = hashlib.md5()
+    with open(json_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def validation_type(data):
+    """validate_json_before_load data_type for an extraction ('positions' for holdings files)"""
+    accounts = data.get('accounts') if isinstance(data, dict) else None
+    if isinstance(accounts, list) and any(isinstance(account, dict) and 'holdings' in account
+                                          for account in accounts):
+        return 'positions'
+    return 'activities'
+
+
+def validate_extraction_file(json_path):
+    """
+    Parse and validate one extraction file (runs in a worker process)
+
+    Returns:
+        tuple: (is_valid, errors) - errors capped at MAX_ERRORS plus a count line
+    """
+    try:
+        with open(json_path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        return False, [f"Unreadable JSON: {e}"]
+
+    if isinstance(data, dict) and isinstance(data.get('accounts'), list) and \
+            not all(isinstance(account, dict) for account in data['accounts']):
+        return False, ["Every entry in 'accounts' must be an object"]
+
+    is_valid, errors = validate_json_before_load(data, validation_type(data), loader_amounts=True)
+    if len(errors) > MAX_ERRORS:
+        errors = errors[:MAX_ERRORS] + [f"... {len(errors) - MAX_ERRORS} more errors"]
+    return is_valid, errors
+
+
+def hash_and_validate(json_path, cached_hashes):
+    """Worker task: hash the file, and validate it unless its hash already has a verdict"""
+    file_hash = file_md5(json_path)
+    if file_hash in cached_hashes:
+        return file_hash, None
+    return file_hash, validate_extraction_file(json_path)
+
+
+class ValidationCache:
+    """Verdicts by file hash, stored as one JSON object"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else None
+        self.verdicts = {}  # "<file md5>:<VALIDATOR_VERSION>" → {'valid': bool, 'errors': [...]}
+        self.changed = False
+        if self.path is not None and self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self.verdicts = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Ignoring unreadable validation cache {self.path}: {e}")
+
+    @staticmethod
+    def key(file_hash):
+        return f"{file_hash}:{VALIDATOR_VERSION}"
+
+    def get(self, file_hash):
+        """Cached (is_valid, errors) for a file hash, or None"""
+        verdict = self.verdicts.get(self.key(file_hash))
+        if verdict is None:
+            return None
+        return verdict['valid'], verdict['errors']
+
+    def put(self, file_hash, is_valid, errors):
+        self.verdicts[self.key(file_hash)] = {'valid': is_valid, 'errors': errors}
+        self.changed = True
+
+    def save(self):
+        """Write the cache (atomically) if any verdict was added"""
+        if self.path is None or not self.changed:
+            return
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(self.verdicts, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+        self.changed = False
+
+
+def prevalidate(paths, workers=None, cache_path=DEFAULT_CACHE):
+    """
+    Validate extraction files in parallel, reusing cached verdicts for unchanged files
+
+    Args:
+        paths: extraction JSON paths
+        workers: validator processes (default: os.cpu_count())
+        cache_path: verdict cache file, or None to validate everything without a cache
+
+    Returns:
+        tuple: (valid_paths, invalid) - invalid is a list of (path, errors)
+    """
+    paths = [Path(path) for path in paths]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+
+    start = time.perf_counter()
+    cache = ValidationCache(cache_path)
+    cached_hashes = {key.rsplit(':', 1)[0] for key in cache.verdicts
+                     if key.endswith(f":{VALIDATOR_VERSION}")}
+
+    if len(paths) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as validators:
+            outcomes = list(validators.map(hash_and_validate, paths, [cached_hashes] * len(paths)))
+    else:
+        outcomes = [hash_and_validate(path, cached_hashes) for path in paths]
+
+    valid_paths = []
+    invalid = []
+    reused = 0
+    for path, (file_hash, verdict) in zip(paths, outcomes):
+        if verdict is None:
+            verdict = cache.get(file_hash)
+            reused += 1
+        else:
+            cache.put(file_hash, *verdict)
+
+        is_valid, errors = verdict
+        if is_valid:
+            valid_paths.append(path)
+        else:
+            invalid.append((path, errors))
+
+    cache.save()
+    print(f"Validated {len(paths)} files in {time.perf_counter() - start:.2f}s: "
+          f"{len(valid_paths)} valid, {len(invalid)} invalid ({reused} cached verdicts)")
+    return valid_paths, invalid
+
+
+def print_invalid(invalid):
+    """Print each invalid file with its validation errors"""
+    for path, errors in invalid:
+        print(f"Invalid: {path.name}")
+        for error in errors:
+            print(f"  - {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate extraction JSON files before loading")
+    parser.add_argument('target', help="Directory of extractions, a glob pattern, or one JSON file")
+    parser.add_argument('--workers', type=int, default=None, help="Validator processes (default: CPU count)")
+    parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE, help=f"Verdict cache (default: {DEFAULT_CACHE})")
+    parser.add_argument('--no-cache', action='store_true', help="Validate every file, ignoring and not updating the cache")
+    args = parser.parse_args()
+
+    from simple_loader import resolve_batch_paths
+
+    try:
+        target = Path(args.target)
+        paths = [target] if target.is_file() else resolve_batch_paths(args.target)
+        if not paths:
+            raise ValueError(f"No JSON files found for: {args.target}")
+        valid_paths, invalid = prevalidate(paths, workers=args.workers,
+                                           cache_path=None if args.no_cache else args.cache)
+        print_invalid(invalid)
+        if invalid:
+            sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Reference Cache - In-memory lookups for institutions, entities, accounts and document links
+
+Created: 10/18/26 6:05PM
+Updated: 10/18/26 11:55PM - from_rows() builds a cache from rows fetched by another driver (async_loader.py);
+  remember_account() public for its miss handling
+Updated: 10/19/26 5:50AM - link_document_account(pending_links=...): new links are cached only after the caller
+  commits (forget_document_links() removed - it raced with other loader threads)
+Purpose: Resolve reference data from dicts instead of one query per account per document
+
+At the start of a run the cache loads institutions, entities, accounts (with their
+entity_id) and existing document_accounts links with one query each. Lookups are
+served from dicts; a miss falls back to the database once and remembers the result,
+so reference rows created while a run is in progress are still found.
+
+Misses that are also missing from the database return None - callers keep their own
+fail-fast errors (see lookup_* in simple_loader.py, resolve_* in data_transformations.py).
+
+Usage:
+    from reference_cache import ReferenceCache
+
+    refs = ReferenceCache.load(conn)
+    institution_id = refs.institution_id('Fidelity', conn)
+    account_id, entity_id = refs.account('Z24-527872', institution_id, conn)
+    pending_links = set()
+    refs.link_document_account(doc_id, account_id, conn, pending_links)
+    ...
+    conn.commit()
+    refs.document_links.update(pending_links)   # only links that were committed are cached
+"""
+
+from psycopg2.extras import RealDictCursor
+
+# institutions, entities, accounts (oldest first, as account_by_number expects), document_accounts
+PRELOAD_QUERIES = (
+    "SELECT id, institution_name FROM institutions",
+    "SELECT id, entity_name FROM entities",
+    """
+        SELECT id, entity_id, account_number, institution_id
+        FROM accounts
+        ORDER BY created_at, id
+    """,
+    "SELECT document_id, account_id FROM document_accounts",
+)
+
+
+class ReferenceCache:
+    """Preloaded reference data with database fallback on a miss"""
+
+    def __init__(self):
+        self.institutions = {}        # institution_name → id
+        self.entities = {}            # entity_name → id
+        self.accounts = {}            # (account_number, institution_id) → (id, entity_id)
+        self.accounts_by_number = {}  # account_number → (id, entity_id), first by created_at
+        self.account_entities = {}    # account id → entity_id
+        self.document_links = set()   # (document_id, account_id)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, conn):
+        """Preload every reference table with one query each"""
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        rows = []
+        for query in PRELOAD_QUERIES:
+            cur.execute(query)
+            rows.append(cur.fetchall())
+        return cls.from_rows(*rows)
+
+    @classmethod
+    def from_rows(cls, institution_rows, entity_rows, account_rows, link_rows):
+        """Build a cache from the results of PRELOAD_QUERIES (any mapping-like rows)"""
+        refs = cls()
+
+        for row in institution_rows:
+            refs.institutions[row['institution_name']] = str(row['id'])
+
+        for row in entity_rows:
+            refs.entities.setdefault(row['entity_name'], str(row['id']))
+
+        for row in account_rows:
+            refs.remember_account(row)
+
+        for row in link_rows:
+            refs.document_links.add((str(row['document_id']), str(row['account_id'])))
+
+        return refs
+
+    def remember_account(self, row):
+        """Index one accounts row under every key the lookups use"""
+        account_id = str(row['id'])
+        entity_id = str(row['entity_id']) if row['entity_id'] is not None else None
+        account = (account_id, entity_id)
+        self.accounts[(row['account_number'], str(row['institution_id']))] = account
+        self.accounts_by_number.setdefault(row['account_number'], account)
+        self.account_entities[account_id] = entity_id
+
+    def _fetchone(self, conn, query, params):
+        """Run a fallback query for a cache miss"""
+        self.misses += 1
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(query, params)
+        return cur.fetchone()
+
+    def institution_id(self, name, conn):
+        """Institution id by name, or None if it does not exist"""
+        if name in self.institutions:
+            self.hits += 1
+            return self.institutions[name]
+
+        row = self._fetchone(conn, "SELECT id FROM institutions WHERE institution_name = %s", (name,))
+        if not row:
+            return None
+        self.institutions[name] = str(row['id'])
+        return self.institutions[name]
+
+    def entity_id(self, name, conn):
+        """Entity id by name, or None if it does not exist"""
+        if name in self.entities:
+            self.hits += 1
+            return self.entities[name]
+
+        row = self._fetchone(conn, "SELECT id FROM entities WHERE entity_name = %s", (name,))
+        if not row:
+            return None
+        self.entities[name] = str(row['id'])
+        return self.entities[name]
+
+    def account(self, account_number, institution_id, conn):
+        """(account_id, entity_id) by number and institution, or None if not found"""
+        key = (account_number, str(institution_id))
+        if key in self.accounts:
+            self.hits += 1
+            return self.accounts[key]
+
+        row = self._fetchone(conn, """
+            SELECT id, entity_id, account_number, institution_id FROM accounts
+            WHERE account_number = %s AND institution_id = %s
+        """, (account_number, institution_id))
+        if not row:
+            return None
+        self.remember_account(row)
+        return self.accounts[key]
+
+    def account_by_number(self, account_number, conn):
+        """(account_id, entity_id) by number alone, or None if not found"""
+        if account_number in self.accounts_by_number:
+            self.hits += 1
+            return self.accounts_by_number[account_number]
+
+        row = self._fetchone(conn, """
+            SELECT id, entity_id, account_number, institution_id FROM accounts
+            WHERE account_number = %s
+        """, (account_number,))
+        if not row:
+            return None
+        self.remember_account(row)
+        return self.accounts_by_number[account_number]
+
+    def account_entity_id(self, account_id, conn):
+        """
+        entity_id of an account
+
+        Returns:
+            tuple: (found, entity_id) - entity_id may be None for a found account
+        """
+        account_id = str(account_id)
+        if account_id in self.account_entities:
+            self.hits += 1
+            return True, self.account_entities[account_id]
+
+        row = self._fetchone(conn, """
+            SELECT id, entity_id, account_number, institution_id FROM accounts
+            WHERE id = %s
+        """, (account_id,))
+        if not row:
+            return False, None
+        self.remember_account(row)
+        return True, self.account_entities[account_id]
+
+    def link_document_account(self, doc_id, account_id, conn, pending_links=None):
+        """
+        Insert the document_accounts link unless it is already known to exist
+
+        pending_links collects the new link instead of document_links while the
+        transaction may still roll back; the caller adds it to document_links after commit.
+        """
+        key = (str(doc_id), str(account_id))
+        if key in self.document_links or (pending_links is not None and key in pending_links):
+            self.hits += 1
+            return False
+
+        row = self._fetchone(conn, """
+            SELECT 1 AS linked FROM document_accounts
+            WHERE document_id = %s AND account_id = %s
+        """, key)
+        if not row:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO document_accounts (document_id, account_id)
+                VALUES (%s, %s)
+            """, key)
+        (self.document_links if pending_links is None else pending_links).add(key)
+        return not row
+
+    def stats(self):
+        """Cache hit/miss counters and sizes"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'institutions': len(self.institutions),
+            'entities': len(self.entities),
+            'accounts': len(self.accounts),
+            'document_links': len(self.document_links),
+        }
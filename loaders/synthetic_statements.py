@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Synthetic Statements - Generated Fidelity extraction JSON for benchmarks
+
+Created: 10/18/26 11:20PM
+Updated: 10/19/26 6:30AM - Generated sections taken from simple_loader.ACTIVITY_SECTIONS (GENERATED_SECTIONS)
+  instead of a separate list
+Purpose: Loader/rule-engine workloads at any scale without real statements
+
+Generates activities and holdings extractions in the layout described by
+config/institution-guides/JSON_Stmnt_Fid_Activity.md and JSON_Stmnt_Fid_Positions.md
+(extraction_metadata, document_data, accounts[*] with activity sections, holdings,
+portfolio_summary/income_summary). Output is deterministic for a given seed.
+
+Scale knobs:
+- accounts      accounts per statement
+- holdings      holdings records per account (holdings extraction)
+- activities    activity records per account (activities extraction), spread over
+                GENERATED_SECTIONS
+- descriptions  distinct security/description texts the records draw from - low
+                values make rule-result caching effective, high values defeat it
+
+Only sections that the standard section rules classify are generated, so every
+synthetic transaction gets a transaction_type (the column is NOT NULL).
+
+Account numbers look like "S00-000001" and doc_md5_hash values start with
+SYNTHETIC_HASH_PREFIX so benchmark reference rows are easy to find and remove.
+
+Usage:
+    from synthetic_statements import generate_statement, synthetic_account_numbers
+
+    numbers = synthetic_account_numbers(3)
+    data = generate_statement('activities', numbers, activities=500, descriptions=50, seed=1)
+
+    python3 synthetic_statements.py out_dir --statements 4 --accounts 3 --activities 500
+"""
+
+import hashlib
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+from simple_loader import ACTIVITY_SECTIONS
+
+# doc_md5_hash prefix of every synthetic statement
+SYNTHETIC_HASH_PREFIX = 'synthetic'
+
+# Description texts per section (matched by the standard description rules)
+SECTION_DESCRIPTIONS = {
+    'securities_bought_sold': ('You Bought', 'You Sold', 'You Bought - OPENING TRANSACTION',
+                               'You Sold - CLOSING TRANSACTION'),
+    'dividends_interest_income': ('Dividend Received', 'Reinvestment', 'Interest Earned', 'Muni Exempt Int'),
+    'core_fund_activity': ('You Bought', 'You Sold'),
+    'deposits': ('Direct Deposit From', 'Transfer From Bank'),
+    'withdrawals': ('Wire Tfr To Bank', 'Transfer To Bank'),
+    'fees_charges': ('Account Service Fee', 'Wire Transfer Fee'),
+}
+
+# (sec_type, sec_subtype) pairs for holdings; option subtypes become positions.option_type
+HOLDING_TYPES = (
+    ('Stocks', 'Common Stock'), ('Mutual Funds', 'Stock Funds'), ('Exchange Traded Products', 'Equity ETPs'),
+    ('Bonds', 'Municipal Bonds'), ('Options', 'Puts'), ('Options', 'Calls'),
+)
+
+CORE_FUND = ('SPAXX', 'FIDELITY GOVERNMENT MONEY MARKET')
+
+# Loader activity sections generated (billpay records carry a payee instead of a description),
+# in the order records are spread over them
+GENERATED_SECTIONS = tuple(
+    section for section in ACTIVITY_SECTIONS if section in SECTION_DESCRIPTIONS or section == 'billpay'
+)
+
+
+def synthetic_account_numbers(count, start=1):
+    """Account numbers S00-000001, S00-000002, ... (never a real Fidelity format)"""
+    return [f"S{(number // 1000000) % 100:02d}-{number % 1000000:06d}" for number in range(start, start + count)]
+
+
+def synthetic_doc_hash(statement_index, seed=0):
+    """doc_md5_hash for one synthetic statement (shared by its activities and holdings extractions)"""
+    digest = hashlib.md5(f"{seed}:{statement_index}".encode()).hexdigest()
+    return SYNTHETIC_HASH_PREFIX + digest[len(SYNTHETIC_HASH_PREFIX):]
+
+
+def statement_period(statement_index, first_year=2024):
+    """(period_start, period_end) of the monthly statement statement_index months after January first_year"""
+    year = first_year + statement_index // 12
+    month = statement_index % 12 + 1
+    period_start = date(year, month, 1)
+    period_end = (period_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return period_start, period_end
+
+
+def _money(rng, low, high, negative=False):
+    """Currency string with 2 decimals"""
+    value = rng.uniform(low, high)
+    return f"{-value if negative else value:.2f}"
+
+
+def _security(rng, descriptions):
+    """(sec_description, sec_symbol, cusip) drawn from descriptions distinct securities"""
+    index = rng.randrange(descriptions)
+    return f"SYNTHETIC SECURITY {index:05d} COM", f"SY{index:05d}", f"{index:09d}"
+
+
+def _activity(rng, section, descriptions, period_start, period_end):
+    """One activity record in the section's layout"""
+    day = period_start + timedelta(days=rng.randrange((period_end - period_start).days + 1))
+    sec_description, sec_symbol, cusip = _security(rng, descriptions)
+
+    if section == 'billpay':
+        return {
+            'post_date': day.isoformat(),
+            'payee': f"SYNTHETIC PAYEE {rng.randrange(descriptions):05d}",
+            'payee_account': f"****{rng.randrange(10000):04d}",
+            'amount': _money(rng, 50, 5000, negative=True),
+            'ytd_payments': _money(rng, 1000, 50000),
+        }
+
+    if section == 'core_fund_activity':
+        transaction = rng.choice(SECTION_DESCRIPTIONS[section])
+        amount = _money(rng, 10, 20000, negative=transaction == 'You Bought')
+        return {
+            'settlement_date': day.isoformat(),
+            'account_type': 'CASH',
+            'transaction': transaction,
+            'sec_description': CORE_FUND[1],
+            'sec_symbol': CORE_FUND[0],
+            'quantity': f"{abs(float(amount)):.6f}",
+            'price_per_unit': '1.0000',
+            'amount': amount,
+            'balance': _money(rng, 0, 100000),
+        }
+
+    description = rng.choice(SECTION_DESCRIPTIONS[section])
+
+    if section in ('deposits', 'withdrawals', 'fees_charges'):
+        return {
+            'date': day.isoformat(),
+            'reference': f"REF{rng.randrange(10 ** 9):09d}",
+            'description': f"{description} {sec_description}" if section != 'fees_charges' else description,
+            'amount': _money(rng, 10, 25000, negative=section != 'deposits'),
+        }
+
+    if section == 'securities_bought_sold':
+        if 'TRANSACTION' in description:
+            # Option trade - description carries PUT/CALL for the option rules
+            sec_description = f"{rng.choice(('PUT', 'CALL'))} ({sec_symbol}) {sec_description} (100 SHS)"
+            sec_symbol = None
+        quantity = rng.uniform(1, 500)
+        price = rng.uniform(1, 500)
+        amount = quantity * price
+        return {
+            'settlement_date': day.isoformat(),
+            'sec_description': sec_description,
+            'sec_symbol': sec_symbol,
+            'cusip': cusip,
+            'description': description,
+            'quantity': f"{quantity:.6f}",
+            'price_per_unit': f"{price:.4f}",
+            'cost_basis': None,
+            'transaction_cost': '0.00',
+            'amount': f"{-amount if description.startswith('You Bought') else amount:.2f}",
+        }
+
+    # dividends_interest_income
+    reinvestment = description == 'Reinvestment'
+    return {
+        'settlement_date': day.isoformat(),
+        'sec_description': sec_description,
+        'sec_symbol': sec_symbol,
+        'cusip': cusip,
+        'description': description,
+        'quantity': f"{rng.uniform(0.1, 50):.6f}" if reinvestment else None,
+        'price_per_unit': f"{rng.uniform(1, 500):.4f}" if reinvestment else None,
+        'amount': _money(rng, 1, 5000, negative=reinvestment),
+    }
+
+
+def _holding(rng, descriptions):
+    """One holdings record (bond and option fields only on those security types)"""
+    sec_type, sec_subtype = rng.choice(HOLDING_TYPES)
+    sec_description, sec_symbol, cusip = _security(rng, descriptions)
+    quantity = rng.uniform(1, 5000)
+    price = rng.uniform(1, 500)
+    end_value = quantity * price
+    holding = {
+        'source': sec_type.lower(),
+        'sec_type': sec_type,
+        'sec_subtype': sec_subtype,
+        'sec_symbol': sec_symbol,
+        'cusip': cusip,
+        'sec_description': sec_description,
+        'beg_market_value': f"{end_value * rng.uniform(0.9, 1.1):.2f}",
+        'quantity': f"{quantity:.6f}",
+        'price_per_unit': f"{price:.4f}",
+        'end_market_value': f"{end_value:.2f}",
+        'cost_basis': f"{end_value * rng.uniform(0.7, 1.2):.2f}",
+        'unrealized_gain_loss': f"{end_value * rng.uniform(-0.2, 0.3):.2f}",
+        'estimated_ann_inc': _money(rng, 0, 2000),
+        'est_yield': f"{rng.uniform(0, 6):.3f}",
+    }
+    if sec_type == 'Bonds':
+        holding.update({
+            'maturity_date': f"{rng.randrange(1, 13):02d}/01/{rng.randrange(26, 40)}",
+            'coupon_rate': f"{rng.uniform(1, 6):.2f}%",
+            'accrued_int': _money(rng, 0, 1000),
+            'next_call_date': None,
+            'call_price': None,
+        })
+    elif sec_type == 'Options':
+        holding.update({
+            'sec_description': f"{sec_subtype[:-1].upper()} ({sec_symbol}) {sec_description} (100 SHS)",
+            'underlying_symbol': sec_symbol,
+            'strike_price': f"{rng.uniform(10, 500):.2f}",
+            'expiration_date': f"{rng.randrange(1, 13):02d}/{rng.randrange(1, 29):02d}/26",
+        })
+    return holding
+
+
+def generate_statement(kind, account_numbers, holdings=50, activities=200, descriptions=100,
+                       statement_index=0, seed=0):
+    """
+    Build one synthetic extraction
+
+    Args:
+        kind (str): 'activities' or 'holdings'
+        account_numbers (list): Account numbers in the statement (see synthetic_account_numbers)
+        holdings (int): Holdings records per account
+        activities (int): Activity records per account
+        descriptions (int): Distinct securities/descriptions records are drawn from
+        statement_index (int): Monthly statement number (period and doc hash)
+        seed (int): Random seed - same arguments give the same JSON
+
+    Returns:
+        dict: Extraction JSON
+    """
+    if kind not in ('activities', 'holdings'):
+        raise ValueError(f"Unknown extraction kind '{kind}', expected 'activities' or 'holdings'")
+    if descriptions < 1:
+        raise ValueError(f"descriptions must be at least 1, got {descriptions}")
+
+    rng = random.Random(f"{seed}:{statement_index}:{kind}")
+    period_start, period_end = statement_period(statement_index)
+    name = f"synthetic_{period_end:%Y-%m}_{statement_index:04d}_{kind}"
+
+    accounts = []
+    for account_number in account_numbers:
+        account = {
+            'account_number': account_number,
+            'account_name': 'SYNTHETIC BENCHMARK - INDIVIDUAL',
+            'account_holder_name': 'SYNTHETIC BENCHMARK',
+            'account_type': 'brokerage',
+        }
+        if kind == 'holdings':
+            account['portfolio_summary'] = {
+                'beginning_value': _money(rng, 10000, 1000000),
+                'ending_value': _money(rng, 10000, 1000000),
+                'net_account_value': _money(rng, 10000, 1000000),
+            }
+            account['income_summary'] = {
+                'taxable_total_period': _money(rng, 0, 5000),
+                'taxable_total_ytd': _money(rng, 0, 50000),
+                'divs_taxable_period': _money(rng, 0, 5000),
+                'divs_taxable_ytd': _money(rng, 0, 50000),
+                'int_taxable_period': _money(rng, 0, 1000),
+                'int_taxable_ytd': _money(rng, 0, 10000),
+            }
+            account['realized_gains'] = None
+            account['holdings'] = [_holding(rng, descriptions) for _ in range(holdings)]
+        else:
+            sections = {section: [] for section in GENERATED_SECTIONS}
+            for position in range(activities):
+                section = GENERATED_SECTIONS[position % len(GENERATED_SECTIONS)]
+                sections[section].append(_activity(rng, section, descriptions, period_start, period_end))
+            for section, records in sections.items():
+                account[section] = records or None
+        accounts.append(account)
+
+    return {
+        'extraction_metadata': {
+            'json_output_id': name,
+            'source_pdf_filepath': f"/synthetic/{name}.pdf",
+            'json_output_md5_hash': None,
+            'doc_md5_hash': synthetic_doc_hash(statement_index, seed),
+            'extraction_type': kind,
+            'extraction_timestamp': '2026.10.18_23.20ET',
+            'extractor_version': 'synthetic',
+            'pages_processed': 1 + len(accounts) * (holdings if kind == 'holdings' else activities) // 25,
+            'extraction_notes': ['Synthetic benchmark statement'],
+        },
+        'document_data': {
+            'institution': 'Fidelity',
+            'statement_date': period_end.isoformat(),
+            'period_start': period_start.isoformat(),
+            'period_end': period_end.isoformat(),
+        },
+        'accounts': accounts,
+    }
+
+
+def write_statement(directory, data):
+    """Write an extraction as <json_output_id>.json in directory, returns the path"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{data['extraction_metadata']['json_output_id']}.json"
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write synthetic Fidelity extraction JSON files")
+    parser.add_argument('directory', help="Output directory")
+    parser.add_argument('--statements', type=int, default=1, help="Monthly statements (activities + holdings each)")
+    parser.add_argument('--accounts', type=int, default=2, help="Accounts per statement")
+    parser.add_argument('--holdings', type=int, default=50, help="Holdings per account")
+    parser.add_argument('--activities', type=int, default=200, help="Activity records per account")
+    parser.add_argument('--descriptions', type=int, default=100, help="Distinct securities/descriptions")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    numbers = synthetic_account_numbers(args.accounts)
+    for index in range(args.statements):
+        for kind in ('activities', 'holdings'):
+            data = generate_statement(kind, numbers, holdings=args.holdings, activities=args.activities,
+                                      descriptions=args.descriptions, statement_index=index, seed=args.seed)
+            print(write_statement(args.directory, data))
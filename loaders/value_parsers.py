@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Value Parsers - Shared fast parsing of currency/amount and date strings
+
+Created: 10/18/26 9:05PM
+Updated: 10/18/26 9:50PM - Added date parsers: regex-dispatched formats instead of strptime fallthrough,
+  LRU cache on the raw string, both the loader (tax_year) and data_transformations (50-year window) contracts
+Purpose: One optimized amount/date parser for the loader hot loops and data_transformations
+
+simple_loader.parse_amount and data_transformations.parse_currency run dozens of
+times per row. Both contracts are kept exactly; what changes is the work per call:
+
+- Memo: statement values repeat constantly ("0.00", "$1,000.00", "unavailable"), so
+  each distinct string is parsed once and the (immutable) Decimal is reused.
+  The memo is cleared when it reaches PARSE_MEMO_SIZE entries.
+- Cleaning: `$` and `,` stripped with str.replace - measured faster here than a
+  str.translate table or a precompiled regex substitution for these short strings.
+- Column variants parse a whole list of values at once with the lookups bound locally.
+
+Dates: statements hold a few dozen distinct dates across thousands of fields. Each
+raw string is matched once against precompiled per-format patterns (no exception-driven
+strptime fallthrough) and the result is kept in an LRU cache. Strings no pattern
+recognizes take the original strptime path, so results never differ.
+
+Contracts:
+- parse_amount(value)    loader semantics: falsy → None, unparseable → None,
+                         "(x)" negative only when both parentheses are present
+- parse_currency(value)  data_transformations semantics: None/NULL_VALUES → None,
+                         int/float → Decimal(str(value)), unparseable → ValueError
+- parse_date(value, tax_year)
+                         loader semantics: YYYY-MM-DD, or MM/DD/YY with the year replaced
+                         by tax_year; anything else → None
+- parse_date_strict(value)
+                         data_transformations semantics: YYYY-MM-DD, MM/DD/YYYY, MM/DD/YY
+                         (00-50 → 20xx, 51-99 → 19xx); NULL_VALUES → None, else ValueError
+
+Usage:
+    from value_parsers import parse_amount, parse_amount_column
+
+    parse_amount("$1,234.50")                      # Decimal('1234.50')
+    parse_amount_column(["$1.00", None, "(2.50)"])  # [Decimal('1.00'), None, Decimal('-2.50')]
+
+Microbenchmarks against the previous implementations:
+    python3 value_parsers.py [--number 200000]
+"""
+
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+# Special values that represent NULL/None (data_transformations semantics)
+NULL_VALUES = {'unavailable', 'not applicable', 'n/a', '-', '', 'null', 'none'}
+
+# Distinct strings remembered per memo before it is reset
+PARSE_MEMO_SIZE = 65536
+
+# Distinct date strings kept by each date parser's LRU cache
+DATE_CACHE_SIZE = 4096
+
+# Per-format date patterns ([0-9], not \d - other Unicode digits take the strptime path)
+ISO_DATE = re.compile(r'([0-9]{4})-([0-9]{2})-([0-9]{2})\Z')
+US_DATE_LONG = re.compile(r'([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})\Z')
+US_DATE_SHORT = re.compile(r'([0-9]{1,2})/([0-9]{1,2})/([0-9]{2})\Z')
+
+_INVALID = object()  # Memoized "cannot parse" (parse_currency raises, parse_amount returns None)
+_MISSING = object()
+
+_amount_memo = {}    # text → Decimal or None
+_currency_memo = {}  # text → Decimal, None or _INVALID
+
+
+def _remember(memo, text, result):
+    """Store a parse result, resetting the memo when it is full"""
+    if len(memo) >= PARSE_MEMO_SIZE:
+        memo.clear()
+    memo[text] = result
+    return result
+
+
+def _amount_from_text(text):
+    """Uncached parse_amount of a string"""
+    clean = text.replace('$', '').replace(',', '')
+    if '(' in clean and ')' in clean:
+        clean = '-' + clean.replace('(', '').replace(')', '')
+    try:
+        return Decimal(clean)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _clean_currency_text(text):
+    """Strip currency symbols/commas; accounting parentheses become a minus sign"""
+    cleaned = text.replace('$', '').replace(',', '')
+    if '(' in cleaned or ')' in cleaned:
+        cleaned = cleaned.replace('(', '-').replace(')', '')
+    return cleaned
+
+
+def _currency_from_text(text):
+    """Uncached parse_currency of a string: Decimal, None (NULL value) or _INVALID"""
+    value_str = text.strip()
+    if value_str.lower() in NULL_VALUES:
+        return None
+    try:
+        return Decimal(_clean_currency_text(value_str))
+    except InvalidOperation:
+        return _INVALID
+
+
+def parse_amount(amount_str):
+    """Convert amount string to Decimal, handle None"""
+    if not amount_str:
+        return None
+    text = amount_str if type(amount_str) is str else str(amount_str)
+    result = _amount_memo.get(text, _MISSING)
+    if result is _MISSING:
+        result = _remember(_amount_memo, text, _amount_from_text(text))
+    return result
+
+
+def parse_amount_column(values):
+    """parse_amount over a whole column of values; returns a list in the same order"""
+    memo_get = _amount_memo.get
+    results = []
+    append = results.append
+
+    for value in values:
+        if not value:
+            append(None)
+            continue
+        text = value if type(value) is str else str(value)
+        result = memo_get(text, _MISSING)
+        if result is _MISSING:
+            result = _remember(_amount_memo, text, _amount_from_text(text))
+        append(result)
+
+    return results
+
+
+def parse_currency(value):
+    """
+    Parse currency value to Decimal (data_transformations contract)
+
+    Raises:
+        ValueError: If value cannot be parsed as currency
+    """
+    if value is None:
+        return None
+
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+
+    text = value if type(value) is str else str(value)
+    result = _currency_memo.get(text, _MISSING)
+    if result is _MISSING:
+        result = _remember(_currency_memo, text, _currency_from_text(text))
+
+    if result is _INVALID:
+        cleaned = _clean_currency_text(text.strip())
+        raise ValueError(f"Cannot parse currency value: '{value}' (cleaned: '{cleaned}')")
+    return result
+
+
+def parse_currency_column(values):
+    """parse_currency over a whole column of values; raises on the first unparseable value"""
+    memo_get = _currency_memo.get
+    results = []
+    append = results.append
+
+    for value in values:
+        if value is None:
+            append(None)
+            continue
+        if type(value) is str:
+            result = memo_get(value, _MISSING)
+            if result is _MISSING:
+                result = _remember(_currency_memo, value, _currency_from_text(value))
+            if result is not _INVALID:
+                append(result)
+                continue
+        append(parse_currency(value))  # Numbers, other types and the error message
+
+    return results
+
+
+def _strptime_loader_date(date_str, tax_year):
+    """Original loader date parsing (used for strings no fast pattern recognizes)"""
+    try:
+        if '/' in date_str and len(date_str.split('/')[2]) == 2:
+            # MM/DD/YY format
+            return datetime.strptime(f"{date_str.split('/')[0]}/{date_str.split('/')[1]}/{tax_year}", "%m/%d/%Y").date()
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except:
+        return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _loader_date(date_str, tax_year):
+    """Cached loader date parse of a string"""
+    match = ISO_DATE.match(date_str)
+    if match:
+        year, month, day = match.groups()
+    else:
+        match = US_DATE_SHORT.match(date_str)
+        if not match:
+            return _strptime_loader_date(date_str, tax_year)
+        month, day, _ = match.groups()
+        year = tax_year
+
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def parse_date(date_str, tax_year):
+    """Parse date string, add year if missing (MM/DD/YY takes tax_year as its year)"""
+    if not date_str:
+        return None
+    if type(date_str) is not str:
+        return _strptime_loader_date(date_str, tax_year)
+    return _loader_date(date_str, tax_year)
+
+
+def _strptime_strict_date(value_str):
+    """Original data_transformations formats tried in order; None if none matches"""
+    try:
+        return datetime.strptime(value_str, '%Y-%m-%d').date()
+    except ValueError:
+        pass
+
+    try:
+        return datetime.strptime(value_str, '%m/%d/%Y').date()
+    except ValueError:
+        pass
+
+    try:
+        dt = datetime.strptime(value_str, '%m/%d/%y')
+        if dt.year > 2050:
+            dt = dt.replace(year=dt.year - 100)
+        return dt.date()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _strict_date(value_str):
+    """Cached data_transformations date parse: date, None (NULL value) or _INVALID"""
+    value_str = value_str.strip()
+    if value_str.lower() in NULL_VALUES:
+        return None
+
+    match = ISO_DATE.match(value_str) or US_DATE_LONG.match(value_str)
+    if match is not None:
+        groups = match.groups()
+        year, month, day = groups if match.re is ISO_DATE else (groups[2], groups[0], groups[1])
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            return _INVALID  # Other formats cannot match these shapes either
+
+    match = US_DATE_SHORT.match(value_str)
+    if match is not None:
+        month, day, short_year = (int(part) for part in match.groups())
+        # strptime %y: 00-68 → 20xx, 69-99 → 19xx; then the 50-year window
+        year = 2000 + short_year if short_year <= 68 else 1900 + short_year
+        if year > 2050:
+            year -= 100
+        try:
+            return date(year, month, day)
+        except ValueError:
+            return _INVALID
+
+    result = _strptime_strict_date(value_str)
+    return _INVALID if result is None else result
+
+
+def parse_date_strict(value):
+    """
+    Parse date value (data_transformations contract)
+
+    Raises:
+        ValueError: If date format is not recognized
+    """
+    if value is None or value == '':
+        return None
+
+    result = _strict_date(value if type(value) is str else str(value))
+    if result is _INVALID:
+        raise ValueError(f"Cannot parse date value: '{value}'. Expected formats: YYYY-MM-DD, MM/DD/YYYY, or MM/DD/YY")
+    return result
+
+
+def clear_memos():
+    """Drop every memoized parse result"""
+    _amount_memo.clear()
+    _currency_memo.clear()
+    _loader_date.cache_clear()
+    _strict_date.cache_clear()
+
+
+if __name__ == "__main__":
+    """Check both contracts against the previous implementations, then time them"""
+    import argparse
+    import timeit
+
+    parser = argparse.ArgumentParser(description="Microbenchmark the shared value parsers")
+    parser.add_argument('--number', type=int, default=200000, help="Values parsed per timing")
+    args = parser.parse_args()
+
+    def legacy_parse_amount(amount_str):
+        """simple_loader.parse_amount before this module"""
+        if not amount_str:
+            return None
+        clean = str(amount_str).replace('$', '').replace(',', '')
+        if '(' in clean and ')' in clean:
+            clean = '-' + clean.replace('(', '').replace(')', '')
+        try:
+            return Decimal(clean)
+        except:
+            return None
+
+    def legacy_parse_currency(value):
+        """data_transformations.parse_currency before this module"""
+        if value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return Decimal(str(value))
+        value_str = str(value).strip()
+        if value_str.lower() in NULL_VALUES:
+            return None
+        cleaned = value_str.replace('$', '').replace(',', '')
+        if '(' in cleaned or ')' in cleaned:
+            cleaned = cleaned.replace('(', '-').replace(')', '')
+        try:
+            return Decimal(cleaned)
+        except InvalidOperation:
+            raise ValueError(f"Cannot parse currency value: '{value}' (cleaned: '{cleaned}')")
+
+    def legacy_loader_date(date_str, tax_year):
+        """simple_loader.parse_date before this module"""
+        if not date_str:
+            return None
+        try:
+            if '/' in date_str and len(date_str.split('/')[2]) == 2:
+                return datetime.strptime(f"{date_str.split('/')[0]}/{date_str.split('/')[1]}/{tax_year}", "%m/%d/%Y").date()
+            return datetime.strptime(date_str, "%Y-%m-%d").date()
+        except:
+            return None
+
+    def legacy_strict_date(value):
+        """data_transformations.parse_date before this module"""
+        if value is None or value == '':
+            return None
+        value_str = str(value).strip()
+        if value_str.lower() in NULL_VALUES:
+            return None
+        result = _strptime_strict_date(value_str)
+        if result is None:
+            raise ValueError(f"Cannot parse date value: '{value}'. Expected formats: YYYY-MM-DD, MM/DD/YYYY, or MM/DD/YY")
+        return result
+
+    def outcome(function, value):
+        try:
+            return ('ok', repr(function(value)))  # repr: Decimal('NaN') != Decimal('NaN')
+        except Exception as e:
+            return ('error', type(e).__name__, str(e))
+
+    edge_cases = [
+        None, '', 0, 0.0, 1, -2.5, 1e20, True, '0.00', '$738,691.27', '-$2,091.38', '($100.00)',
+        '(100', '100)', '-(5)', ' 12.5 ', '1_000', 'NaN', '1e3', 'unavailable', 'N/A', 'None', '-',
+        'abc', '$', '(,)', Decimal('3.10'), '１２３',
+    ]
+    for value in edge_cases:
+        assert outcome(parse_amount, value) == outcome(legacy_parse_amount, value), value
+        assert outcome(parse_currency, value) == outcome(legacy_parse_currency, value), value
+        # Memoized second call must agree as well
+        assert outcome(parse_amount, value) == outcome(legacy_parse_amount, value), value
+        assert outcome(parse_currency, value) == outcome(legacy_parse_currency, value), value
+    assert repr(parse_amount_column(edge_cases)) == repr([legacy_parse_amount(v) for v in edge_cases])
+    valid = [v for v in edge_cases if outcome(legacy_parse_currency, v)[0] == 'ok']
+    assert repr(parse_currency_column(valid)) == repr([legacy_parse_currency(v) for v in valid])
+    print(f"OK: {len(edge_cases)} edge cases match both previous implementations")
+
+    date_cases = [
+        None, '', 'N/A', 'null', ' - ', '2024-03-31', ' 2024-03-31 ', '2024-3-31', '2024-02-30', '2024-02-29',
+        '03/31/2024', '3/1/2024', '02/29/2023', '03/31/24', '3/1/24', '02/29/24', '12/31/50', '01/01/51',
+        '01/01/69', '01/01/68', '13/01/24', '03/31', '03/31/2024/1', '2024/03/31', '20240331', 'abc',
+        '２０２４-03-31', '03/31/２４', '03/31/24 ', 'Q1 2024',
+    ]
+    for value in date_cases:
+        for tax_year in (2023, 2024):
+            for _ in range(2):  # Second call is served from the cache
+                assert outcome(lambda v: parse_date(v, tax_year), value) == \
+                    outcome(lambda v: legacy_loader_date(v, tax_year), value), (value, tax_year)
+        for _ in range(2):
+            assert outcome(parse_date_strict, value) == outcome(legacy_strict_date, value), value
+    print(f"OK: {len(date_cases)} date cases match both previous implementations")
+
+    # Statement-like column: a few hundred distinct amounts repeated across rows
+    column = [f"${(i * 7919) % 250000 / 100:,.2f}" for i in range(500)] + ['0.00', '', None, '(1,250.00)']
+    values = (column * (args.number // len(column) + 1))[:args.number]
+    currency_values = [v for v in values if v is not None]
+
+    # Statement-like date column: a quarter of trade/settle dates in both layouts
+    date_column = [f"{m:02d}/{d:02d}/24" for m in (1, 2, 3) for d in range(1, 29)] + \
+                  [f"2024-{m:02d}-{d:02d}" for m in (1, 2, 3) for d in range(1, 29)]
+    dates = (date_column * (args.number // len(date_column) + 1))[:args.number]
+
+    def best(statement):
+        return min(timeit.repeat(statement, number=1, repeat=5))
+
+    timings = [
+        ('legacy parse_amount', best(lambda: [legacy_parse_amount(v) for v in values])),
+        ('parse_amount', best(lambda: [parse_amount(v) for v in values])),
+        ('parse_amount_column', best(lambda: parse_amount_column(values))),
+        ('legacy parse_currency', best(lambda: [legacy_parse_currency(v) for v in currency_values])),
+        ('parse_currency', best(lambda: [parse_currency(v) for v in currency_values])),
+        ('parse_currency_column', best(lambda: parse_currency_column(currency_values))),
+        ('legacy loader date', best(lambda: [legacy_loader_date(v, 2024) for v in dates])),
+        ('parse_date', best(lambda: [parse_date(v, 2024) for v in dates])),
+        ('legacy strict date', best(lambda: [legacy_strict_date(v) for v in dates])),
+        ('parse_date_strict', best(lambda: [parse_date_strict(v) for v in dates])),
+    ]
+    for name, seconds in timings:
+        print(f"{name:<24} {seconds * 1000:>9.1f} ms  ({seconds / args.number * 1e9:>6.0f} ns/value)")
@@ -2,6 +2,16 @@
 Data Transformation Functions for Financial JSON Loading
 
 Created: 09/29/25
+Updated: 10/18/26 6:05PM - resolve_account_id/resolve_entity_id accept an optional reference cache
+  (loaders/reference_cache.py ReferenceCache) and only query the database on a cache miss
+Updated: 10/18/26 9:05PM - parse_currency delegates to the shared memoized parser in loaders/value_parsers.py
+  (same results and errors); NULL_VALUES now defined there
+Updated: 10/18/26 9:50PM - parse_date delegates to value_parsers.parse_date_strict (cached, regex-dispatched
+  formats; same results and errors)
+Updated: 10/19/26 1:25AM - validate_json_before_load accepts null activity sections (the loader treats them as
+  empty); used by loaders/prevalidation.py before loading
+Updated: 10/19/26 7:15AM - validate_json_before_load(loader_amounts=True) checks amounts the way the loader
+  parses them (value_parsers.parse_amount: non-numeric placeholders such as 'unknown' load as NULL)
 Purpose: Transform extracted JSON data to match database schema requirements
 
 This module provides functions to handle:
@@ -16,11 +26,18 @@ This module provides functions to handle:
 Used by: scripts/load_extractions.py
 """
 
+import json
 import re
+import sys
 from datetime import datetime
-from decimal import Decimal, InvalidOperation
+from decimal import Decimal
+from pathlib import Path
 from typing import Optional, Dict, List, Tuple, Any
 
+# Shared value parsers live with the loader
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'loaders'))
+import value_parsers
+
 
 # ============================================================================
 # MAPPING CONSTANTS
@@ -59,7 +76,7 @@ SOURCE_MAP = {
 }
 
 # Special values that represent NULL/None
-NULL_VALUES = {'unavailable', 'not applicable', 'n/a', '-', '', 'null', 'none'}
+NULL_VALUES = value_parsers.NULL_VALUES
 
 
 # ============================================================================
@@ -135,34 +152,8 @@ def parse_currency(value: Any) -> Optional[Decimal]:
         >>> parse_currency(123.45)
         Decimal('123.45')
     """
-    # Handle None
-    if value is None:
-        return None
-
-    # Handle numeric types (int, float)
-    if isinstance(value, (int, float)):
-        return Decimal(str(value))
-
-    # Convert to string and clean whitespace
-    value_str = str(value).strip()
-
-    # Handle special NULL-equivalent values
-    if value_str.lower() in NULL_VALUES:
-        return None
-
-    # Remove currency symbols, commas, and convert parentheses to negative
-    # Parentheses are used in accounting notation for negative numbers
-    cleaned = value_str.replace('$', '').replace(',', '')
-
-    # Handle parentheses (accounting notation for negative)
-    if '(' in cleaned or ')' in cleaned:
-        cleaned = cleaned.replace('(', '-').replace(')', '')
-
-    # Parse to Decimal
-    try:
-        return Decimal(cleaned)
-    except InvalidOperation:
-        raise ValueError(f"Cannot parse currency value: '{value}' (cleaned: '{cleaned}')")
+    # Memoized shared parser - "(x)"/"x)" accounting negatives, NULL_VALUES → None
+    return value_parsers.parse_currency(value)
 
 
 # ============================================================================
@@ -199,44 +190,8 @@ def parse_date(value: Any) -> Optional[datetime.date]:
         >>> parse_date(None)
         None
     """
-    # Handle None and empty strings
-    if value is None or value == '':
-        return None
-
-    value_str = str(value).strip()
-
-    # Handle special NULL-equivalent values
-    if value_str.lower() in NULL_VALUES:
-        return None
-
-    # Try ISO 8601 format first (YYYY-MM-DD) - most common in JSON
-    try:
-        return datetime.strptime(value_str, '%Y-%m-%d').date()
-    except ValueError:
-        pass
-
-    # Try MM/DD/YYYY format
-    try:
-        return datetime.strptime(value_str, '%m/%d/%Y').date()
-    except ValueError:
-        pass
-
-    # Try MM/DD/YY format with century logic
-    try:
-        dt = datetime.strptime(value_str, '%m/%d/%y')
-
-        # Apply 50-year window:
-        # Two-digit years 00-49 → 2000-2049
-        # Two-digit years 50-99 → 1950-1999
-        if dt.year > 2050:
-            dt = dt.replace(year=dt.year - 100)
-
-        return dt.date()
-    except ValueError:
-        pass
-
-    # If all formats fail, raise error
-    raise ValueError(f"Cannot parse date value: '{value}'. Expected formats: YYYY-MM-DD, MM/DD/YYYY, or MM/DD/YY")
+    # Formats are detected by pattern (not by trying strptime in turn) and cached per string
+    return value_parsers.parse_date_strict(value)
 
 
 # ============================================================================
@@ -324,7 +279,7 @@ def derive_source(section_name: str) -> str:
 # FUNCTION 6: ACCOUNT ID RESOLUTION
 # ============================================================================
 
-def resolve_account_id(conn, account_number: str) -> str:
+def resolve_account_id(conn, account_number: str, cache: Optional[Any] = None) -> str:
     """
     Lookup account_id UUID from account_number string.
 
@@ -334,6 +289,7 @@ def resolve_account_id(conn, account_number: str) -> str:
     Args:
         conn: Database connection object (psycopg2 connection)
         account_number: Account number from JSON (e.g., "Z12345678")
+        cache: Optional ReferenceCache - served from memory, database only on a miss
 
     Returns:
         Account UUID as string
@@ -346,6 +302,15 @@ def resolve_account_id(conn, account_number: str) -> str:
         >>> resolve_account_id(conn, "Z12345678")
         'a1b2c3d4-e5f6-7890-abcd-ef1234567890'
     """
+    if cache is not None:
+        account = cache.account_by_number(account_number, conn)
+        if account is None:
+            raise ValueError(
+                f"Account not found in database: '{account_number}'. "
+                f"Make sure account exists in accounts table before loading transactions."
+            )
+        return account[0]
+
     cursor = conn.cursor()
 
     try:
@@ -371,7 +336,7 @@ def resolve_account_id(conn, account_number: str) -> str:
 # FUNCTION 7: ENTITY ID RESOLUTION
 # ============================================================================
 
-def resolve_entity_id(conn, account_id: str) -> str:
+def resolve_entity_id(conn, account_id: str, cache: Optional[Any] = None) -> str:
     """
     Lookup entity_id from account_id.
 
@@ -381,6 +346,7 @@ def resolve_entity_id(conn, account_id: str) -> str:
     Args:
         conn: Database connection object (psycopg2 connection)
         account_id: Account UUID
+        cache: Optional ReferenceCache - served from memory, database only on a miss
 
     Returns:
         Entity UUID as string
@@ -393,6 +359,20 @@ def resolve_entity_id(conn, account_id: str) -> str:
         >>> resolve_entity_id(conn, 'a1b2c3d4-e5f6-7890-abcd-ef1234567890')
         'f0e1d2c3-b4a5-9687-fedc-ba0987654321'
     """
+    if cache is not None:
+        found, entity_id = cache.account_entity_id(account_id, conn)
+        if not found:
+            raise ValueError(
+                f"Account not found in database: '{account_id}'. "
+                f"Cannot resolve entity_id."
+            )
+        if entity_id is None:
+            raise ValueError(
+                f"Account '{account_id}' has no entity_id assigned. "
+                f"Update accounts table to set entity_id before loading transactions."
+            )
+        return entity_id
+
     cursor = conn.cursor()
 
     try:
@@ -424,7 +404,7 @@ def resolve_entity_id(conn, account_id: str) -> str:
 # FUNCTION 8: PRE-LOAD VALIDATION
 # ============================================================================
 
-def validate_json_before_load(json_data: Dict, data_type: str) -> Tuple[bool, List[str]]:
+def validate_json_before_load(json_data: Dict, data_type: str, loader_amounts: bool = False) -> Tuple[bool, List[str]]:
     """
     Validate JSON structure and values before attempting database load.
 
@@ -438,6 +418,9 @@ def validate_json_before_load(json_data: Dict, data_type: str) -> Tuple[bool, Li
     Args:
         json_data: Parsed JSON data
         data_type: Either 'activities' or 'positions'
+        loader_amounts: Accept exactly the amounts loaders/simple_loader.py accepts
+            (value_parsers.parse_amount - unparseable values load as NULL) instead of
+            parse_currency's stricter rules; only the size check applies to them
 
     Returns:
         Tuple of (is_valid, error_list)
@@ -477,16 +460,27 @@ def validate_json_before_load(json_data: Dict, data_type: str) -> Tuple[bool, Li
 
         # Validate based on data type
         if data_type == 'activities':
-            errors.extend(_validate_activities_account(account, account_num))
+            errors.extend(_validate_activities_account(account, account_num, loader_amounts))
         elif data_type == 'positions':
-            errors.extend(_validate_positions_account(account, account_num))
+            errors.extend(_validate_positions_account(account, account_num, loader_amounts))
         else:
             errors.append(f"Invalid data_type: '{data_type}'. Must be 'activities' or 'positions'")
 
     return len(errors) == 0, errors
 
 
-def _validate_activities_account(account: Dict, account_num: str) -> List[str]:
+def _parse_validated_amount(value: Any, loader_amounts: bool) -> Optional[Decimal]:
+    """
+    Amount as the validator sees it: parse_currency, or the loader's parse_amount.
+
+    Internal helper for validate_json_before_load.
+    """
+    if loader_amounts:
+        return value_parsers.parse_amount(value)
+    return parse_currency(value)
+
+
+def _validate_activities_account(account: Dict, account_num: str, loader_amounts: bool = False) -> List[str]:
     """
     Validate activities data for a single account.
 
@@ -515,6 +509,8 @@ def _validate_activities_account(account: Dict, account_num: str) -> List[str]:
             continue  # Section is optional
 
         transactions = account[section_name]
+        if transactions is None:
+            continue  # null section - loaded as empty, like a missing one
         if not isinstance(transactions, list):
             errors.append(f"{account_num}.{section_name}: Must be an array")
             continue
@@ -527,7 +523,7 @@ def _validate_activities_account(account: Dict, account_num: str) -> List[str]:
             for field in ['amount', 'quantity', 'cost_basis', 'fees']:
                 if field in txn and txn[field] is not None:
                     try:
-                        value = parse_currency(txn[field])
+                        value = _parse_validated_amount(txn[field], loader_amounts)
                         if value is not None:
                             # Check fits in NUMERIC(15,2) - max 13 digits before decimal
                             if abs(value) >= Decimal('10000000000000'):
@@ -549,7 +545,7 @@ def _validate_activities_account(account: Dict, account_num: str) -> List[str]:
     return errors
 
 
-def _validate_positions_account(account: Dict, account_num: str) -> List[str]:
+def _validate_positions_account(account: Dict, account_num: str, loader_amounts: bool = False) -> List[str]:
     """
     Validate positions data for a single account.
 
@@ -576,7 +572,7 @@ def _validate_positions_account(account: Dict, account_num: str) -> List[str]:
                       'unrealized_gain_loss', 'estimated_ann_inc', 'price']:
             if field in pos and pos[field] is not None:
                 try:
-                    value = parse_currency(pos[field])
+                    value = _parse_validated_amount(pos[field], loader_amounts)
                     if value is not None:
                         # Check fits in NUMERIC(15,2)
                         if abs(value) >= Decimal('10000000000000'):
@@ -712,6 +708,28 @@ if __name__ == "__main__":
     is_valid, errors = validate_json_before_load(bad_currency_json, 'activities')
     print(f"   Bad currency: is_valid={is_valid}, errors={errors}")
 
+    # Same value with the loader's amount rules (loads as NULL)
+    is_valid, errors = validate_json_before_load(bad_currency_json, 'activities', loader_amounts=True)
+    print(f"   Bad currency (loader_amounts): is_valid={is_valid}, errors={errors}")
+    assert is_valid, errors
+
+    # Test 9: every already loaded extraction passes the pre-load check
+    print("\n9. Testing validate_json_before_load(loader_amounts=True) on documents/5loaded:")
+    loaded_dir = Path(__file__).resolve().parent.parent / 'documents' / '5loaded'
+    loaded_files = sorted(loaded_dir.glob('*.json'))
+    rejected = []
+    for json_path in loaded_files:
+        with open(json_path) as f:
+            loaded_json = json.load(f)
+        data_type = 'positions' if any('holdings' in account for account in loaded_json.get('accounts', [])) \
+            else 'activities'
+        is_valid, errors = validate_json_before_load(loaded_json, data_type, loader_amounts=True)
+        if not is_valid:
+            rejected.append(json_path.name)
+            print(f"   {json_path.name}: {errors[:3]}")
+    print(f"   {len(loaded_files) - len(rejected)} of {len(loaded_files)} loaded extractions valid")
+    assert not rejected, f"Loaded extractions rejected: {rejected}"
+
     print("\n" + "=" * 80)
     print("All tests completed successfully!")
     print("=" * 80)
\ No newline at end of file
@@ -3,6 +3,21 @@
 Fidelity Statement PDF Text Extractor using PDF Plumber
 
 Created: 2025-09-26 4:54PM - Purpose: Extract structured text from Fidelity PDF statements
+Updated: 2026-10-19 2:55AM - Parallel mode (--workers N): page ranges processed in a process pool, each worker
+  opening the PDF itself, results merged in page order into the same extracted_data; --benchmark compares
+  worker counts against the sequential path
+Updated: 2026-10-19 3:30AM - PageAnalysis: each page's text, words and tables extracted once (lazily) and shared
+  by every stage; extraction_summary.page_extractions counts extractions done and reused; each page's
+  pdfplumber caches are released once it is processed
+Updated: 2026-10-19 4:05AM - Persistent page cache (page_cache.py): each page's text, words and tables stored by
+  PDF hash + page number + pdfplumber version, so unchanged pages are not extracted again (the PDF is not
+  opened at all when every page is cached); --no-page-cache, --page-cache-size
+Updated: 2026-10-19 4:40AM - Section filter (page_index.py): --extraction-type holdings|activities or --sections
+  processes only the pages the PDF's saved section index maps to those sections
+Updated: 2026-10-19 5:15AM - Streaming output (extraction_stream.py): --stream writes page results as JSON Lines
+  while extracting and resumes an unfinished stream; --consolidate builds the single-JSON/text output from it
+Updated: 2026-10-19 7:25AM - PageAnalysis.words/tables touch the page only on a cache miss, so a fully cached
+  run really does not open the PDF
 Author: Claude Code Assistant
 Version: 1.0
 
@@ -17,17 +32,31 @@ Requirements:
 
 Usage:
     python3 extract_fidelity_pdf_text.py [pdf_path] [output_path]
+    python3 extract_fidelity_pdf_text.py [pdf_path] [output_path] --workers 4
+    python3 extract_fidelity_pdf_text.py [pdf_path] --benchmark --workers 2 4 8 [--repeat 3]
+    python3 extract_fidelity_pdf_text.py [pdf_path] [output_path] --no-page-cache
+    python3 extract_fidelity_pdf_text.py [pdf_path] [output_path] --extraction-type holdings
+    python3 extract_fidelity_pdf_text.py [pdf_path] [output_path] --sections income_summary realized_gains
+    python3 extract_fidelity_pdf_text.py [pdf_path] [output_path] --stream [--no-resume]
+    python3 extract_fidelity_pdf_text.py --consolidate output_path/<pdf name>_extracted_text.jsonl
 """
 
 import pdfplumber
+import argparse
 import json
 import logging
 import sys
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 import re
 
+from page_cache import PageCache, DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES, pdf_content_hash
+from page_index import EXTRACTION_SECTIONS, SECTIONS, load_page_index, resolve_sections
+from extraction_stream import ExtractionStream, consolidate_stream, stream_file_path
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -39,12 +68,151 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Page ranges handed out per worker - more, smaller ranges even out pages that take longer
+RANGES_PER_WORKER = 2
+
+
+# pdfplumber results PageAnalysis computes at most once per page
+PAGE_EXTRACTIONS = ("text", "words", "tables")
+
+# Page cache extractor key - results from another pdfplumber version are not reused
+PAGE_EXTRACTOR = f"pdfplumber_{pdfplumber.__version__}"
+
+
+class PageAnalysis:
+    """One page's pdfplumber text, words and tables - each extracted on first use and then reused"""
+
+    def __init__(self, page, page_number: Optional[int] = None,
+                 cache: Optional[PageCache] = None, pdf_hash: Optional[str] = None):
+        """
+        Args:
+            page: pdfplumber page, or a callable returning one (called only if a result is not cached)
+            cache: PageCache checked before, and filled after, each pdfplumber extraction
+            pdf_hash: pdf_content_hash() of the PDF (required with cache)
+        """
+        self._page = page
+        self.page_number = page.page_number if page_number is None else page_number
+        self.cache = cache
+        self.pdf_hash = pdf_hash
+        self._results = {}
+        self.extracted = dict.fromkeys(PAGE_EXTRACTIONS, 0)  # extraction → pdfplumber calls made
+        self.cached = dict.fromkeys(PAGE_EXTRACTIONS, 0)     # extraction → loaded from the page cache
+        self.reused = dict.fromkeys(PAGE_EXTRACTIONS, 0)     # extraction → calls avoided
+
+    @property
+    def page(self):
+        if callable(self._page):
+            self._page = self._page()
+        return self._page
+
+    def _get(self, name, extract):
+        if name in self._results:
+            self.reused[name] += 1
+            return self._results[name]
+
+        if self.cache is not None:
+            value = self.cache.get(self.pdf_hash, self.page_number, PAGE_EXTRACTOR, name)
+            if value is not None:
+                self._results[name] = value
+                self.cached[name] += 1
+                return value
+
+        self._results[name] = extract()
+        self.extracted[name] += 1
+        if self.cache is not None:
+            self.cache.put(self.pdf_hash, self.page_number, PAGE_EXTRACTOR, name, self._results[name])
+        return self._results[name]
+
+    @property
+    def text(self) -> str:
+        return self._get("text", lambda: self.page.extract_text() or "")
+
+    @property
+    def words(self) -> List[Dict]:
+        return self._get("words", lambda: self.page.extract_words())
+
+    @property
+    def tables(self) -> List[List]:
+        return self._get("tables", lambda: self.page.extract_tables())
+
+    def release(self):
+        """Drop pdfplumber's cached objects for the page once every stage is done with it"""
+        if not callable(self._page) and hasattr(self._page, "close"):
+            self._page.close()
+
+    def extraction_counts(self) -> Dict[str, Dict[str, int]]:
+        return {name: {"extracted": self.extracted[name], "cached": self.cached[name], "reused": self.reused[name]}
+                for name in PAGE_EXTRACTIONS}
+
+
+def analyze_page(page) -> PageAnalysis:
+    """Wrap a pdfplumber page in a PageAnalysis (an existing PageAnalysis is returned as is)"""
+    return page if isinstance(page, PageAnalysis) else PageAnalysis(page)
+
+
+def page_ranges(page_numbers: List[int], range_count: int) -> List[List[int]]:
+    """Split page numbers (in order) into at most range_count consecutive runs of near-equal size"""
+    range_count = max(1, min(range_count, len(page_numbers)))
+    size, extra = divmod(len(page_numbers), range_count)
+    ranges = []
+    first = 0
+    for index in range(range_count):
+        last = first + size + (1 if index < extra else 0)
+        ranges.append(page_numbers[first:last])
+        first = last
+    return ranges
+
+
+class LazyPDF:
+    """pdfplumber.open() deferred until a page is actually needed - skipped when every page is cached"""
+
+    def __init__(self, pdf_path: str):
+        self.pdf_path = pdf_path
+        self._pdf = None
+
+    @property
+    def pdf(self):
+        if self._pdf is None:
+            self._pdf = pdfplumber.open(self.pdf_path)
+        return self._pdf
+
+    def page_loader(self, page_num: int):
+        """Callable returning pdfplumber page page_num (1-based), for PageAnalysis"""
+        return lambda: self.pdf.pages[page_num - 1]
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def extract_page_range(pdf_path: str, page_numbers: List[int],
+                       cache_path: Optional[str] = None, cache_max_bytes: int = DEFAULT_MAX_BYTES) -> List[Dict[str, Any]]:
+    """Worker: open the PDF (and page cache) independently and process the given pages (1-based)"""
+    page_cache = PageCache(cache_path, cache_max_bytes) if cache_path is not None else None
+    extractor = FidelityPDFExtractor(pdf_path, output_dir=None, page_cache=page_cache)
+    try:
+        with LazyPDF(pdf_path) as pdf:
+            return [extractor.process_page(extractor.analyze(pdf, page_num), page_num)
+                    for page_num in page_numbers]
+    finally:
+        if page_cache is not None:
+            page_cache.close()
+
 class FidelityPDFExtractor:
     """Extract structured text from Fidelity PDF statements"""
 
-    def __init__(self, pdf_path: str, output_dir: str):
+    def __init__(self, pdf_path: str, output_dir: str, page_cache: Optional[PageCache] = None):
         self.pdf_path = pdf_path
         self.output_dir = output_dir
+        self.page_cache = page_cache
+        self._pdf_hash = None
         self.extraction_timestamp = datetime.now().strftime("%Y.%m.%d_%H.%M")
         self.extracted_data = {
             "extraction_metadata": {
@@ -60,12 +228,54 @@ class FidelityPDFExtractor:
             "extraction_summary": {}
         }
 
+    @classmethod
+    def from_stream(cls, stream_path: str) -> "FidelityPDFExtractor":
+        """Extractor holding a finished stream's results in the single-JSON layout (saved next to the stream)"""
+        data = consolidate_stream(stream_path)
+        metadata = data["extraction_metadata"]
+        extractor = cls(metadata["source_pdf"], os.path.dirname(os.path.abspath(stream_path)))
+        extractor.extraction_timestamp = metadata["extraction_timestamp"]
+        extractor.extracted_data = data
+        return extractor
+
+    @property
+    def pdf_hash(self) -> str:
+        """Page cache key for the PDF contents (hashed once)"""
+        if self._pdf_hash is None:
+            self._pdf_hash = pdf_content_hash(self.pdf_path)
+        return self._pdf_hash
+
+    def analyze(self, pdf: LazyPDF, page_num: int) -> PageAnalysis:
+        """PageAnalysis for a page, served from the page cache when one is set"""
+        if self.page_cache is None:
+            return PageAnalysis(pdf.pdf.pages[page_num - 1])
+        return PageAnalysis(pdf.page_loader(page_num), page_num, cache=self.page_cache, pdf_hash=self.pdf_hash)
+
+    def document_info(self, pdf: LazyPDF) -> Dict[str, Any]:
+        """Page count and PDF metadata (kept in the page cache as page 0)"""
+        if self.page_cache is not None:
+            info = self.page_cache.get(self.pdf_hash, 0, PAGE_EXTRACTOR, "document_info")
+            if info is not None:
+                return info
+
+        info = {
+            "total_pages": len(pdf.pdf.pages),
+            "pdf_metadata": pdf.pdf.metadata if hasattr(pdf.pdf, 'metadata') else {}
+        }
+        if self.page_cache is not None:
+            try:
+                self.page_cache.put(self.pdf_hash, 0, PAGE_EXTRACTOR, "document_info", info)
+            except TypeError:
+                pass  # Metadata that is not JSON-serializable is read from the PDF every time
+        return info
+
     def detect_table_structure(self, page) -> List[Dict]:
-        """Detect and extract table structures from a page"""
+        """Detect and extract table structures from a page (pdfplumber page or PageAnalysis)"""
+        page = analyze_page(page)
         tables = []
 
         # Try to extract tables using PDF Plumber's table detection
-        page_tables = page.extract_tables()
+        page_tables = page.tables
 
         for i, table in enumerate(page_tables):
             if table and len(table) > 0:
@@ -91,8 +301,9 @@ class FidelityPDFExtractor:
 
     def extract_text_based_tables(self, page) -> List[Dict]:
         """Extract table-like structures from text when automatic detection fails"""
+        page = analyze_page(page)
         tables = []
-        full_text = page.extract_text() or ""
+        full_text = page.text
 
         # Split text into lines
         lines = full_text.split('\n')
@@ -302,7 +513,7 @@ class FidelityPDFExtractor:
 
     def extract_text_sections(self, page) -> Dict[str, str]:
         """Extract text sections that aren't in tables"""
-        full_text = page.extract_text()
+        full_text = analyze_page(page).text
 
         # Split text into logical sections
         sections = {}
@@ -386,53 +597,120 @@ class FidelityPDFExtractor:
 
         return securities
 
-    def process_pdf(self) -> Dict[str, Any]:
-        """Main processing function"""
+    def process_page(self, page, page_num: int) -> Dict[str, Any]:
+        """Extract tables, text sections, account info and securities from one page"""
+        logger.info(f"Processing page {page_num}")
+
+        # Text and tables extracted once, shared by every stage below
+        page = analyze_page(page)
+
+        # Extract tables from this page
+        page_tables = self.detect_table_structure(page)
+
+        # Extract text sections
+        text_sections = self.extract_text_sections(page)
+
+        # Extract account information
+        page_text = page.text
+        account_info = self.extract_account_information(page_text)
+
+        # Extract security descriptions
+        securities = self.extract_security_descriptions(page_text)
+        page.release()
+
+        return {
+            "page_number": page_num,
+            "tables": page_tables,
+            "text_sections": text_sections,
+            "account_info": account_info,
+            "securities": securities,
+            "extraction_counts": page.extraction_counts(),
+            # Record page processing
+            "page_record": {
+                "page_number": page_num,
+                "tables_found": len(page_tables),
+                "text_length": len(page_text),
+                "has_account_info": bool(account_info)
+            }
+        }
+
+    def process_pages_parallel(self, page_numbers: List[int], workers: int) -> Iterator[Dict[str, Any]]:
+        """Process page ranges in a process pool; results come back in page order"""
+        ranges = page_ranges(page_numbers, workers * RANGES_PER_WORKER)
+        logger.info(f"Processing {len(page_numbers)} pages in {len(ranges)} ranges with {workers} workers")
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            cache_args = (str(self.page_cache.path), self.page_cache.max_bytes) if self.page_cache is not None else ()
+            futures = [pool.submit(extract_page_range, self.pdf_path, pages, *cache_args) for pages in ranges]
+            # Yield each range as soon as it (and every range before it) is done, so results can be streamed
+            for future in futures:
+                yield from future.result()
+
+    def process_pdf(self, workers: int = 1, sections: Optional[Tuple[str, ...]] = None,
+                    stream_path: Optional[str] = None, resume: bool = True) -> Dict[str, Any]:
+        """
+        Main processing function (workers > 1: pages processed in parallel, same result)
+
+        sections: page_index section names - only pages holding them are processed (None: every page)
+        stream_path: write page results to this JSON Lines stream as they complete instead of keeping
+            them in extracted_data (only metadata and the summary are kept); an unfinished stream for
+            the same PDF is resumed unless resume is False
+        """
         logger.info(f"Starting extraction of {self.pdf_path}")
+        stream = None
 
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                logger.info(f"PDF opened successfully. Pages: {len(pdf.pages)}")
-
-                self.extracted_data["document_info"] = {
-                    "total_pages": len(pdf.pages),
-                    "pdf_metadata": pdf.metadata if hasattr(pdf, 'metadata') else {}
-                }
+            with LazyPDF(self.pdf_path) as pdf:
+                self.extracted_data["document_info"] = self.document_info(pdf)
+                total_pages = self.extracted_data["document_info"]["total_pages"]
+                logger.info(f"PDF opened successfully. Pages: {total_pages}")
+
+                # Pages to process - from the section index when only some sections are wanted
+                page_numbers = list(range(1, total_pages + 1))
+                if sections is not None:
+                    page_numbers = load_page_index(self.pdf_path).pages_for(sections)
+                    logger.info(f"Sections {', '.join(sections)}: {len(page_numbers)} of {total_pages} pages")
+
+                if stream_path is not None:
+                    stream = ExtractionStream(stream_path, PAGE_EXTRACTIONS, resume=resume)
+                    completed = stream.open({
+                        "pdf_hash": self.pdf_hash,
+                        "sections": list(sections) if sections is not None else None,
+                        "extraction_metadata": self.extracted_data["extraction_metadata"],
+                        "document_info": self.extracted_data["document_info"]
+                    })
+                    if completed:
+                        logger.info(f"Resuming {stream_path}: {len(completed)} pages already extracted")
+                    page_numbers = [page_num for page_num in page_numbers if page_num not in completed]
 
                 all_tables = []
                 all_text_sections = {}
                 all_account_info = {}
                 all_securities = []
-
-                # Process each page
-                for page_num, page in enumerate(pdf.pages, 1):
-                    logger.info(f"Processing page {page_num}")
-
-                    # Extract tables from this page
-                    page_tables = self.detect_table_structure(page)
-                    all_tables.extend(page_tables)
-
-                    # Extract text sections
-                    text_sections = self.extract_text_sections(page)
-                    all_text_sections[f"page_{page_num}"] = text_sections
-
-                    # Extract account information
-                    page_text = page.extract_text() or ""
-                    account_info = self.extract_account_information(page_text)
-                    if account_info:
-                        all_account_info[f"page_{page_num}"] = account_info
-
-                    # Extract security descriptions
-                    securities = self.extract_security_descriptions(page_text)
-                    all_securities.extend(securities)
-
-                    # Record page processing
-                    self.extracted_data["pages_processed"].append({
-                        "page_number": page_num,
-                        "tables_found": len(page_tables),
-                        "text_length": len(page_text),
-                        "has_account_info": bool(account_info)
-                    })
+                page_extractions = {name: {"extracted": 0, "cached": 0, "reused": 0} for name in PAGE_EXTRACTIONS}
+
+                # Process each page (in a process pool when workers > 1)
+                if workers > 1 and len(page_numbers) > 1:
+                    page_results = self.process_pages_parallel(page_numbers, workers)
+                else:
+                    page_results = (self.process_page(self.analyze(pdf, page_num), page_num)
+                                    for page_num in page_numbers)
+
+                # Merge in page order
+                for page_result in page_results:
+                    if stream is not None:
+                        stream.write_page(page_result)
+                        continue
+                    page_num = page_result["page_number"]
+                    all_tables.extend(page_result["tables"])
+                    all_text_sections[f"page_{page_num}"] = page_result["text_sections"]
+                    if page_result["account_info"]:
+                        all_account_info[f"page_{page_num}"] = page_result["account_info"]
+                    all_securities.extend(page_result["securities"])
+                    for name, counts in page_result["extraction_counts"].items():
+                        for kind, count in counts.items():
+                            page_extractions[name][kind] += count
+                    self.extracted_data["pages_processed"].append(page_result["page_record"])
 
                 # Compile results
                 self.extracted_data["tables_found"] = all_tables
@@ -441,14 +719,36 @@ class FidelityPDFExtractor:
                 self.extracted_data["securities_found"] = all_securities
 
                 # Generate extraction summary
-                self.extracted_data["extraction_summary"] = {
-                    "total_pages": len(pdf.pages),
-                    "total_tables": len(all_tables),
-                    "tables_by_type": self._summarize_table_types(all_tables),
-                    "accounts_detected": self._extract_unique_accounts(all_account_info),
-                    "securities_count": len(all_securities),
-                    "extraction_status": "success"
-                }
+                if stream is None:
+                    self.extracted_data["extraction_summary"] = {
+                        "total_pages": total_pages,
+                        "total_tables": len(all_tables),
+                        "tables_by_type": self._summarize_table_types(all_tables),
+                        "accounts_detected": self._extract_unique_accounts(all_account_info),
+                        "securities_count": len(all_securities),
+                        "page_extractions": page_extractions,
+                        "extraction_status": "success"
+                    }
+                else:
+                    # Totals cover pages from earlier (resumed) runs too
+                    page_numbers = sorted(stream.completed_pages)
+                    self.extracted_data["extraction_summary"] = {
+                        "total_pages": total_pages,
+                        **stream.totals.summary(),
+                        "extraction_status": "success"
+                    }
+                    page_extractions = self.extracted_data["extraction_summary"]["page_extractions"]
+                if sections is not None:
+                    self.extracted_data["extraction_summary"]["sections_selected"] = list(sections)
+                    self.extracted_data["extraction_summary"]["pages_selected"] = page_numbers
+                if stream is not None:
+                    stream.finish(self.extracted_data["extraction_summary"])
+                    logger.info(f"Page results streamed to {stream_path}")
+                reused = sum(counts["reused"] for counts in page_extractions.values())
+                cached = sum(counts["cached"] for counts in page_extractions.values())
+                logger.info(f"Page extractions: {page_extractions['text']['extracted']} text, "
+                            f"{page_extractions['tables']['extracted']} tables; {reused} repeat extractions avoided, "
+                            f"{cached} loaded from the page cache")
 
                 logger.info("PDF extraction completed successfully")
                 return self.extracted_data
@@ -461,6 +761,11 @@ class FidelityPDFExtractor:
             }
             return self.extracted_data
 
+        finally:
+            # Pages written so far stay in the stream for a resumed run
+            if stream is not None:
+                stream.close()
+
     def _summarize_table_types(self, tables: List[Dict]) -> Dict[str, int]:
         """Summarize table types found"""
         type_counts = {}
@@ -537,28 +842,103 @@ class FidelityPDFExtractor:
         logger.info(f"Results saved to: {output_path}")
         return output_path
 
+def benchmark_extraction(pdf_path: str, worker_counts: List[int], repeat: int = 3) -> Dict[int, Dict[str, float]]:
+    """Time process_pdf sequentially and with each worker count; parallel results must match sequential"""
+    # Per-page log lines would dominate the timings
+    previous_level = logger.level
+    logger.setLevel(logging.WARNING)
+    results = {}
+    reference = None
+
+    try:
+        for workers in [1] + [count for count in worker_counts if count != 1]:
+            timings = []
+            for _ in range(repeat):
+                extractor = FidelityPDFExtractor(pdf_path, output_dir=None)
+                start = time.perf_counter()
+                data = extractor.process_pdf(workers=workers)
+                timings.append(time.perf_counter() - start)
+
+            if data["extraction_summary"].get("extraction_status") != "success":
+                raise ValueError(f"Extraction failed with {workers} workers: "
+                                 f"{data['extraction_summary'].get('error_message')}")
+            content = {key: value for key, value in data.items() if key != "extraction_metadata"}
+            if reference is None:
+                reference = content
+            elif content != reference:
+                raise ValueError(f"Parallel extraction with {workers} workers differs from the sequential result")
+
+            results[workers] = {"best": min(timings), "mean": sum(timings) / len(timings)}
+    finally:
+        logger.setLevel(previous_level)
+
+    sequential = results[1]["best"]
+    pages = reference["document_info"]["total_pages"]
+    print(f"\nBenchmark: {pdf_path} ({pages} pages, {repeat} runs each, {os.cpu_count()} CPUs)")
+    print(f"{'Workers':>8} {'Best':>9} {'Mean':>9} {'Pages/s':>9} {'Speedup':>8}")
+    for workers, timing in results.items():
+        print(f"{workers:>8} {timing['best']:>8.2f}s {timing['mean']:>8.2f}s "
+              f"{pages / timing['best']:>9.1f} {sequential / timing['best']:>7.2f}x")
+    return results
+
 def main():
     """Main execution function"""
     # Set default paths
     default_pdf_path = '/Users/richkernan/Projects/Finances/documents/3processed/Fid_Stmnt_2025-08_KernBrok+KernCMA.pdf'
     default_output_dir = '/Users/richkernan/Projects/Finances/documents/4extractions/'
 
-    # Use command line arguments if provided
-    if len(sys.argv) > 1:
-        pdf_path = sys.argv[1]
-    else:
-        pdf_path = default_pdf_path
-
-    if len(sys.argv) > 2:
-        output_dir = sys.argv[2]
-    else:
-        output_dir = default_output_dir
+    parser = argparse.ArgumentParser(description="Extract structured text from a Fidelity PDF statement")
+    parser.add_argument('pdf_path', nargs='?', default=default_pdf_path, help="Statement PDF")
+    parser.add_argument('output_dir', nargs='?', default=default_output_dir, help="Directory for the JSON/text output")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1],
+                        help="Processes for page extraction (default: 1 = sequential); several counts with --benchmark")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Time the sequential path and each --workers count instead of saving results")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per configuration with --benchmark")
+    parser.add_argument('--extraction-type', choices=sorted(EXTRACTION_SECTIONS),
+                        help="Process only the pages holding the sections this extraction type reads")
+    parser.add_argument('--sections', nargs='+', choices=SECTIONS, metavar='SECTION',
+                        help=f"Process only the pages holding these sections ({', '.join(SECTIONS)})")
+    parser.add_argument('--no-page-cache', action='store_true',
+                        help="Extract every page with pdfplumber, ignoring and not updating the page cache")
+    parser.add_argument('--page-cache', default=str(DEFAULT_CACHE_PATH), help=f"Page cache file (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument('--page-cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Page cache size limit in MB before least recently used pages are evicted")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write page results as JSON Lines while extracting (resumes an unfinished stream)")
+    parser.add_argument('--no-resume', action='store_true', help="With --stream, start the stream over")
+    parser.add_argument('--consolidate', metavar='JSONL',
+                        help="Write the single-JSON (and text) output for a finished stream, next to it, and exit")
+    args = parser.parse_args()
+    pdf_path = args.pdf_path
+    output_dir = args.output_dir
+
+    if args.consolidate:
+        try:
+            extractor = FidelityPDFExtractor.from_stream(args.consolidate)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot consolidate {args.consolidate}: {e}")
+            sys.exit(1)
+        print(f"- JSON: {extractor.save_results('json')}")
+        print(f"- Text: {extractor.save_results('text')}")
+        return
+
+    if any(workers < 1 for workers in args.workers):
+        logger.error("--workers must be at least 1")
+        sys.exit(1)
+    if args.page_cache_size < 1:
+        logger.error("--page-cache-size must be at least 1 MB")
+        sys.exit(1)
 
     # Verify paths exist
     if not os.path.exists(pdf_path):
         logger.error(f"PDF file not found: {pdf_path}")
         sys.exit(1)
 
+    if args.benchmark:
+        benchmark_extraction(pdf_path, args.workers, repeat=args.repeat)
+        return
+
     if not os.path.exists(output_dir):
         logger.error(f"Output directory not found: {output_dir}")
         sys.exit(1)
@@ -567,18 +947,23 @@ def main():
     os.makedirs('/tmp/claude', exist_ok=True)
 
     # Initialize extractor and process
-    extractor = FidelityPDFExtractor(pdf_path, output_dir)
+    page_cache = None if args.no_page_cache else PageCache(args.page_cache, args.page_cache_size * 1024 * 1024)
+    extractor = FidelityPDFExtractor(pdf_path, output_dir, page_cache=page_cache)
 
     logger.info("="*60)
     logger.info("FIDELITY PDF TEXT EXTRACTION STARTING")
     logger.info("="*60)
 
     # Process the PDF
-    results = extractor.process_pdf()
+    jsonl_output = stream_file_path(output_dir, pdf_path) if args.stream else None
+    results = extractor.process_pdf(workers=args.workers[0],
+                                    sections=resolve_sections(args.extraction_type, args.sections),
+                                    stream_path=jsonl_output, resume=not args.no_resume)
 
-    # Save results in both formats
-    json_output = extractor.save_results("json")
-    text_output = extractor.save_results("text")
+    # Save results in both formats (a stream already holds them - see --consolidate)
+    if jsonl_output is None:
+        json_output = extractor.save_results("json")
+        text_output = extractor.save_results("text")
 
     # Print summary
     summary = results.get("extraction_summary", {})
@@ -587,12 +972,22 @@ def main():
     print("="*60)
     print(f"Status: {summary.get('extraction_status', 'unknown')}")
     print(f"Pages processed: {summary.get('total_pages', 'unknown')}")
+    if 'pages_selected' in summary:
+        print(f"Pages extracted: {len(summary['pages_selected'])} ({', '.join(summary['sections_selected'])})")
     print(f"Tables found: {summary.get('total_tables', 'unknown')}")
     print(f"Accounts detected: {len(summary.get('accounts_detected', []))}")
     print(f"Securities found: {summary.get('securities_count', 'unknown')}")
+    page_extractions = summary.get('page_extractions', {})
+    print(f"Repeat page extractions avoided: {sum(counts['reused'] for counts in page_extractions.values())}")
+    if page_cache is not None:
+        print(f"Page extractions from cache: {sum(counts['cached'] for counts in page_extractions.values())}")
+        page_cache.close()
     print(f"\nOutput files:")
-    print(f"- JSON: {json_output}")
-    print(f"- Text: {text_output}")
+    if jsonl_output is None:
+        print(f"- JSON: {json_output}")
+        print(f"- Text: {text_output}")
+    else:
+        print(f"- JSON Lines: {jsonl_output} (single JSON: --consolidate {jsonl_output})")
 
     if summary.get('extraction_status') == 'failed':
         print(f"Error: {summary.get('error_message', 'Unknown error')}")
@@ -2,19 +2,27 @@
 """
 Created: 09/22/25 6:26PM
 Updated: 09/22/25 6:43PM - Added text-only extraction for token efficiency
+Updated: 10/19/26 4:05AM - Text-only extraction reads pages from the page cache (page_cache.py) when present,
+  so PyPDF2 is skipped for pages already extracted from the same PDF; --no-cache disables it
 Purpose: Extract specific pages from a PDF file to reduce token usage when reading PDFs
 
 Extract specific pages from a PDF file as text or full PDF.
 Usage:
   python extract_pdf_pages.py input.pdf output.pdf start_page [end_page]           # Extract full PDF pages
   python extract_pdf_pages.py input.pdf output.txt start_page [end_page] --text   # Extract text only
+  python extract_pdf_pages.py input.pdf output.txt start_page [end_page] --text --no-cache
 """
 
 import sys
 import PyPDF2
 from pathlib import Path
 
-def extract_text_only(input_pdf_path, output_text_path, start_page, end_page=None):
+from page_cache import PageCache, pdf_content_hash
+
+# Page cache extractor key - text from another PyPDF2 version is not reused
+PAGE_EXTRACTOR = f"PyPDF2_{PyPDF2.__version__}"
+
+def extract_text_only(input_pdf_path, output_text_path, start_page, end_page=None, cache=None):
     """
     Extract text from specific pages of a PDF file for token-efficient reading.
 
@@ -23,6 +31,7 @@ def extract_text_only(input_pdf_path, output_text_path, start_page, end_page=Non
         output_text_path: Path to output text file
         start_page: Starting page number (1-indexed)
         end_page: Ending page number (1-indexed), if None uses start_page
+        cache: PageCache - pages (and the page count, as page 0) already cached are not read with PyPDF2
     """
     if end_page is None:
         end_page = start_page
@@ -32,11 +41,23 @@ def extract_text_only(input_pdf_path, output_text_path, start_page, end_page=Non
     end_idx = end_page - 1
 
     try:
+        pdf_hash = pdf_content_hash(input_pdf_path) if cache is not None else None
         with open(input_pdf_path, 'rb') as input_file:
-            reader = PyPDF2.PdfReader(input_file)
+            reader = None  # PyPDF2 only parses the file if something is not cached
+
+            def cached(page_number, kind, read):
+                nonlocal reader
+                value = cache.get(pdf_hash, page_number, PAGE_EXTRACTOR, kind) if cache is not None else None
+                if value is None:
+                    if reader is None:
+                        reader = PyPDF2.PdfReader(input_file)
+                    value = read()
+                    if cache is not None:
+                        cache.put(pdf_hash, page_number, PAGE_EXTRACTOR, kind, value)
+                return value
 
             # Validate page numbers
-            total_pages = len(reader.pages)
+            total_pages = cached(0, 'page_count', lambda: len(reader.pages))
             if start_idx < 0 or end_idx >= total_pages:
                 print(f"Error: Page numbers out of range. PDF has {total_pages} pages.")
                 return False
@@ -44,7 +65,7 @@ def extract_text_only(input_pdf_path, output_text_path, start_page, end_page=Non
             # Extract text from pages
             extracted_text = ""
             for page_idx in range(start_idx, end_idx + 1):
-                page_text = reader.pages[page_idx].extract_text()
+                page_text = cached(page_idx + 1, 'text', lambda: reader.pages[page_idx].extract_text())
                 extracted_text += f"=== PAGE {page_idx + 1} ===\n{page_text}\n\n"
 
             # Write text output
@@ -55,6 +76,8 @@ def extract_text_only(input_pdf_path, output_text_path, start_page, end_page=Non
             char_count = len(extracted_text)
             print(f"Successfully extracted text from {pages_extracted} page(s) to {output_text_path}")
             print(f"Total characters: {char_count}")
+            if cache is not None:
+                print(f"Pages from cache: {cache.hits} of {cache.hits + cache.misses} lookups")
             return True
 
     except Exception as e:
@@ -114,12 +137,16 @@ def main():
         print("  python extract_pdf_pages.py statement.pdf first_page.pdf 1")
         print("  python extract_pdf_pages.py statement.pdf first_two.pdf 1 2")
         print("  python extract_pdf_pages.py statement.pdf first_two.txt 1 2 --text")
+        print("  python extract_pdf_pages.py statement.pdf first_two.txt 1 2 --text --no-cache   # Always read with PyPDF2")
         sys.exit(1)
 
     # Check for --text flag
     text_only = '--text' in sys.argv
     if text_only:
         sys.argv.remove('--text')  # Remove flag to simplify parsing
+    use_cache = '--no-cache' not in sys.argv
+    if not use_cache:
+        sys.argv.remove('--no-cache')
 
     input_pdf = sys.argv[1]
     output_file = sys.argv[2]
@@ -133,7 +160,10 @@ def main():
 
     # Choose extraction method based on flag
     if text_only:
-        success = extract_text_only(input_pdf, output_file, start_page, end_page)
+        cache = PageCache() if use_cache else None
+        success = extract_text_only(input_pdf, output_file, start_page, end_page, cache=cache)
+        if cache is not None:
+            cache.close()
     else:
         success = extract_pages(input_pdf, output_file, start_page, end_page)
 
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Extraction Stream - Page results written as JSON Lines while a PDF is extracted
+
+Created: 10/19/26 5:15AM
+Purpose: Keep extraction memory flat and lose nothing but the current page if a run dies
+
+FidelityPDFExtractor.process_pdf(stream_path=...) writes each page as soon as it is
+processed instead of holding every table and text section for save_results:
+
+    {"record": "document", ...}   header: PDF hash, sections, metadata, document_info
+    {"record": "table", ...}      one per table, before its page record
+    {"record": "page", ...}       page text sections, account info, securities - marks the page complete
+    {"record": "summary", ...}    extraction_summary, written when every page is done
+
+Rerunning on an existing stream for the same PDF (and sections) resumes it: records after
+the last complete page (a half-written line, tables of an unfinished page, an old
+summary) are truncated away and only the remaining pages are processed.
+
+consolidate_stream() rebuilds the single-JSON layout save_results writes.
+
+Usage:
+    python3 extract_fidelity_pdf_text.py statement.pdf output_dir --stream      # write / resume the stream
+    python3 extract_fidelity_pdf_text.py --consolidate output_dir/statement_extracted_text.jsonl
+"""
+
+import json
+import os
+from pathlib import Path
+
+# Bump when the record layout changes so older streams are restarted instead of resumed
+STREAM_VERSION = 1
+
+
+def stream_file_path(output_dir, pdf_path):
+    """Stream file for a PDF - no timestamp, so a rerun finds it to resume"""
+    pdf_basename = os.path.splitext(os.path.basename(pdf_path))[0]
+    return Path(output_dir) / f"{pdf_basename}_extracted_text.jsonl"
+
+
+def read_records(path):
+    """Yield (record, end offset) for each complete line; stops at a partial or unreadable line"""
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                return
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return
+            offset += len(line)
+            yield record, offset
+
+
+class StreamTotals:
+    """extraction_summary counts kept as pages are streamed (same values process_pdf computes in memory)"""
+
+    def __init__(self, extraction_names):
+        self.total_tables = 0
+        self.tables_by_type = {}
+        self.accounts = set()
+        self.securities_count = 0
+        self.page_extractions = {name: {"extracted": 0, "cached": 0, "reused": 0} for name in extraction_names}
+
+    def add_table(self, table):
+        self.total_tables += 1
+        table_type = table.get("table_type", "unknown")
+        self.tables_by_type[table_type] = self.tables_by_type.get(table_type, 0) + 1
+
+    def add_page(self, page):
+        if "account_numbers" in page["account_info"]:
+            self.accounts.update(page["account_info"]["account_numbers"])
+        self.securities_count += len(page["securities"])
+        for name, counts in page["extraction_counts"].items():
+            for kind, count in counts.items():
+                self.page_extractions[name][kind] += count
+
+    def summary(self):
+        return {
+            "total_tables": self.total_tables,
+            "tables_by_type": self.tables_by_type,
+            "accounts_detected": list(self.accounts),
+            "securities_count": self.securities_count,
+            "page_extractions": self.page_extractions,
+        }
+
+
+class ExtractionStream:
+    """Append-only JSON Lines writer for one PDF's page results, resuming an earlier partial stream"""
+
+    def __init__(self, path, extraction_names, resume=True):
+        self.path = Path(path)
+        self.extraction_names = extraction_names
+        self.resume = resume
+        self.totals = StreamTotals(extraction_names)
+        self.completed_pages = set()
+        self.header = None
+        self.file = None
+
+    def open(self, header):
+        """
+        Start the stream, or resume it if it was written for the same PDF hash, sections and STREAM_VERSION
+
+        Returns:
+            set: page numbers already complete (skip them)
+        """
+        header = {"record": "document", "stream_version": STREAM_VERSION, **header}
+        resume_offset = self._scan(header) if self.resume and self.path.exists() else None
+
+        if resume_offset is None:
+            self.file = open(self.path, 'w', encoding='utf-8')
+            self._write(header)
+            self.header = header
+        else:
+            with open(self.path, 'r+b') as f:
+                f.truncate(resume_offset)
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.flush()
+        return self.completed_pages
+
+    def _scan(self, header):
+        """Totals and completed pages of an existing stream; offset just past its last complete page, or None"""
+        records = read_records(self.path)
+        first = next(records, None)
+        if first is None or first[0].get("record") != "document" or \
+                any(first[0].get(key) != header[key] for key in ("stream_version", "pdf_hash", "sections")):
+            return None
+
+        self.header = first[0]
+        resume_offset = first[1]
+        pending_tables = []
+        for record, offset in records:
+            if record.get("record") == "table":
+                pending_tables.append(record)
+            elif record.get("record") == "page":
+                for table in pending_tables:
+                    self.totals.add_table(table)
+                pending_tables = []
+                self.totals.add_page(record)
+                self.completed_pages.add(record["page_number"])
+                resume_offset = offset
+        return resume_offset
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def write_page(self, page_result):
+        """Append a page's tables and then its page record (flushed, so a completed page survives a crash)"""
+        for table in page_result["tables"]:
+            self._write({"record": "table", **table})
+            self.totals.add_table(table)
+        page = {key: value for key, value in page_result.items() if key != "tables"}
+        self._write({"record": "page", **page})
+        self.file.flush()
+        self.totals.add_page(page)
+        self.completed_pages.add(page_result["page_number"])
+
+    def finish(self, summary):
+        """Append the extraction summary and close the stream"""
+        self._write({"record": "summary", **summary})
+        self.close()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def consolidate_stream(path):
+    """
+    Rebuild save_results' single-JSON extracted_data from a finished stream
+
+    Raises:
+        ValueError: the stream is not a finished extraction stream
+    """
+    extracted_data = None
+    pending_tables = []
+    for record, _ in read_records(path):
+        kind = record.pop("record", None)
+        if extracted_data is None:
+            if kind != "document":
+                raise ValueError(f"{path} is not an extraction stream (no document record)")
+            extracted_data = {
+                "extraction_metadata": record["extraction_metadata"],
+                "document_info": record["document_info"],
+                "pages_processed": [],
+                "tables_found": [],
+                "text_sections": {},
+                "extraction_summary": {},
+                "account_information": {},
+                "securities_found": [],
+            }
+        elif kind == "table":
+            pending_tables.append(record)
+        elif kind == "page":
+            page_num = record["page_number"]
+            extracted_data["tables_found"].extend(pending_tables)
+            pending_tables = []
+            extracted_data["text_sections"][f"page_{page_num}"] = record["text_sections"]
+            if record["account_info"]:
+                extracted_data["account_information"][f"page_{page_num}"] = record["account_info"]
+            extracted_data["securities_found"].extend(record["securities"])
+            extracted_data["pages_processed"].append(record["page_record"])
+        elif kind == "summary":
+            extracted_data["extraction_summary"] = record
+            return extracted_data
+
+    raise ValueError(f"{path} is incomplete (no summary record) - rerun the extraction with --stream to resume it")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Page Cache - Persistent per-page PDF extraction results
+
+Created: 10/19/26 4:05AM
+Purpose: Skip pdfplumber/PyPDF2 for pages whose extraction is already known
+
+Repeat runs over the same statements (parser tuning, re-extraction) redo the most
+expensive work - text and table extraction - for pages that have not changed. This
+cache stores each page's raw results in one SQLite file:
+
+- key: PDF content hash (md5 of the file) + page number + extractor (library and
+  version, e.g. "pdfplumber_0.11.10") + kind ("text", "words", "tables", ...)
+- value: zlib-compressed JSON
+- bounded size: when the stored bytes exceed max_bytes, least recently used
+  entries are evicted down to EVICT_TO of the limit
+
+Used by extract_fidelity_pdf_text.py (PageAnalysis) and extract_pdf_pages.py
+(extract_text_only). Each process opens its own connection, so parallel extractor
+workers can share one cache file.
+
+Usage:
+    from page_cache import PageCache, pdf_content_hash
+
+    cache = PageCache()                            # DEFAULT_CACHE_PATH, DEFAULT_MAX_BYTES
+    pdf_hash = pdf_content_hash(pdf_path)
+    text = cache.get(pdf_hash, 3, "pdfplumber_0.11.10", "text")
+    if text is None:
+        text = page.extract_text()
+        cache.put(pdf_hash, 3, "pdfplumber_0.11.10", "text", text)
+
+    python3 page_cache.py [--cache path] [--clear]     # show (or clear) cache statistics
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / 'page_cache.sqlite'
+
+# Stored (compressed) bytes allowed before least recently used pages are evicted
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Eviction trims the cache to this fraction of max_bytes, so it does not run on every put
+EVICT_TO = 0.9
+
+# Bytes read per hash update
+HASH_CHUNK = 1 << 20
+
+_pdf_hashes = {}  # (path, size, mtime) → md5, for repeated calls within one process
+
+
+def pdf_content_hash(pdf_path):
+    """md5 of the PDF file bytes (same as documents.doc_md5_hash)"""
+    path = Path(pdf_path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _pdf_hashes:
+        digest = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+                digest.update(chunk)
+        _pdf_hashes[key] = digest.hexdigest()
+    return _pdf_hashes[key]
+
+
+class PageCache:
+    """SQLite store of compressed per-page extraction results with size-bounded LRU eviction"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes must be positive, got {max_bytes}")
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                pdf_hash TEXT NOT NULL,
+                page_number INTEGER NOT NULL,
+                extractor TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (pdf_hash, page_number, extractor, kind)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_last_used_idx ON pages (last_used)")
+        self.total_bytes = self._stored_bytes()
+
+    def _stored_bytes(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, pdf_hash, page_number, extractor, kind):
+        """Cached value, or None on a miss"""
+        key = (pdf_hash, page_number, extractor, kind)
+        row = self.conn.execute("""
+            SELECT data FROM pages
+            WHERE pdf_hash = ? AND page_number = ? AND extractor = ? AND kind = ?
+        """, key).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.conn.execute("""
+            UPDATE pages SET last_used = ?
+            WHERE pdf_hash = ? AND page_number = ? AND extractor = ? AND kind = ?
+        """, (time.time(), *key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, pdf_hash, page_number, extractor, kind, value):
+        """Store a JSON-serializable value, evicting old pages if the cache grows past max_bytes"""
+        data = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        self.conn.execute("""
+            INSERT OR REPLACE INTO pages (pdf_hash, page_number, extractor, kind, data, size, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (pdf_hash, page_number, extractor, kind, data, len(data), time.time()))
+        self.total_bytes += len(data)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used pages until the cache is within EVICT_TO of max_bytes"""
+        # Other processes may have written since this one last looked
+        self.total_bytes = self._stored_bytes()
+        target = int(self.max_bytes * EVICT_TO)
+        if self.total_bytes <= target:
+            return
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            freed = 0
+            doomed = []
+            for rowid, size in self.conn.execute("SELECT rowid, size FROM pages ORDER BY last_used"):
+                if self.total_bytes - freed <= target:
+                    break
+                doomed.append((rowid,))
+                freed += size
+            self.conn.executemany("DELETE FROM pages WHERE rowid = ?", doomed)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.total_bytes -= freed
+        self.evicted += len(doomed)
+
+    def clear(self):
+        """Remove every cached page"""
+        self.conn.execute("DELETE FROM pages")
+        self.conn.execute("VACUUM")
+        self.total_bytes = 0
+
+    def stats(self):
+        row = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT pdf_hash) FROM pages").fetchone()
+        return {
+            'entries': row[0],
+            'pdfs': row[1],
+            'stored_bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evicted': self.evicted,
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or clear the page extraction cache")
+    parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE_PATH, help=f"Cache file (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument('--clear', action='store_true', help="Remove every cached page")
+    args = parser.parse_args()
+
+    cache = PageCache(args.cache)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {args.cache}")
+    stats = cache.stats()
+    print(f"{args.cache}: {stats['entries']} entries for {stats['pdfs']} PDFs, "
+          f"{stats['stored_bytes'] / 1024 / 1024:.1f} MB of {stats['max_bytes'] / 1024 / 1024:.0f} MB")
+    cache.close()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Page Index - Which statement sections and account each page of a Fidelity PDF holds
+
+Created: 10/19/26 4:40AM
+Purpose: Let holdings-only or activities-only extractions parse just the pages they need
+
+A cheap first pass reads each page's text with PyPDF2 (about a tenth of the cost of a
+pdfplumber pass) and looks only at section headings:
+
+- the running title after the "Account # ..." header line ("... Holdings", "... Activity")
+  names the section at the top of the page
+- heading lines inside the page ("Holdings", "Activity", "Income Summary",
+  "Realized Gains and Losses from Sales", ...) start new sections
+- a page without either continues the section the previous page ended in
+
+The index is saved next to the PDF (<pdf>.page_index.json) with the PDF's md5 and
+INDEX_VERSION, and rebuilt only when either changes.
+
+Usage:
+    from page_index import load_page_index, resolve_sections
+
+    index = load_page_index(pdf_path)
+    pages = index.pages_for(resolve_sections(extraction_type='holdings'))
+
+    python3 page_index.py statement.pdf [--rebuild]      # print the index
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import PyPDF2
+
+from page_cache import pdf_content_hash
+
+# Bump when heading detection changes so saved indexes are rebuilt
+INDEX_VERSION = 1
+
+# Section → heading pattern (matched per line of PyPDF2 text), in statement order
+SECTION_HEADINGS = {
+    'portfolio_summary': r'^\s*Portfolio Summary',
+    'account_summary': r'^\s*Account Summary\s*$',
+    'income_summary': r'Income Summary(?: \(continued\))?\s*$',  # PyPDF2 may join it to the previous line
+    'realized_gains': r'^\s*Realized Gains and Losses from Sales',
+    'holdings': r'^\s*Holdings\s*$',
+    'activity': r'^\s*Activity\s*$',
+    'estimated_cash_flow': r'^\s*Estimated Cash Flow',
+    'additional_information': r'^\s*Additional Information and Endnotes',
+}
+SECTIONS = tuple(SECTION_HEADINGS)
+
+# Running page titles printed after the account holder's name
+PAGE_TITLES = {
+    'Account Summary': 'account_summary',
+    'Holdings': 'holdings',
+    'Activity': 'activity',
+    'Estimated Cash Flow': 'estimated_cash_flow',
+    'Additional Information and Endnotes': 'additional_information',
+}
+
+# Sections each extraction type reads (see config/institution-guides/Map_Stmnt_Fid_*.md)
+EXTRACTION_SECTIONS = {
+    'holdings': ('portfolio_summary', 'account_summary', 'income_summary', 'realized_gains', 'holdings'),
+    'activities': ('activity',),
+}
+
+ACCOUNT_PATTERN = re.compile(r'Account # ([A-Z0-9]{3}-[0-9]{6})')
+HEADING_PATTERNS = {section: re.compile(pattern, re.MULTILINE) for section, pattern in SECTION_HEADINGS.items()}
+TITLE_PATTERN = re.compile(r'\s(' + '|'.join(re.escape(title) for title in PAGE_TITLES) + r')\b')
+
+
+def index_path(pdf_path):
+    """Where the index for a PDF is saved"""
+    return Path(f"{pdf_path}.page_index.json")
+
+
+def resolve_sections(extraction_type=None, sections=None):
+    """
+    Sections to extract for an extraction type and/or explicit section names
+
+    Returns:
+        tuple of section names, or None for every page
+    """
+    if extraction_type is None and not sections:
+        return None
+    selected = set(sections or ())
+    unknown = selected - set(SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))} (known: {', '.join(SECTIONS)})")
+    if extraction_type is not None:
+        if extraction_type not in EXTRACTION_SECTIONS:
+            raise ValueError(f"Unknown extraction type '{extraction_type}' (known: {', '.join(EXTRACTION_SECTIONS)})")
+        selected.update(EXTRACTION_SECTIONS[extraction_type])
+    return tuple(section for section in SECTIONS if section in selected)
+
+
+def page_title(lines):
+    """Section named by the running title on the line after "Account # ...", or None"""
+    for line_num, line in enumerate(lines[:-1]):
+        if ACCOUNT_PATTERN.search(line):
+            titles = TITLE_PATTERN.findall(lines[line_num + 1])
+            return PAGE_TITLES[titles[-1]] if titles else None
+    return None
+
+
+def analyze_page_text(text, carried_section):
+    """
+    Sections and account on one page from its PyPDF2 text
+
+    Args:
+        carried_section: section the previous page ended in
+
+    Returns:
+        tuple: (sections in page order, account number or None, section the page ends in)
+    """
+    lines = text.split('\n')
+    title = page_title(lines)
+    headings = sorted((match.start(), section)
+                      for section, pattern in HEADING_PATTERNS.items()
+                      for match in pattern.finditer(text))
+
+    sections = []
+    for section in [title or carried_section] + [section for _, section in headings]:
+        if section is not None and section not in sections:
+            sections.append(section)
+    ends_in = headings[-1][1] if headings else (title or carried_section)
+
+    account = ACCOUNT_PATTERN.search(text)
+    return sections, account.group(1) if account else None, ends_in
+
+
+class PageIndex:
+    """Page → sections / account map for one PDF"""
+
+    def __init__(self, pdf_hash, pages):
+        self.pdf_hash = pdf_hash
+        self.pages = pages  # [{'page': 1-based number, 'sections': [...], 'account': str or None}]
+
+    @property
+    def total_pages(self):
+        return len(self.pages)
+
+    @classmethod
+    def build(cls, pdf_path, pdf_hash=None):
+        """Scan every page's text with PyPDF2"""
+        reader = PyPDF2.PdfReader(str(pdf_path))
+        pages = []
+        carried = None
+        for page_num, page in enumerate(reader.pages, 1):
+            sections, account, carried = analyze_page_text(page.extract_text() or '', carried)
+            pages.append({'page': page_num, 'sections': sections, 'account': account})
+        return cls(pdf_hash or pdf_content_hash(pdf_path), pages)
+
+    def to_dict(self):
+        return {'index_version': INDEX_VERSION, 'pdf_hash': self.pdf_hash, 'pages': self.pages}
+
+    def save(self, path):
+        """Write the index atomically"""
+        temp_path = Path(f"{path}.tmp")
+        with open(temp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(temp_path, path)
+
+    def pages_for(self, sections):
+        """Page numbers holding any of the sections (every page when sections is None)"""
+        if sections is None:
+            return [page['page'] for page in self.pages]
+        wanted = set(sections)
+        return [page['page'] for page in self.pages if wanted.intersection(page['sections'])]
+
+    def section_pages(self):
+        """{section: [page numbers]} in statement order"""
+        result = {section: [] for section in SECTIONS}
+        for page in self.pages:
+            for section in page['sections']:
+                result[section].append(page['page'])
+        return {section: pages for section, pages in result.items() if pages}
+
+    def account_pages(self):
+        """{account number: [page numbers]}"""
+        result = {}
+        for page in self.pages:
+            if page['account']:
+                result.setdefault(page['account'], []).append(page['page'])
+        return result
+
+
+def load_page_index(pdf_path, rebuild=False):
+    """
+    Saved index for the PDF if it matches the file and INDEX_VERSION, otherwise build and save one
+
+    An index that cannot be saved (read-only directory) is still returned.
+    """
+    pdf_hash = pdf_content_hash(pdf_path)
+    path = index_path(pdf_path)
+    if not rebuild and path.exists():
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get('index_version') == INDEX_VERSION and saved.get('pdf_hash') == pdf_hash:
+                return PageIndex(pdf_hash, saved['pages'])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Rebuilding unreadable page index {path}: {e}")
+
+    index = PageIndex.build(pdf_path, pdf_hash)
+    try:
+        index.save(path)
+    except OSError as e:
+        print(f"Warning: Could not save page index {path}: {e}")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build (or show) the section index of a Fidelity statement PDF")
+    parser.add_argument('pdf_path', help="Statement PDF")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild even if a matching index is saved")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.pdf_path):
+        print(f"Error: PDF file not found: {args.pdf_path}")
+        sys.exit(1)
+
+    index = load_page_index(args.pdf_path, rebuild=args.rebuild)
+    print(f"{args.pdf_path}: {index.total_pages} pages (index: {index_path(args.pdf_path)})")
+    for page in index.pages:
+        print(f"  {page['page']:>3}  {page['account'] or '-':<11} {', '.join(page['sections'])}")
+    print("Sections:")
+    for section, pages in index.section_pages().items():
+        print(f"  {section:<24} pages {', '.join(str(page) for page in pages)}")
+    for extraction_type, sections in EXTRACTION_SECTIONS.items():
+        print(f"{extraction_type} extraction: {len(index.pages_for(sections))} of {index.total_pages} pages")
@@ -0,0 +1,24 @@
+-- ============================================
+-- load_runs: per-document load stage timings
+-- ============================================
+-- Written by simple_loader.py --record-runs (loaders/load_metrics.py record_load_run),
+-- one row per loaded / skipped / conflict / failed extraction JSON.
+
+-- Table: load_runs
+CREATE TABLE load_runs (
+    id UUID PRIMARY KEY,
+    document_id UUID,
+    json_path TEXT NOT NULL,
+    json_md5_hash TEXT,
+    extraction_type TEXT,
+    status TEXT NOT NULL,
+    mode TEXT,
+    started_at TIMESTAMPTZ NOT NULL,
+    total_seconds NUMERIC(12, 6) NOT NULL,
+    rows_written INTEGER NOT NULL DEFAULT 0,
+    stages JSONB NOT NULL,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX load_runs_started_at_idx ON load_runs (started_at);
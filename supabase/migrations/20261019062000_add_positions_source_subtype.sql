@@ -0,0 +1,13 @@
+-- ============================================
+-- positions.source_subtype: the statement's own sec_subtype
+-- ============================================
+-- positions.sec_subtype may be rule-mapped; source_subtype keeps the extracted value
+-- (as source keeps the extracted sec_type), so reapply_rules_to_positions can fall back
+-- to it and give the same result as a fresh load.
+
+ALTER TABLE positions ADD COLUMN source_subtype TEXT;
+
+-- No position rule writes sec_subtype so far, so stored values are the extracted ones
+UPDATE positions SET source_subtype = sec_subtype;
+
+COMMENT ON COLUMN positions.source_subtype IS 'sec_subtype as extracted from the statement (before mapping rules)';